@@ -0,0 +1,217 @@
+# admission.py
+import math # Para redondear hacia arriba el tiempo de Retry-After.
+import threading # Cada carril (lane) usa una Condition para contar peticiones activas y en espera.
+import time # Para medir cuánto tarda cada petición y estimar el Retry-After.
+from flask import g, request, jsonify # 'g' guarda los carriles ocupados por la petición actual hasta el teardown.
+from prefetch import is_prefetch # Las peticiones especulativas (prefetch) van por su propio carril.
+
+# --- Control de Admisión ---
+# Todas las rutas comparten los mismos hilos del servidor. Unas cuantas búsquedas enormes o borrados recursivos
+# podrían ocuparlos todos y dejar esperando a los /api/browse, que son baratos.
+# Para evitarlo, cada petición tiene que "entrar" en uno o varios carriles antes de ejecutarse:
+# - Cada ruta pesada tiene su propio límite de concurrencia y una cola de espera acotada.
+# - Todas las rutas pesadas comparten además el carril 'background', que nunca puede ocupar todos los hilos.
+# - Las rutas interactivas (explorar, ver contenido) van por el carril 'interactive' y nunca esperan detrás de las pesadas.
+# Si la cola está llena respondemos enseguida 429; si la espera se alarga demasiado, 503. Ambas con Retry-After.
+
+
+class AdmissionRejected(Exception):
+    """Se lanza cuando una petición no puede entrar en un carril. Lleva el código HTTP y el Retry-After sugerido."""
+
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+
+class Lane:
+    """
+    Un carril de admisión: como mucho 'max_concurrent' peticiones a la vez y 'max_queue' esperando.
+    Una petición en espera se rinde a los 'queue_timeout' segundos.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0 # Peticiones ejecutándose ahora mismo.
+        self.waiting = 0 # Peticiones esperando un hueco.
+        self.rejected = 0 # Contador de rechazos (para las estadísticas).
+        self.avg_service_time = 0.1 # Media móvil (EWMA) del tiempo de servicio, en segundos.
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        """Estima cuántos segundos debería esperar el cliente antes de reintentar."""
+        pending = self.waiting + 1
+        estimate = self.avg_service_time * pending / max(1, self.max_concurrent)
+        return max(1, math.ceil(estimate))
+
+    def acquire(self):
+        """Ocupa un hueco del carril o lanza AdmissionRejected (429 si la cola está llena, 503 si se agota la espera)."""
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(429, self.retry_after(),
+                                        f"Demasiadas peticiones en curso ({self.name}). Inténtalo de nuevo más tarde.")
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected(503, self.retry_after(),
+                                                f"El servidor está ocupado ({self.name}). Inténtalo de nuevo más tarde.")
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, elapsed=None):
+        """Libera el hueco y actualiza la media del tiempo de servicio."""
+        with self._cond:
+            self.active -= 1
+            if elapsed is not None:
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+            self._cond.notify()
+
+    def to_dict(self):
+        with self._cond:
+            return {
+                'name': self.name,
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'rejected': self.rejected,
+                'avg_service_time': round(self.avg_service_time, 4),
+            }
+
+
+# --- Configuración de Carriles ---
+# Formato: (max_concurrent, max_queue, queue_timeout en segundos).
+# Carril compartido por todas las rutas interactivas: generoso y con poca espera.
+INTERACTIVE_LANE = ('interactive', 32, 64, 2)
+# Carril compartido por todas las rutas pesadas: el total de hilos que pueden ocupar entre todas.
+BACKGROUND_LANE = ('background', 12, 32, 10)
+# Carril de las peticiones especulativas (prefetch): pocas a la vez y sin cola, si no hay hueco se rechazan al momento.
+# Así el prefetch nunca quita huecos a las navegaciones reales.
+PREFETCH_LANE = ('prefetch', 4, 0, 0)
+# Límite por defecto de una ruta pesada que no aparezca en ROUTE_LIMITS.
+DEFAULT_ROUTE_LIMIT = (8, 16, 10)
+
+# Endpoints interactivos (nombre del endpoint de Flask). Van por el carril prioritario.
+INTERACTIVE_ENDPOINTS = {
+    'index',
+    'static',
+    'browse_bp.browse_directory',
+    'browse_bp.get_roots',
+    'browse_bp.browse_hints',
+    'file_content_bp.get_file_content',
+    'transfer_bp.job_status',
+    'watch_bp.update_watch',
+    'quotas_bp.list_quotas',
+    'replication_bp.replication_status',
+}
+
+# Endpoints que no pasan por el control de admisión (ej: conexiones largas que tienen su propio límite).
+EXEMPT_ENDPOINTS = {
+    'admission_stats',
+    'watch_bp.watch_directories', # Conexión SSE de larga duración; events.MAX_SUBSCRIBERS las limita.
+    'tail_bp.tail_file', # Seguimiento SSE de archivos; tail.MAX_TAIL_SUBSCRIBERS las limita.
+}
+
+# Límites propios de las rutas pesadas: búsquedas recursivas, borrados, copias...
+ROUTE_LIMITS = {
+    'search_bp.search_files': (4, 8, 5),
+    'modification_bp.delete_item': (4, 8, 10),
+    'transfer_bp.copy_endpoint': (4, 8, 5),
+    'transfer_bp.move_endpoint': (4, 8, 5),
+    'modification_bp.patch_file': (4, 8, 10),
+    'file_content_bp.get_file_signature': (4, 8, 10),
+    'replace_bp.replace_endpoint': (2, 4, 5),
+    'file_content_bp.get_archive_member': (4, 8, 10),
+}
+
+_lanes = {}
+_lanes_lock = threading.Lock()
+
+
+def _get_lane(name, limits):
+    """Devuelve el carril con ese nombre, creándolo la primera vez con los límites indicados."""
+    with _lanes_lock:
+        if name not in _lanes:
+            _lanes[name] = Lane(name, *limits)
+        return _lanes[name]
+
+
+def lanes_for_endpoint(endpoint, prefetch=False):
+    """
+    Devuelve la lista de carriles (en orden de entrada) que debe ocupar una petición a 'endpoint'.
+    Si 'prefetch' es True (petición especulativa), una ruta interactiva va por el carril 'prefetch'.
+    """
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+        return []
+    if prefetch and endpoint in INTERACTIVE_ENDPOINTS:
+        return [_get_lane(PREFETCH_LANE[0], PREFETCH_LANE[1:])]
+    if endpoint in INTERACTIVE_ENDPOINTS:
+        return [_get_lane(INTERACTIVE_LANE[0], INTERACTIVE_LANE[1:])]
+    # Primero el carril propio de la ruta y después el compartido: así una ruta saturada
+    # espera en su propia cola sin ocupar huecos del carril 'background'.
+    return [
+        _get_lane(endpoint, ROUTE_LIMITS.get(endpoint, DEFAULT_ROUTE_LIMIT)),
+        _get_lane(BACKGROUND_LANE[0], BACKGROUND_LANE[1:]),
+    ]
+
+
+def _before_request():
+    """Se ejecuta antes de cada petición: intenta entrar en sus carriles o responde 429/503."""
+    acquired = []
+    try:
+        for lane in lanes_for_endpoint(request.endpoint, prefetch=is_prefetch(request)):
+            lane.acquire()
+            acquired.append(lane)
+    except AdmissionRejected as e:
+        for lane in acquired:
+            lane.release()
+        print(f"admission.py: Petición a '{request.path}' rechazada con {e.status}: {e.message}")
+        response = jsonify({'success': False, 'message': e.message})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    g.admission_lanes = acquired
+    g.admission_started = time.monotonic()
+    return None
+
+
+def _teardown_request(exc):
+    """Se ejecuta siempre al terminar la petición (incluso con error): libera los carriles ocupados."""
+    lanes = g.pop('admission_lanes', None)
+    if not lanes:
+        return
+    elapsed = time.monotonic() - g.pop('admission_started', time.monotonic())
+    for lane in reversed(lanes):
+        lane.release(elapsed)
+
+
+def get_stats():
+    """Estado actual de todos los carriles (activas, en espera, rechazadas...)."""
+    with _lanes_lock:
+        lanes = list(_lanes.values())
+    return [lane.to_dict() for lane in lanes]
+
+
+def init_admission(app):
+    """Conecta el control de admisión a la aplicación Flask y registra /api/admission_stats."""
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+
+    @app.route('/api/admission_stats')
+    def admission_stats():
+        """Devuelve el estado de los carriles de admisión, útil para diagnosticar saturación."""
+        return jsonify({'success': True, 'lanes': get_stats()})
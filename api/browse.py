@@ -1,14 +1,141 @@
 # api/browse.py
 import os
-from flask import Blueprint, request, jsonify
+import stat # Para mostrar los permisos como texto (ej: '-rw-r--r--').
+from flask import Blueprint, Response, request, jsonify
 # Importar las funciones necesarias desde utils.
 # Es VITAL que importemos get_data_dir_abs() aquí para poder usarla dentro de browse_directory
 # y obtener la ruta de DATA_DIR de forma segura.
 # YA NO importamos DATA_DIR directamente aquí.
-from utils import get_full_path, get_current_path_display, get_data_dir_abs # <-- ¡VERIFICA QUE ESTA LÍNEA ESTÉ ASÍ!
+from utils import RootBusyError, get_full_path, get_current_path_display, get_data_dir_abs, get_root, list_roots, root_busy_response # <-- ¡VERIFICA QUE ESTA LÍNEA ESTÉ ASÍ!
+# Resolución de rutas con descriptores de directorio cacheados y un único stat por petición.
+from resolver import resolve
+# ETag de los listados, presupuesto de prefetch y sugerencias de subdirectorios más visitados.
+from prefetch import budget, client_key, is_prefetch, listing_etag, record_visit, top_children
+# Orden configurable (sort/order/top) con selección de los k primeros en un montículo acotado.
+from sorting import parse_sort_args, select_sorted, sort_key
+# Formatos compactos (columnas, binario msgpack) para listados grandes.
+from compact import FORMAT_JSON, entry_flags, make_response, negotiate_format
+# Archivos comprimidos (.zip, .tar...) explorados como carpetas virtuales, sin extraerlos.
+from archives import ArchiveError, get_index as get_archive_index, locate as locate_archive
+# Listados ya serializados guardados en el servidor (se revalidan con el stat del directorio).
+from listing_cache import listing_key, lookup as lookup_listing, store as store_listing
 
 browse_bp = Blueprint('browse_bp', __name__)
 
+# --- Campos de cada elemento del listado ---
+# Con 'fields=' el cliente elige qué columnas quiere (ej: fields=name,size,mtime). Sin 'fields=' se envían las de siempre.
+# Todo sale de la MISMA pasada de os.scandir: el tipo viene gratis del propio listado y el stat de cada entrada
+# se hace una sola vez (DirEntry lo guarda en caché), y solo si se pidió algún campo que lo necesite.
+DEFAULT_FIELDS = ('name', 'path', 'is_dir', 'is_file')
+AVAILABLE_FIELDS = ('name', 'path', 'is_dir', 'is_file', 'is_symlink', 'size', 'mtime', 'mode', 'link_target', 'child_count')
+STAT_FIELDS = {'size', 'mtime', 'mode'} # Campos que necesitan el stat de la entrada.
+CHILD_COUNT_LIMIT = 10000 # Como mucho contamos esta cantidad de hijos por subdirectorio (listar uno enorme sería muy caro).
+
+
+def _parse_fields(raw):
+    """Convierte 'name,size,...' en una tupla de campos. Devuelve (campos, campos_desconocidos)."""
+    if not raw:
+        return DEFAULT_FIELDS, []
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip())) # Sin repetidos, en orden.
+    unknown = [f for f in fields if f not in AVAILABLE_FIELDS]
+    return fields, unknown
+
+
+def _count_children(path):
+    """Cuenta las entradas de un subdirectorio (hasta CHILD_COUNT_LIMIT). None si no se puede leer."""
+    count = 0
+    try:
+        with os.scandir(path) as it:
+            for _ in it:
+                count += 1
+                if count >= CHILD_COUNT_LIMIT:
+                    break
+    except OSError:
+        return None
+    return count
+
+
+def _entry_stat(entry):
+    """stat de una entrada de scandir (DirEntry lo guarda en caché). None si no se puede leer."""
+    try:
+        return entry.stat()
+    except OSError:
+        return None # Enlace roto o entrada borrada mientras listábamos.
+
+
+def _field_value(field, entry, relative_path, is_dir, st):
+    """Valor de un campo de un elemento del listado. 'st' es el stat de la entrada (o None si no hizo falta)."""
+    if field == 'name':
+        return entry.name # Nombre del archivo o directorio.
+    if field == 'path':
+        return relative_path # Ruta relativa a la raíz, con '/'.
+    if field == 'is_dir':
+        return is_dir
+    if field == 'is_file':
+        return entry.is_file()
+    if field == 'is_symlink':
+        return entry.is_symlink()
+    if field == 'size':
+        return st.st_size if st and not is_dir else None # El tamaño de un directorio no es útil.
+    if field == 'mtime':
+        return st.st_mtime if st else None # Fecha de modificación (segundos desde epoch).
+    if field == 'mode':
+        return stat.filemode(st.st_mode) if st else None
+    if field == 'link_target':
+        if not entry.is_symlink():
+            return None
+        try:
+            return os.readlink(entry.path)
+        except OSError:
+            return None # Enlace borrado mientras listábamos (o sin permiso): no rompe el listado entero.
+    if field == 'child_count':
+        return _count_children(entry.path) if is_dir else None
+    return None
+
+
+def _member_field_value(field, member, relative_path, is_dir, st):
+    """
+    Como _field_value, pero para un elemento de un archivo comprimido (ArchiveMember): su ruta es virtual, así que
+    el destino del enlace y el número de hijos salen del índice del archivo, nunca de os.readlink ni de scandir.
+    """
+    if field == 'link_target':
+        return member.link_target
+    if field == 'child_count':
+        return member.child_count
+    return _field_value(field, member, relative_path, is_dir, st)
+
+
+def _entry_fields(entry, relative_path, fields, value_of=_field_value):
+    """Construye el diccionario de un elemento del listado con solo los campos pedidos."""
+    is_dir = entry.is_dir()
+    # Una sola llamada por entrada; DirEntry la guarda para los demás campos (y para el orden, si ya se hizo).
+    st = _entry_stat(entry) if STAT_FIELDS.intersection(fields) else None
+    return {field: value_of(field, entry, relative_path, is_dir, st) for field in fields}
+
+
+# En el formato compacto, el nombre y los 'flags' siempre van; la ruta y el tipo se deducen de ellos.
+COMPACT_IMPLIED_FIELDS = ('name', 'path', 'is_dir', 'is_file', 'is_symlink')
+
+
+def _compact_columns(entries, fields, value_of=_field_value):
+    """Construye las columnas del formato compacto directamente, sin crear un diccionario por elemento."""
+    extra = [f for f in fields if f not in COMPACT_IMPLIED_FIELDS]
+    needs_stat = bool(STAT_FIELDS.intersection(extra))
+    names, flags = [], []
+    extra_columns = [[] for _ in extra]
+    for entry in entries:
+        is_dir = entry.is_dir()
+        names.append(entry.name)
+        flags.append(entry_flags(is_dir, entry.is_file(), entry.is_symlink()))
+        if extra:
+            st = _entry_stat(entry) if needs_stat else None
+            for column, field in zip(extra_columns, extra):
+                column.append(value_of(field, entry, None, is_dir, st))
+    columns = {'name': names, 'flags': flags}
+    columns.update(zip(extra, extra_columns))
+    return columns
+
+
 @browse_bp.route('/api/browse')
 def browse_directory():
     """
@@ -16,27 +143,46 @@ def browse_directory():
     Recibe la ruta relativa desde el frontend.
     """
     current_path = request.args.get('path', '')
+    root_name = request.args.get('root', '') # Raíz de datos a explorar (vacío = 'data').
     # --- Logging para diagnóstico ---
     print(f"\n--- /api/browse ---")
-    print(f"Recibida la ruta actual del frontend: '{current_path}'")
+    print(f"Recibida la ruta actual del frontend: '{current_path}' (raíz: '{root_name}')")
+
+    # Buscamos la raíz pedida. Si no existe, no hay nada que explorar.
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/browse: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Raíz de datos desconocida: '{root_name}'"
+        })
 
-    # Obtener la ruta completa y validada usando la función de utilidad.
-    # Si la ruta no es válida, get_full_path devuelve None.
-    full_current_path = get_full_path(current_path)
-    print(f"/api/browse: get_full_path nos devolvió: '{full_current_path}'")
+    # Obtener la ruta completa y validada usando el resolvedor (resolver.py): valida la ruta igual que get_full_path,
+    # pero además reutiliza el descriptor abierto del directorio padre y hace UN SOLO stat, que sirve para comprobar
+    # que existe, que es un directorio y para el ETag. Si la ruta no es válida, resolve devuelve None.
+    resolved = resolve(current_path, root)
+    full_current_path = resolved.full_path if resolved else None
+    print(f"/api/browse: resolve nos devolvió: '{full_current_path}'")
 
-    # Si get_full_path devuelve None, la ruta no es válida o segura.
-    if not full_current_path:
-        print(f"/api/browse: Ruta inválida después de get_full_path para '{current_path}'. Enviando error.")
+    # Si resolve devuelve None, la ruta no es válida o segura.
+    if not resolved:
+        print(f"/api/browse: Ruta inválida después de resolve para '{current_path}'. Enviando error.")
         print(f"--- Fin /api/browse ---\n")
         return jsonify({
             'success': False,
             'message': 'Ruta no válida' # Mensaje de error para el frontend.
         })
+    resolved.close() # Solo necesitábamos su stat: devolvemos el descriptor del padre a la caché.
+    dir_stat = resolved.st
 
-    # --- Verificaciones de existencia y tipo de ruta ---
+    # --- Archivos comprimidos ---
+    # Un .zip o .tar (o una ruta dentro de uno, ej: 'copia.zip/docs') se explora como si fuera una carpeta.
+    archive_location = locate_archive(root.path, full_current_path) if not resolved.is_dir else None
+
+    # --- Verificaciones de existencia y tipo de ruta (con el stat que ya tenemos) ---
     print(f"/api/browse: Verificando si '{full_current_path}' existe...")
-    if not os.path.exists(full_current_path):
+    if not resolved.exists and not archive_location:
         print(f"/api/browse: La ruta completa '{full_current_path}' NO existe. Enviando error.")
         print(f"--- Fin /api/browse ---\n")
         return jsonify({
@@ -46,7 +192,7 @@ def browse_directory():
     print(f"/api/browse: La ruta '{full_current_path}' existe.")
 
     print(f"/api/browse: Verificando si '{full_current_path}' es un directorio...")
-    if not os.path.isdir(full_current_path):
+    if not resolved.is_dir and not archive_location:
         print(f"/api/browse: La ruta completa '{full_current_path}' NO es un directorio. Enviando error.")
         print(f"--- Fin /api/browse ---\n")
         return jsonify({
@@ -55,31 +201,125 @@ def browse_directory():
         })
     print(f"/api/browse: La ruta '{full_current_path}' es un directorio.")
 
+    # Campos pedidos por el cliente (sparse fieldsets).
+    fields, unknown_fields = _parse_fields(request.args.get('fields', ''))
+    if unknown_fields:
+        print(f"/api/browse: Campos desconocidos {unknown_fields}. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Campos desconocidos: {', '.join(unknown_fields)}. Disponibles: {', '.join(AVAILABLE_FIELDS)}"
+        })
+
+    # Orden y número de elementos pedidos (sort, order, top, dirs_first).
+    sort_spec, sort_error = parse_sort_args(request.args)
+    if sort_error:
+        print(f"/api/browse: {sort_error}. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({'success': False, 'message': sort_error})
+
+    # Formato de la respuesta: JSON de siempre, compacto por columnas o binario (msgpack).
+    response_format, format_error = negotiate_format(request)
+    if format_error:
+        print(f"/api/browse: {format_error}. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({'success': False, 'message': format_error})
+
+    if archive_location:
+        return _browse_archive(root, full_current_path, archive_location, fields, sort_spec, response_format)
+
+    # --- Caché del navegador y prefetch ---
+    # Las navegaciones reales cuentan como visitas (para sugerir luego los subdirectorios más visitados).
+    prefetch = is_prefetch(request)
+    rel_dir = os.path.relpath(full_current_path, root.path)
+    rel_dir = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/')
+    if not prefetch:
+        record_visit(root, rel_dir)
+
+    # Si el navegador ya tiene este listado y el directorio no cambió, respondemos 304 sin listar nada.
+    # La fecha del directorio solo cambia al crear/borrar/renombrar entradas: si se piden tamaños, fechas o
+    # número de hijos, no basta con ella y el ETag se calcula después, a partir del contenido de la respuesta.
+    etag = None
+    cache_key = None
+    if not (STAT_FIELDS.intersection(fields) or 'child_count' in fields or sort_spec.needs_stat):
+        cache_key = listing_key(full_current_path, fields, sort_spec, response_format) # Mismo criterio: listing_cache.py.
+        variant = f"{request.query_string.decode('utf-8', 'replace')}|{response_format}" # El formato puede venir del Accept.
+        etag = listing_etag(root, full_current_path, variant, st=dir_stat)
+    if etag and request.if_none_match.contains_weak(etag):
+        print(f"/api/browse: El listado de '{full_current_path}' no cambió. Enviando 304.")
+        print(f"--- Fin /api/browse ---\n")
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    # Si otro cliente (o este mismo) ya pidió este listado y el directorio no cambió, enviamos los bytes guardados:
+    # sin scandir, sin ordenar y sin volver a serializar. Tampoco gasta presupuesto de prefetch (no lista nada).
+    cached = lookup_listing(root, cache_key, dir_stat) if cache_key else None
+    if cached is not None:
+        print(f"/api/browse: Lista de {cached.count} de {cached.total} elementos de '{full_current_path}' servida desde la caché.")
+        print(f"--- Fin /api/browse ---\n")
+        response = Response(cached.body, mimetype=cached.mimetype)
+        response.vary.add('Accept')
+        if etag:
+            response.set_etag(etag, weak=True)
+        else:
+            response.add_etag()
+            response.make_conditional(request)
+        response.headers['Cache-Control'] = 'no-cache'
+        if prefetch:
+            response.headers['X-Prefetch-Budget'] = str(budget.remaining(client_key(request)))
+        return response
+
+    # Las peticiones especulativas gastan presupuesto: sin presupuesto, no listamos nada.
+    prefetch_remaining = None
+    if prefetch:
+        allowed, prefetch_remaining, retry_after = budget.take(client_key(request))
+        if not allowed:
+            print(f"/api/browse: Presupuesto de prefetch agotado para {client_key(request)}. Enviando 429.")
+            print(f"--- Fin /api/browse ---\n")
+            response = jsonify({'success': False, 'message': 'Presupuesto de prefetch agotado'})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+
     # Si todo está bien, procedemos a listar el contenido.
     items = []
     try:
         # Usamos os.scandir para listar de forma eficiente.
-        with os.scandir(full_current_path) as entries:
-            # ¡Paso CRUCIAL! Obtenemos la ruta absoluta y segura de DATA_DIR usando nuestra función.
+        # 'root.slot()' limita cuántos listados simultáneos hace esta raíz: una raíz lenta (NFS) no acapara los hilos de las demás.
+        with root.slot(), os.scandir(full_current_path) as entries:
+            # ¡Paso CRUCIAL! Obtenemos la ruta absoluta y segura de la raíz usando nuestra función.
             # Esto es necesario para calcular la ruta relativa de cada elemento.
-            data_dir_abs = get_data_dir_abs() # <-- ¡VERIFICA QUE ESTA LÍNEA ESTÉ ASÍ!
+            data_dir_abs = get_data_dir_abs(root) # <-- ¡VERIFICA QUE ESTA LÍNEA ESTÉ ASÍ!
+
+            # Cada entrada se decora con su clave de orden (calculada una sola vez) y se ordena o,
+            # con 'top', se seleccionan las k primeras sin guardar el resto.
+            decorated = (
+                (sort_key(sort_spec, entry.name, entry.is_dir(), _entry_stat(entry) if sort_spec.needs_stat else None), entry)
+                for entry in entries
+            )
+            selected, total = select_sorted(sort_spec, decorated)
 
-            for entry in entries:
-                # Obtenemos la ruta relativa de cada elemento listado con respecto a DATA_DIR.
-                # Usamos os.path.relpath con la ruta absoluta de DATA_DIR obtenida por la función.
-                relative_path = os.path.relpath(entry.path, data_dir_abs) # <-- ¡VERIFICA QUE ESTA LÍNEA USE data_dir_abs!
+            # Los campos (y el stat, número de hijos...) solo se calculan para las entradas que se devuelven.
+            if response_format != FORMAT_JSON:
+                # Formato compacto: columnas y un prefijo común en vez de la ruta de cada elemento.
+                columns = _compact_columns(selected, fields)
+            else:
+                for entry in selected:
+                    # Obtenemos la ruta relativa de cada elemento listado con respecto a DATA_DIR.
+                    # Usamos os.path.relpath con la ruta absoluta de DATA_DIR obtenida por la función.
+                    relative_path = os.path.relpath(entry.path, data_dir_abs) # <-- ¡VERIFICA QUE ESTA LÍNEA USE data_dir_abs!
 
-                items.append({
-                    'name': entry.name, # Nombre del archivo o directorio.
                     # La ruta que enviamos al frontend debe ser relativa a DATA_DIR y usar barras diagonales.
-                    'path': relative_path.replace(os.sep, '/'), # Reemplazamos separadores del OS por '/' para URLs.
-                    'is_dir': entry.is_dir(), # Indicamos si es un directorio.
-                    'is_file': entry.is_file() # Indicamos si es un archivo.
-                })
-        # Ordenamos los resultados: directorios primero, luego archivos, ambos alfabéticamente.
-        items.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
-        print(f"/api/browse: Lista de {len(items)} elementos cargada exitosamente en '{full_current_path}'.")
+                    items.append(_entry_fields(entry, relative_path.replace(os.sep, '/'), fields))
+        print(f"/api/browse: Lista de {len(selected)} de {total} elementos cargada exitosamente en '{full_current_path}'.")
 
+    except RootBusyError as e:
+        # La raíz tiene todos sus huecos ocupados: respondemos 503 al momento en vez de bloquear este hilo.
+        print(f"/api/browse: {e.message}. Enviando 503.")
+        print(f"--- Fin /api/browse ---\n")
+        return root_busy_response(e)
     except Exception as e:
         # Capturamos CUALQUIER error que ocurra durante la lectura del directorio o procesamiento.
         # Logueamos el error detalladamente en el terminal del servidor.
@@ -94,8 +334,141 @@ def browse_directory():
     # Si todo salió bien, enviamos la respuesta de éxito con la lista de items y la ruta formateada para mostrar.
     print(f"/api/browse: Enviando respuesta exitosa para '{current_path}'.")
     print(f"--- Fin /api/browse ---\n")
+    payload = {
+        'success': True,
+        'root': root.name, # La raíz que estamos explorando.
+        'total': total, # Cuántos elementos tiene el directorio (con 'top' pueden devolverse menos).
+        'truncated': len(selected) < total, # True si 'top' dejó elementos fuera.
+        'sort': sort_spec.to_dict(), # El orden aplicado.
+        'current_path_display': get_current_path_display(full_current_path, root) # La ruta formateada para el frontend.
+    }
+    if response_format == FORMAT_JSON:
+        payload['items'] = items # La lista de archivos y directorios.
+    else:
+        payload['format'] = 'compact'
+        payload['base'] = f'{rel_dir}/' if rel_dir else '' # path de cada elemento = base + name
+        payload['columns'] = columns
+    response = make_response(payload, response_format)
+    if cache_key:
+        # Guardamos los bytes ya serializados, con el stat del directorio tomado antes de listarlo.
+        store_listing(root, cache_key, dir_stat, response.get_data(), response.mimetype, len(selected), total)
+    if etag:
+        # El navegador puede guardar el listado, pero debe revalidarlo (If-None-Match) antes de reutilizarlo.
+        response.set_etag(etag, weak=True)
+    else:
+        # Sin validador barato: el ETag es el hash de la respuesta. Hay que listar, pero si nada cambió
+        # respondemos 304 sin volver a enviar el listado.
+        response.add_etag()
+        response.make_conditional(request)
+    response.headers['Cache-Control'] = 'no-cache'
+    if prefetch_remaining is not None:
+        response.headers['X-Prefetch-Budget'] = str(prefetch_remaining)
+    return response
+
+
+def _browse_archive(root, full_current_path, archive_location, fields, sort_spec, response_format):
+    """
+    Lista una carpeta dentro de un archivo comprimido. Los elementos (ArchiveMember) imitan a las entradas de
+    scandir, así el orden, los campos y el formato compacto funcionan igual que con una carpeta normal.
+    """
+    archive_path, inner = archive_location
+    print(f"/api/browse: '{full_current_path}' está dentro del archivo comprimido '{archive_path}' (ruta interna: '{inner}').")
+    try:
+        index = get_archive_index(archive_path)
+    except ArchiveError as e:
+        print(f"/api/browse: {e}. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({'success': False, 'message': str(e)})
+    members = index.list_dir(inner)
+    if members is None:
+        exists = index.member(inner, full_current_path) is not None
+        print(f"/api/browse: La ruta interna '{inner}' {'NO es un directorio' if exists else 'NO existe'}. Enviando error.")
+        print(f"--- Fin /api/browse ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'La ruta no es un directorio' if exists else 'La ruta no existe'
+        })
+
+    decorated = (
+        (sort_key(sort_spec, member.name, member.is_dir(), member.stat() if sort_spec.needs_stat else None), member)
+        for member in members
+    )
+    selected, total = select_sorted(sort_spec, decorated)
+    rel_dir = os.path.relpath(full_current_path, root.path).replace(os.sep, '/')
+    items = []
+    if response_format != FORMAT_JSON:
+        columns = _compact_columns(selected, fields, _member_field_value)
+    else:
+        for member in selected:
+            relative_path = os.path.relpath(member.path, root.path)
+            items.append(_entry_fields(member, relative_path.replace(os.sep, '/'), fields, _member_field_value))
+    print(f"/api/browse: Lista de {len(selected)} de {total} elementos del archivo comprimido cargada.")
+    print(f"--- Fin /api/browse ---\n")
+    payload = {
+        'success': True,
+        'root': root.name,
+        'total': total,
+        'truncated': len(selected) < total,
+        'sort': sort_spec.to_dict(),
+        'current_path_display': f"{root.name}/{rel_dir}/",
+        'archive': { # Indica al frontend que está dentro de un archivo comprimido (solo lectura).
+            'path': os.path.relpath(archive_path, root.path).replace(os.sep, '/'),
+            'kind': index.kind,
+        }
+    }
+    if response_format == FORMAT_JSON:
+        payload['items'] = items
+    else:
+        payload['format'] = 'compact'
+        payload['base'] = f'{rel_dir}/'
+        payload['columns'] = columns
+    response = make_response(payload, response_format)
+    # El contenido de un archivo comprimido solo cambia si cambia el archivo: ETag del propio listado.
+    response.add_etag()
+    response.make_conditional(request)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# --- Endpoint de sugerencias para el prefetch ---
+@browse_bp.route('/api/browse/hints')
+def browse_hints():
+    """
+    Devuelve los subdirectorios más visitados de un directorio, para que el navegador los pida por adelantado.
+    También devuelve cuánto presupuesto de prefetch le queda al cliente, así no pide más de lo que se le va a dar.
+    """
+    current_path = request.args.get('path', '')
+    root = get_root(request.args.get('root', ''))
+    if not root:
+        return jsonify({'success': False, 'message': 'Raíz de datos desconocida'})
+
+    full_current_path = get_full_path(current_path, root)
+    if not full_current_path or not os.path.isdir(full_current_path):
+        return jsonify({'success': False, 'message': 'La ruta no es un directorio'})
+
+    rel_dir = os.path.relpath(full_current_path, root.path)
+    rel_dir = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/')
+    hints = []
+    for name in top_children(root, rel_dir):
+        # Solo sugerimos los que siguen existiendo (como mucho MAX_HINTS comprobaciones).
+        if os.path.isdir(os.path.join(full_current_path, name)):
+            hints.append(f'{rel_dir}/{name}' if rel_dir else name)
+
+    return jsonify({
+        'success': True,
+        'hints': hints,
+        'prefetch_budget': budget.remaining(client_key(request))
+    })
+
+
+# --- Endpoint para listar las raíces de datos disponibles ---
+@browse_bp.route('/api/roots')
+def get_roots():
+    """
+    Devuelve las raíces de datos configuradas (ej: 'data', 'scratch', 'archive').
+    El frontend lo usa para que el usuario elija qué volumen explorar.
+    """
     return jsonify({
         'success': True,
-        'items': items, # La lista de archivos y directorios.
-        'current_path_display': get_current_path_display(full_current_path) # La ruta formateada para el frontend.
+        'roots': [root.to_dict() for root in list_roots()]
     })
\ No newline at end of file
@@ -1,6 +1,10 @@
 import os # De nuevo, necesitamos el módulo 'os' para hablar con el sistema de archivos: crear carpetas, archivos, verificar si existen, etc.
 from flask import Blueprint, request, jsonify # Importamos lo básico de Flask para las rutas API y manejar las peticiones y respuestas en JSON.
-from utils import get_full_path # ¡Importante! Traemos nuestra función de 'utils' para asegurarnos de que las rutas sean seguras y absolutas.
+from utils import get_full_path, get_root # ¡Importante! Traemos nuestras funciones de 'utils' para asegurarnos de que las rutas sean seguras y absolutas (y en qué raíz).
+from events import notify_change # Avisamos a los clientes suscritos (SSE) de que el directorio cambió.
+from journal import record_mutation # Y anotamos el cambio en el diario que siguen las réplicas.
+from quotas import QuotaExceeded, quota_manager, quota_error_response # Cuotas de almacenamiento por carpeta.
+from durable import atomic_write # Escritura en un temporal + rename atómico, con el contenido ya en disco.
 
 # Creamos otro Blueprint, esta vez para agrupar todas las rutas que tienen que ver con la creación
 # (crear directorios y crear archivos). Lo llamamos 'creation_bp'.
@@ -21,6 +25,7 @@ def create_directory():
     data = request.get_json()
     path = data.get('path', '') # Obtenemos la ruta del directorio padre. Si no viene, asumimos la raíz.
     name = data.get('name', '') # Obtenemos el nombre que queremos para la nueva carpeta.
+    root_name = data.get('root', '') # Raíz de datos donde crearla (vacío = 'data').
 
     # Primero, una validación simple: ¿Nos dieron un nombre para la carpeta?
     # Si el nombre está vacío, ¡no podemos crear nada! Mandamos un error.
@@ -30,15 +35,23 @@ def create_directory():
             'message': 'Name is required' # Mensaje para el frontend.
         })
 
+    # La raíz de datos tiene que existir.
+    root = get_root(root_name)
+    if not root:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown data root '{root_name}'"
+        })
+
     # Ok, tenemos nombre. Ahora, construimos la ruta COMPLETA donde debería estar la nueva carpeta.
     # 'os.path.join' es genial porque une partes de ruta de forma correcta sin importar si estás en Windows, Linux, etc.
     new_dir_relative_path = os.path.join(path, name) # Esto nos da la ruta relativa (ej: 'documentos/nueva_carpeta').
     # ¡Pero necesitamos la ruta ABSOLUTA y SEGURA! Para eso, usamos nuestra fiel 'get_full_path'.
-    full_path = get_full_path(new_dir_relative_path)
+    full_path = get_full_path(new_dir_relative_path, root)
 
     # Antes de crear la carpeta, vamos a verificar que el directorio padre (donde queremos crearla) sea válido y exista.
     # De nuevo, usamos 'get_full_path' para el padre y 'os.path.isdir' para verificar si es un directorio existente.
-    full_parent_path = get_full_path(path)
+    full_parent_path = get_full_path(path, root)
 
     # Si la ruta del padre no es válida (get_full_path devolvió None) o si no es un directorio existente...
     if not full_parent_path or not os.path.isdir(full_parent_path):
@@ -67,12 +80,20 @@ def create_directory():
     try:
         # 'os.makedirs' es genial porque si las carpetas "padre" de la nueva ruta no existen, ¡también las crea!
         # 'exist_ok=False' le dice que lance un error si la carpeta ya existe. Como ya lo comprobamos antes, esto es seguro.
-        os.makedirs(full_path, exist_ok=False)
+        # La carpeta nueva cuenta como un elemento en las cuotas que la abarcan (si alguna está llena, no se crea).
+        with quota_manager.reserve(root, full_path, 0, 1):
+            os.makedirs(full_path, exist_ok=False)
+        notify_change(root.name, full_path) # Los navegadores que miran esta carpeta reciben el evento 'add'.
+        record_mutation('mkdir', root.name, full_path)
         # Si llegamos aquí, ¡todo bien! Mandamos un mensaje de éxito.
         return jsonify({
             'success': True,
             'message': f"Directory '{name}' created successfully"
         })
+    except QuotaExceeded as e:
+        # La cuota no admite más elementos: la carpeta no se creó.
+        print(f"Quota exceeded creating directory {full_path}: {e.message}")
+        return quota_error_response(e)
     except Exception as e:
         # Si ocurre *cualquier* otro error al intentar crear la carpeta (ej. permisos, nombre raro, etc.)...
         # Capturamos el error y lo imprimimos en consola para saber qué pasó.
@@ -96,6 +117,7 @@ def create_file():
     data = request.get_json()
     path = data.get('path', '') # Ruta del directorio padre (puede ser la raíz).
     name = data.get('name', '') # Nombre que queremos para el nuevo archivo.
+    root_name = data.get('root', '') # Raíz de datos donde crearlo (vacío = 'data').
     content = data.get('content', '') # El contenido que tendrá el archivo.
 
     # Validamos que al menos nos den un nombre para el archivo.
@@ -105,12 +127,20 @@ def create_file():
             'message': 'Name is required' # Mensaje para el frontend.
         })
 
+    # La raíz de datos tiene que existir.
+    root = get_root(root_name)
+    if not root:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown data root '{root_name}'"
+        })
+
     # Construimos la ruta COMPLETA y SEGURA para el nuevo archivo, igual que con las carpetas.
     new_file_relative_path = os.path.join(path, name)
-    full_path = get_full_path(new_file_relative_path)
+    full_path = get_full_path(new_file_relative_path, root)
 
     # Verificamos que el directorio padre sea válido y exista, igual que antes.
-    full_parent_path = get_full_path(path)
+    full_parent_path = get_full_path(path, root)
     if not full_parent_path or not os.path.isdir(full_parent_path):
          return jsonify({
             'success': False,
@@ -133,18 +163,33 @@ def create_file():
 
     # ¡Todo validado! Intentamos crear el archivo y escribir el contenido.
     try:
-        # 'with open(...) as f:' es la forma segura de abrir y cerrar archivos en Python.
-        # 'full_path': La ruta donde crear el archivo.
-        # 'w': Modo de escritura ('w' significa "write"). Si el archivo no existe, lo crea; si existe, LO BORRA y crea uno nuevo (¡ojo!).
+        # 'atomic_write' (durable.py) escribe en un archivo temporal de la misma carpeta y, cuando el contenido ya
+        # está en disco, lo publica con el nombre final: nadie ve nunca el archivo a medias y una caída no lo deja truncado.
+        # 'exclusive=True': si alguien creó un archivo con ese nombre mientras tanto, NO lo pisamos (FileExistsError).
         # 'encoding='utf-8'': Es MUY importante especificar la codificación para evitar problemas con caracteres especiales. UTF-8 es el estándar.
-        with open(full_path, 'w', encoding='utf-8') as f:
-            f.write(content) # Escribimos el contenido que nos llegó del frontend en el archivo.
+        # Reservamos en las cuotas el tamaño del contenido (en bytes UTF-8) y un elemento más.
+        with quota_manager.reserve(root, full_path, len(content.encode('utf-8')), 1):
+            with atomic_write(full_path, 'w', encoding='utf-8', exclusive=True) as f:
+                f.write(content) # Escribimos el contenido que nos llegó del frontend en el archivo.
+        notify_change(root.name, full_path) # Los navegadores que miran esta carpeta reciben el evento 'add'.
+        record_mutation('write', root.name, full_path)
 
         # ¡Archivo creado y escrito exitosamente!
         return jsonify({
             'success': True,
             'message': f"File '{name}' created successfully"
         })
+    except QuotaExceeded as e:
+        # El contenido no cabe en la cuota de la carpeta: el archivo no se creó.
+        print(f"Quota exceeded creating file {full_path}: {e.message}")
+        return quota_error_response(e)
+    except FileExistsError:
+        # Otro cliente creó un archivo con el mismo nombre entre la comprobación y la escritura.
+        print(f"File {full_path} was created by someone else while writing it")
+        return jsonify({
+            'success': False,
+            'message': f"File '{name}' already exists in this location"
+        })
     except Exception as e:
         # Si hay algún error al crear o escribir el archivo (ej. permisos, disco lleno, nombre inválido, etc.)...
         # Imprimimos el error en consola.
@@ -1,6 +1,11 @@
-import os # Una vez más, 'os' es nuestro amigo para interactuar con los archivos en el sistema.
-from flask import Blueprint, request, jsonify # Lo usual de Flask: Blueprint para organizar, request para ver qué nos pide el navegador, jsonify para mandar respuestas en JSON.
-from utils import get_full_path # Importamos nuestra función de 'utils' para estar seguros con las rutas. ¡La seguridad primero!
+import mimetypes # Tipo de contenido de los elementos de archivos comprimidos que se descargan.
+from urllib.parse import quote # Nombre del elemento descargado en la cabecera Content-Disposition.
+from flask import Blueprint, Response, request, jsonify # Lo usual de Flask: Blueprint para organizar, request para ver qué nos pide el navegador, jsonify para mandar respuestas en JSON.
+from utils import get_full_path, get_root # Importamos nuestras funciones de 'utils' para saber en qué raíz trabajar.
+from resolver import resolve # Rutas seguras resueltas con un solo stat y abiertas relativas a su directorio padre. ¡La seguridad primero!
+from archives import (ARCHIVE_PREVIEW_MAX_BYTES, ArchiveError, get_index as get_archive_index, # Elementos dentro de .zip/.tar.
+                      iter_member, locate as locate_archive)
+from fileops import file_sha256, file_signature # Checksum de archivos (versión base para los parches) y firmas por bloques.
 
 # Creamos un Blueprint específico para las operaciones relacionadas con el contenido de los archivos.
 # Así mantenemos nuestro código modular y fácil de manejar. Lo llamamos 'file_content_bp'.
@@ -19,21 +24,41 @@ def get_file_content():
     # Obtenemos la ruta del archivo que el frontend nos envía en los parámetros de la URL ('path').
     # Si no viene nada, usamos una cadena vacía, aunque para leer un archivo necesitamos una ruta.
     path = request.args.get('path', '')
+    root_name = request.args.get('root', '') # Raíz de datos donde está el archivo (vacío = 'data').
     # --- Logueo para depurar y ver qué ruta llegó ---
     print(f"\n--- /api/get-file-content ---")
-    print(f"Ruta recibida del frontend: '{path}'")
+    print(f"Ruta recibida del frontend: '{path}' (raíz: '{root_name}')")
+
+    # Comprobamos que la raíz exista.
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/get-file-content: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/get-file-content ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Raíz de datos desconocida: '{root_name}'"
+        })
 
-    # ¡Paso crucial! Usamos 'get_full_path' para convertir la ruta recibida (que es relativa y podría ser maliciosa)
-    # en una ruta completa y segura dentro de nuestra carpeta 'data'. Si la ruta no es válida o intenta salirse,
-    # 'get_full_path' nos dará None.
-    full_path = get_full_path(path)
-    print(f"/api/get-file-content: get_full_path devolvió: '{full_path}'")
+    # ¡Paso crucial! Usamos 'resolve' (resolver.py) para convertir la ruta recibida (que es relativa y podría ser
+    # maliciosa) en una ruta segura dentro de nuestra carpeta 'data'. Además de validarla, abre su directorio padre
+    # (o lo reutiliza de la caché de descriptores) y hace UN SOLO stat que usamos para todas las comprobaciones.
+    # Si la ruta no es válida o intenta salirse, 'resolve' nos dará None.
+    resolved = resolve(path, root)
+    full_path = resolved.full_path if resolved else None
+    print(f"/api/get-file-content: resolve devolvió: '{full_path}'")
 
     # Validamos que la ruta obtenida sea válida Y que el archivo realmente exista en el sistema.
-    # Si 'full_path' es None (ruta inválida) o si 'os.path.exists' dice que no existe...
+    # Si 'resolved' es None (ruta inválida) o si el stat dice que no existe...
     # --- Logueo extra para saber por qué falló ---
     print(f"/api/get-file-content: Verificando existencia de '{full_path}'...")
-    if not full_path or not os.path.exists(full_path):
+    # Si no existe en disco puede ser un elemento dentro de un archivo comprimido (ej: 'copia.zip/docs/leeme.txt').
+    archive_location = locate_archive(root.path, full_path) if resolved and not resolved.exists else None
+    if archive_location and archive_location[1]:
+        resolved.close()
+        return _get_archive_member_content(archive_location)
+    if not resolved or not resolved.exists:
+         if resolved:
+             resolved.close()
          print(f"/api/get-file-content: full_path inválida ('{full_path}') o la ruta NO existe para la ruta del frontend '{path}'. Enviando error.")
          print(f"--- Fin /api/get-file-content ---\n")
          return jsonify({
@@ -43,9 +68,10 @@ def get_file_content():
     print(f"/api/get-file-content: La ruta '{full_path}' existe.")
 
     # Ahora que sabemos que la ruta existe y es segura, ¡tenemos que verificar que sea un ARCHIVO!
-    # No podemos leer el contenido de una carpeta.
+    # No podemos leer el contenido de una carpeta. (Mismo stat de antes: no volvemos a recorrer la ruta).
     print(f"/api/get-file-content: Verificando si '{full_path}' es un archivo...")
-    if not os.path.isfile(full_path):
+    if not resolved.is_file:
+         resolved.close()
          print(f"/api/get-file-content: La ruta completa '{full_path}' NO es un archivo. Enviando error.")
          print(f"--- Fin /api/get-file-content ---\n")
          return jsonify({
@@ -57,11 +83,10 @@ def get_file_content():
     # Si hemos llegado hasta aquí, la ruta es válida, existe y apunta a un archivo. ¡Perfecto!
     # Intentamos leer su contenido. Usamos un bloque try...except por si hay problemas al leer el archivo (ej. permisos).
     try:
-        # Abrimos el archivo de forma segura con 'with open(...) as f:'. Python se encargará de cerrarlo automáticamente.
-        # 'full_path': La ruta del archivo a abrir.
+        # Abrimos el archivo relativo a su directorio padre ya abierto y sin seguir enlaces ('open_file').
         # 'r': Modo de lectura ('read').
         # 'encoding='utf-8'': Vital para leer archivos de texto y manejar correctamente tildes, eñes y otros caracteres.
-        with open(full_path, 'r', encoding='utf-8') as f:
+        with resolved, resolved.open_file('r', encoding='utf-8') as f:
             content = f.read() # Leemos todo el contenido del archivo de una vez.
 
         print(f"/api/get-file-content: Contenido leído exitosamente de '{full_path}'.")
@@ -80,4 +105,168 @@ def get_file_content():
         return jsonify({
             'success': False,
             'message': str(e) # Convertimos el error a cadena para enviarlo.
-        })
\ No newline at end of file
+        })
+
+
+def _open_archive_member(archive_location):
+    """Abre un elemento de un archivo comprimido. Devuelve (lector, tamaño) o lanza ArchiveError."""
+    archive_path, inner = archive_location
+    index = get_archive_index(archive_path)
+    member = index.member(inner, archive_path)
+    if member is None or not member.is_file():
+        raise ArchiveError('Invalid file path or not a file')
+    return index.open(inner), member.size
+
+
+def _get_archive_member_content(archive_location):
+    """Contenido (texto) de un elemento de un archivo comprimido, para la previsualización."""
+    print(f"/api/get-file-content: Leyendo '{archive_location[1]}' del archivo comprimido '{archive_location[0]}'.")
+    try:
+        reader, size = _open_archive_member(archive_location)
+        with reader:
+            if size > ARCHIVE_PREVIEW_MAX_BYTES:
+                raise ArchiveError(f"El elemento es demasiado grande para previsualizarlo ({size} bytes); "
+                                   f"descárgalo con /api/archive_member")
+            data = reader.read(ARCHIVE_PREVIEW_MAX_BYTES + 1)[:ARCHIVE_PREVIEW_MAX_BYTES] # Memoria acotada.
+        content = data.decode('utf-8')
+        print(f"/api/get-file-content: Contenido leído exitosamente del archivo comprimido.")
+        print(f"--- Fin /api/get-file-content ---\n")
+        return jsonify({'success': True, 'content': content})
+    except (ArchiveError, OSError, UnicodeDecodeError) as e:
+        print(f"/api/get-file-content: Error leyendo del archivo comprimido: {e}. Enviando error.")
+        print(f"--- Fin /api/get-file-content ---\n")
+        return jsonify({'success': False, 'message': str(e)})
+
+
+# --- Endpoint para descargar un elemento de un archivo comprimido ---
+# Envía el elemento por bloques según se descomprime: la memoria usada no depende de su tamaño.
+@file_content_bp.route('/api/archive_member')
+def get_archive_member():
+    """
+    Devuelve los bytes de un elemento dentro de un .zip o .tar, ej: path='copia.zip/docs/informe.pdf'.
+    """
+    path = request.args.get('path', '')
+    root = get_root(request.args.get('root', ''))
+    print(f"\n--- /api/archive_member ---")
+    print(f"Ruta recibida del frontend: '{path}'")
+
+    full_path = get_full_path(path, root) if root else None
+    archive_location = locate_archive(root.path, full_path) if full_path else None
+    if not archive_location or not archive_location[1]:
+        print(f"/api/archive_member: '{full_path}' no está dentro de un archivo comprimido. Enviando error.")
+        print(f"--- Fin /api/archive_member ---\n")
+        return jsonify({'success': False, 'message': 'La ruta no está dentro de un archivo comprimido'})
+    try:
+        reader, size = _open_archive_member(archive_location)
+    except (ArchiveError, OSError) as e:
+        print(f"/api/archive_member: {e}. Enviando error.")
+        print(f"--- Fin /api/archive_member ---\n")
+        return jsonify({'success': False, 'message': str(e)})
+
+    name = archive_location[1].rpartition('/')[2]
+    print(f"/api/archive_member: Enviando '{name}' ({size} bytes) del archivo comprimido '{archive_location[0]}'.")
+    print(f"--- Fin /api/archive_member ---\n")
+    response = Response(iter_member(reader), mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+    response.headers['Content-Length'] = str(size)
+    response.headers['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(name)}"
+    return response
+
+
+# --- Endpoint para obtener el checksum de un archivo ---
+# El editor lo usa como "versión base" antes de mandar un parche a /api/patch_file:
+# si el archivo cambia entre medias, el checksum ya no coincide y el parche se rechaza.
+@file_content_bp.route('/api/file_checksum')
+def get_file_checksum():
+    """
+    Devuelve el SHA-256, el tamaño y la fecha de modificación (en ns) de un archivo.
+    """
+    path = request.args.get('path', '')
+    root = get_root(request.args.get('root', ''))
+    print(f"\n--- /api/file_checksum ---")
+    print(f"Ruta recibida del frontend: '{path}'")
+
+    resolved = resolve(path, root) if root else None
+    full_path = resolved.full_path if resolved else None
+    if not resolved or not resolved.is_file:
+        if resolved:
+            resolved.close()
+        print(f"/api/file_checksum: '{full_path}' no es un archivo válido. Enviando error.")
+        print(f"--- Fin /api/file_checksum ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'Invalid file path or not a file'
+        })
+
+    try:
+        # El tamaño y la fecha salen del mismo descriptor con el que calculamos el checksum: siempre coinciden.
+        with resolved, resolved.open_file('rb') as f:
+            checksum = file_sha256(f)
+        stat_result = resolved.st
+        print(f"/api/file_checksum: Checksum calculado para '{full_path}'.")
+        print(f"--- Fin /api/file_checksum ---\n")
+        return jsonify({
+            'success': True,
+            'sha256': checksum,
+            'size': stat_result.st_size,
+            'mtime_ns': stat_result.st_mtime_ns
+        })
+    except OSError as e:
+        print(f"/api/file_checksum: Error leyendo el archivo {full_path}: {e}. Enviando error.")
+        print(f"--- Fin /api/file_checksum ---\n")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+
+
+# --- Endpoint para obtener la firma por bloques de un archivo ---
+# Lo usan las réplicas remotas (replication.py): con la firma de SU copia, el servidor de origen calcula un delta
+# por suma rodante y manda a /api/patch_file solo los bloques que cambiaron.
+@file_content_bp.route('/api/file_signature')
+def get_file_signature():
+    """
+    Devuelve la firma del archivo: {'block_size', 'size', 'blocks': [[suma_débil, suma_fuerte], ...]}.
+    Parámetro opcional 'block_size' (bytes) para elegir el tamaño de bloque.
+    """
+    path = request.args.get('path', '')
+    root = get_root(request.args.get('root', ''))
+    block_size = request.args.get('block_size', '')
+    print(f"\n--- /api/file_signature ---")
+    print(f"Ruta recibida del frontend: '{path}'")
+
+    resolved = resolve(path, root) if root else None
+    full_path = resolved.full_path if resolved else None
+    if not resolved or not resolved.is_file:
+        if resolved:
+            resolved.close()
+        print(f"/api/file_signature: '{full_path}' no es un archivo válido. Enviando error.")
+        print(f"--- Fin /api/file_signature ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'Invalid file path or not a file'
+        })
+    if block_size and (not block_size.isdigit() or not 512 <= int(block_size) <= 1024 * 1024):
+        resolved.close()
+        print(f"/api/file_signature: Tamaño de bloque no válido '{block_size}'. Enviando error.")
+        print(f"--- Fin /api/file_signature ---\n")
+        return jsonify({
+            'success': False,
+            'message': "'block_size' debe estar entre 512 y 1048576 bytes"
+        })
+
+    try:
+        with resolved, resolved.open_file('rb') as f:
+            signature = file_signature(f, int(block_size)) if block_size else file_signature(f)
+        print(f"/api/file_signature: Firma de {len(signature['blocks'])} bloques calculada para '{full_path}'.")
+        print(f"--- Fin /api/file_signature ---\n")
+        return jsonify({
+            'success': True,
+            'signature': signature
+        })
+    except OSError as e:
+        print(f"/api/file_signature: Error leyendo el archivo {full_path}: {e}. Enviando error.")
+        print(f"--- Fin /api/file_signature ---\n")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
@@ -5,7 +5,18 @@ from flask import Blueprint, request, jsonify # Lo básico de Flask: Blueprints
 # Importamos nuestras funciones clave de 'utils.py':
 # - get_full_path: Para asegurarnos de que cualquier ruta que nos llegue del frontend sea segura y esté dentro de nuestra carpeta 'data'.
 # - get_data_dir_abs: Para obtener la ruta absoluta y segura de nuestra carpeta 'data', ¡importante para no borrarla por accidente!
-from utils import get_full_path, get_data_dir_abs
+# - get_root: Para saber en qué raíz de datos ('data', 'archive'...) trabaja cada petición.
+from utils import RootBusyError, get_full_path, get_data_dir_abs, get_root, root_busy_response
+# Y de 'fileops.py' las herramientas para aplicar parches (deltas) sin reescribir el archivo entero desde el cliente.
+from fileops import DeltaConflict, apply_delta, delta_output_size, edits_to_delta
+# Y 'notify_change' para avisar a los clientes suscritos (SSE) de cada cambio.
+from events import notify_change
+# Y 'record_mutation' para anotar cada cambio en el diario que siguen las réplicas (journal.py).
+from journal import record_mutation
+# Y las cuotas de almacenamiento: cada escritura reserva (o libera) su tamaño antes de tocar el disco.
+from quotas import QuotaExceeded, quota_manager, quota_error_response
+# Y 'flush_fd' para que lo añadido esté en disco antes de responder (con group commit, ver durable.py).
+from durable import flush_fd
 
 # Creamos un Blueprint para todas las rutas que modifican el sistema de archivos (añadir contenido, borrar, renombrar).
 # Lo llamamos 'modification_bp'.
@@ -25,6 +36,7 @@ def append_file():
     data = request.get_json()
     path = data.get('path', '') # Obtenemos la ruta del archivo. Si no viene, es una cadena vacía.
     content = data.get('content', '').strip() # Obtenemos el contenido. Usamos .strip() para quitar espacios al inicio/final.
+    root_name = data.get('root', '') # Raíz de datos donde está el archivo (vacío = 'data').
 
     # --- Logueo para ir viendo qué datos nos llegan ---
     print(f"\n--- /api/append_file ---")
@@ -51,9 +63,19 @@ def append_file():
             'message': 'Content cannot be empty'
         })
 
+    # 3. ¿La raíz de datos existe?
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/append_file: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/append_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Unknown data root '{root_name}'"
+        })
+
     # ¡Hora de la seguridad! Convertimos la ruta que nos llegó a una ruta COMPLETA y SEGURA.
     # Si la ruta no es válida o intenta salirse de nuestro 'data_dir', 'get_full_path' devuelve None.
-    full_path = get_full_path(path)
+    full_path = get_full_path(path, root)
     print(f"/api/append_file: get_full_path devolvió: '{full_path}'")
 
     # Seguimos validando la ruta obtenida:
@@ -84,17 +106,25 @@ def append_file():
 
     # ¡Si pasamos todas las validaciones, podemos intentar añadir el contenido!
     try:
+        # Bytes que vamos a añadir (contenido + el salto de línea si el archivo no está vacío): se reservan en la cuota.
+        added_bytes = len(content.encode('utf-8')) + (1 if os.path.getsize(full_path) > 0 else 0)
         # Abrimos el archivo de forma segura con 'with open(...)'.
         # 'full_path': La ruta del archivo.
         # 'a': ¡Este es el modo clave! Es el modo de 'append' (añadir). Abre el archivo para escribir al final. Si no existe, lo crea.
         # 'encoding='utf-8'': Fundamental para manejar texto correctamente.
-        with open(full_path, 'a', encoding='utf-8') as f:
+        with quota_manager.reserve(root, full_path, added_bytes), open(full_path, 'a', encoding='utf-8') as f:
             # Una pequeña mejora: añadimos un salto de línea antes de cada contenido que añadimos.
             # Pero solo si el archivo YA tiene algo, para que no empiece con un salto de línea vacío.
             # 'os.path.getsize' nos da el tamaño del archivo en bytes. Si es mayor que 0, tiene contenido.
             if os.path.getsize(full_path) > 0:
                  f.write('\n') # Añadimos un salto de línea.
             f.write(content) # Escribimos el contenido que nos llegó.
+            # Añadir se hace en el mismo archivo (no con temporal + rename): así no se copia el archivo entero en
+            # cada llamada y quien lo sigue con /api/tail (por inodo) sigue viendo el mismo archivo.
+            f.flush()
+            flush_fd(f.fileno())
+        notify_change(root.name, full_path) # Evento 'modify' para quien esté mirando la carpeta.
+        record_mutation('write', root.name, full_path)
 
         print(f"/api/append_file: Contenido añadido exitosamente a '{full_path}'.")
         print(f"--- Fin /api/append_file ---\n")
@@ -103,6 +133,11 @@ def append_file():
             'success': True,
             'message': f"Content appended to '{os.path.basename(path)}' successfully"
         })
+    except QuotaExceeded as e:
+        # La cuota de la carpeta no deja añadir tanto contenido: no se escribió nada.
+        print(f"/api/append_file: {e.message}. Enviando error.")
+        print(f"--- Fin /api/append_file ---\n")
+        return quota_error_response(e)
     except OSError as e:
         # Capturamos errores específicos del sistema operativo (ej. permisos, disco lleno).
         # Es bueno diferenciar estos de otros errores generales.
@@ -139,6 +174,7 @@ def delete_item():
     # Obtenemos los datos JSON. Esperamos 'path' (la ruta del elemento a borrar).
     data = request.get_json()
     path = data.get('path', '') # La ruta del archivo o carpeta a eliminar.
+    root_name = data.get('root', '') # Raíz de datos donde está (vacío = 'data').
 
     # --- Logueo para ver qué elemento quieren borrar ---
     print(f"\n--- /api/delete ---")
@@ -153,8 +189,18 @@ def delete_item():
             'message': 'Path is required'
         })
 
+    # Comprobamos que la raíz exista.
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/delete: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/delete ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Unknown data root '{root_name}'"
+        })
+
     # Obtenemos la ruta COMPLETA y SEGURA del elemento a borrar.
-    full_path = get_full_path(path)
+    full_path = get_full_path(path, root)
     print(f"/api/delete: get_full_path devolvió: '{full_path}'")
 
     # Si 'get_full_path' devolvió None, la ruta no es válida o segura.
@@ -183,7 +229,12 @@ def delete_item():
         # Comprobamos si es un archivo...
         if os.path.isfile(full_path):
             print(f"/api/delete: Intentando borrar archivo: '{full_path}'")
+            freed = quota_manager.usage_of(root, full_path) # Lo que libera en la cuota (None si no hay cuota).
             os.remove(full_path) # Usamos os.remove() para borrar archivos.
+            if freed:
+                quota_manager.release(root, full_path, *freed)
+            notify_change(root.name, full_path) # Evento 'remove' para quien esté mirando la carpeta.
+            record_mutation('delete', root.name, full_path)
             print(f"/api/delete: Archivo '{full_path}' borrado exitosamente.")
             print(f"--- Fin /api/delete ---\n")
             # Mandamos éxito con el nombre del archivo borrado.
@@ -194,11 +245,11 @@ def delete_item():
         # ...o si es un directorio.
         elif os.path.isdir(full_path):
             print(f"/api/delete: Intentando borrar directorio: '{full_path}'")
-            # ¡PELIGRO! No queremos que alguien pueda borrar nuestra carpeta raíz 'data'.
-            # Comparamos la ruta que quieren borrar con la ruta absoluta y segura de 'data_dir'.
+            # ¡PELIGRO! No queremos que alguien pueda borrar nuestra carpeta raíz 'data' (ni ninguna otra raíz).
+            # Comparamos la ruta que quieren borrar con la ruta absoluta y segura de la raíz.
             # --- Usamos nuestra función segura para obtener la ruta de DATA_DIR ---
             try:
-                data_dir_abs = get_data_dir_abs() # Obtenemos la ruta absoluta y verificada de DATA_DIR.
+                data_dir_abs = get_data_dir_abs(root) # Obtenemos la ruta absoluta y verificada de la raíz.
             except RuntimeError as e:
                  # Si no se inicializó DATA_DIR, es un error interno grave.
                  print(f"/api/delete: Error obteniendo la ruta absoluta de DATA_DIR: {e}. Enviando error.")
@@ -217,8 +268,18 @@ def delete_item():
                     'message': 'Cannot delete the root directory' # Mensaje de seguridad.
                 })
             # Si no es la raíz, ¡usamos shutil.rmtree para borrar el directorio y TODO lo que hay dentro!
-            # Esta función es recursiva.
-            shutil.rmtree(full_path)
+            # Esta función es recursiva. Ocupamos un hueco de la raíz: borrar árboles grandes es trabajo pesado.
+            with root.slot():
+                freed = quota_manager.usage_of(root, full_path) # Solo se mide si alguna cuota abarca el directorio.
+                try:
+                    shutil.rmtree(full_path)
+                finally:
+                    if freed:
+                        # Si rmtree falló a medias, liberamos solo lo que de verdad se borró.
+                        remaining = quota_manager.usage_of(root, full_path) if os.path.exists(full_path) else (0, 0)
+                        quota_manager.release(root, full_path, freed[0] - remaining[0], freed[1] - remaining[1])
+            notify_change(root.name, full_path) # Evento 'remove' para quien esté mirando la carpeta.
+            record_mutation('delete', root.name, full_path)
             print(f"/api/delete: Directorio '{full_path}' borrado exitosamente (incluyendo contenido).")
             print(f"--- Fin /api/delete ---\n")
             # Mandamos éxito con el nombre del directorio borrado.
@@ -235,6 +296,11 @@ def delete_item():
                 'success': False,
                 'message': 'Item is neither a file nor a directory'
             })
+    except RootBusyError as e:
+        # La raíz tiene todos sus huecos ocupados: 503 al momento, el cliente reintenta.
+        print(f"/api/delete: {e.message}. Enviando 503.")
+        print(f"--- Fin /api/delete ---\n")
+        return root_busy_response(e)
     except OSError as e:
         # Capturamos errores del sistema operativo al borrar (ej. permisos, archivo en uso).
         # --- Logueo robusto y traceback ---
@@ -284,6 +350,8 @@ def rename_item():
 
         old_path = data.get('oldPath', '').strip() # La ruta original del elemento. Usamos strip().
         new_name = data.get('newName', '').strip() # El nuevo nombre deseado. Usamos strip().
+        root_name = data.get('root', '') # Raíz de datos donde está el elemento (vacío = 'data').
+        full_old_path = full_new_path = None # Las definimos ya para que los 'except' de abajo siempre puedan loguearlas.
 
         # --- Logueo para ver qué nos llegó ---
         print(f"\n--- /api/rename_item ---")
@@ -309,6 +377,16 @@ def rename_item():
                 'message': 'El nuevo nombre no puede estar vacío'
             })
 
+        # 3. ¿La raíz de datos existe?
+        root = get_root(root_name)
+        if not root:
+            print(f"/api/rename_item: Raíz desconocida '{root_name}'. Enviando error.")
+            print(f"--- Fin /api/rename_item ---\n")
+            return jsonify({
+                'success': False,
+                'message': f"Raíz de datos desconocida: '{root_name}'"
+            })
+
         # Para renombrar DENTRO del mismo directorio, necesitamos saber cuál es ese directorio padre.
         # 'os.path.dirname()' nos da la parte del "directorio" de una ruta.
         parent_dir_of_old_path = os.path.dirname(old_path)
@@ -322,8 +400,8 @@ def rename_item():
         # Ahora, ¡obtenemos las rutas COMPLETA y SEGURA para AMBOS caminos!
         # Es crucial que la NUEVA ruta también pase por 'get_full_path' para asegurar que no estamos renombrando
         # hacia una ubicación fuera de 'data_dir' usando '..'.
-        full_old_path = get_full_path(old_path) # Ruta completa y segura del elemento original.
-        full_new_path = get_full_path(new_path_in_same_dir) # Ruta completa y segura del elemento con el nuevo nombre.
+        full_old_path = get_full_path(old_path, root) # Ruta completa y segura del elemento original.
+        full_new_path = get_full_path(new_path_in_same_dir, root) # Ruta completa y segura del elemento con el nuevo nombre.
 
         print(f"/api/rename_item: get_full_path(old_path) devolvió: '{full_old_path}'")
         print(f"/api/rename_item: get_full_path(new_path_in_same_dir) devolvió: '{full_new_path}'")
@@ -374,7 +452,12 @@ def rename_item():
 
         # Si pasamos todas las validaciones... ¡a renombrar!
         print(f"/api/rename_item: Intentando renombrar '{full_old_path}' a '{full_new_path}'")
-        os.rename(full_old_path, full_new_path) # Usamos os.rename() para renombrar.
+        # Si el elemento pasa a estar bajo otra cuota (o deja de estarlo), su uso se traslada con él.
+        with quota_manager.moving(root, full_old_path, root, full_new_path):
+            os.rename(full_old_path, full_new_path) # Usamos os.rename() para renombrar.
+        notify_change(root.name, full_old_path) # Evento 'remove' del nombre viejo...
+        notify_change(root.name, full_new_path) # ...y 'add' del nuevo (si no los emitió ya la llamada anterior).
+        record_mutation('rename', root.name, full_old_path, to_path=full_new_path)
         print(f"/api/rename_item: Renombrado exitoso de '{full_old_path}' a '{full_new_path}'.")
         print(f"--- Fin /api/rename_item ---\n")
 
@@ -383,6 +466,10 @@ def rename_item():
             'success': True,
             'message': f'Renombrado exitosamente "{os.path.basename(old_path)}" a "{new_name}"'
         })
+    except QuotaExceeded as e:
+        print(f"/api/rename_item: {e.message}. Enviando error.")
+        print(f"--- Fin /api/rename_item ---\n")
+        return quota_error_response(e)
     except OSError as e:
         # Capturamos errores del sistema operativo al renombrar (ej. permisos, archivo en uso).
         # --- Logueo robusto y traceback ---
@@ -407,4 +494,134 @@ def rename_item():
         return jsonify({
             'success': False,
             'message': f'Error inesperado: {str(e)}' # Mensaje general.
-        })
\ No newline at end of file
+        })
+
+
+# --- Endpoint para aplicar un parche (delta) a un archivo ---
+# Esta ruta responde a peticiones POST en '/api/patch_file'.
+# Sirve para editar archivos grandes mandando SOLO los cambios, no el archivo entero.
+@modification_bp.route('/api/patch_file', methods=['POST'])
+def patch_file():
+    """
+    Aplica cambios a un archivo existente sin reenviar todo su contenido.
+    Acepta dos formatos (uno de los dos):
+    - 'edits': reemplazos por rangos de bytes [{'offset', 'length', 'data' | 'data_b64'}, ...].
+    - 'delta': operaciones estilo rsync [{'copy': [offset, length]} | {'data': ...} | {'data_b64': ...}, ...].
+    Opcionalmente 'base_sha256' y/o 'base_size': si el archivo actual no coincide, el parche se rechaza
+    (el cliente editó una versión que ya no existe). El resultado se escribe en un temporal y se renombra atómicamente.
+    """
+    data = request.get_json(silent=True)
+    print(f"\n--- /api/patch_file ---")
+    if not data:
+        print(f"/api/patch_file: Datos vacíos o no JSON. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'Datos no válidos'
+        })
+
+    path = data.get('path', '') # Ruta del archivo a modificar.
+    root_name = data.get('root', '') # Raíz de datos donde está el archivo (vacío = 'data').
+    edits = data.get('edits') # Reemplazos por rangos de bytes.
+    delta = data.get('delta') # O bien, operaciones delta ya preparadas.
+    base_sha256 = data.get('base_sha256') # Checksum del archivo sobre el que el cliente calculó los cambios.
+    base_size = data.get('base_size') # Tamaño del archivo base (comprobación barata).
+
+    print(f"Ruta recibida del frontend: '{path}' (raíz: '{root_name}')")
+
+    if not path:
+        print(f"/api/patch_file: La ruta está vacía. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'Path is required'
+        })
+
+    # Tiene que venir exactamente uno de los dos formatos.
+    if (edits is None) == (delta is None) or not isinstance(edits if edits is not None else delta, list):
+        print(f"/api/patch_file: Se esperaba 'edits' o 'delta' (una lista). Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': "Se esperaba 'edits' o 'delta' (una lista de operaciones)"
+        })
+
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/patch_file: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Unknown data root '{root_name}'"
+        })
+
+    full_path = get_full_path(path, root)
+    print(f"/api/patch_file: get_full_path devolvió: '{full_path}'")
+    if not full_path or not os.path.isfile(full_path):
+        print(f"/api/patch_file: '{full_path}' no es un archivo válido. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': 'Invalid file path or item is not a file'
+        })
+
+    try:
+        # Comprobación barata antes de nada: si el tamaño ya no es el que el cliente editó, ni lo intentamos.
+        current_size = os.path.getsize(full_path)
+        if base_size is not None and int(base_size) != current_size:
+            print(f"/api/patch_file: Tamaño base {base_size} != actual {current_size}. Enviando error.")
+            print(f"--- Fin /api/patch_file ---\n")
+            return jsonify({
+                'success': False,
+                'conflict': True,
+                'message': 'El archivo cambió desde que lo abriste (tamaño distinto)'
+            })
+
+        # Los reemplazos por rangos se convierten al mismo formato delta.
+        ops = edits_to_delta(edits, current_size) if edits is not None else delta
+        # Reservamos en la cuota lo que crece el archivo. Si encoge, 'growth' es negativo y el espacio
+        # se libera ya al reservar (y se vuelve a sumar si el parche falla).
+        growth = delta_output_size(ops) - current_size
+        with quota_manager.reserve(root, full_path, growth):
+            # El tamaño y el checksum se comprueban otra vez sobre el descriptor del que se copia:
+            # si alguien escribe entre medias, el parche se rechaza en vez de pisar su cambio.
+            result = apply_delta(full_path, ops, base_size=current_size, base_sha256=base_sha256)
+        notify_change(root.name, full_path) # Evento 'modify' para quien esté mirando la carpeta.
+        record_mutation('write', root.name, full_path)
+        print(f"/api/patch_file: Parche aplicado a '{full_path}': {result}")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': True,
+            'message': f"Cambios guardados en '{os.path.basename(path)}'",
+            'size': result['size'],
+            'copied_bytes': result['copied_bytes'],
+            'literal_bytes': result['literal_bytes']
+        })
+    except QuotaExceeded as e:
+        print(f"/api/patch_file: {e.message}. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return quota_error_response(e)
+    except DeltaConflict as e:
+        print(f"/api/patch_file: {e.message}. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'conflict': True,
+            'message': e.message
+        })
+    except (ValueError, TypeError, KeyError) as e:
+        # Operaciones mal formadas (rangos fuera del archivo, base64 inválido...).
+        print(f"/api/patch_file: Parche no válido para {full_path}: {e}. Enviando error.")
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': f'Parche no válido: {str(e)}'
+        })
+    except OSError as e:
+        print(f"/api/patch_file: OS Error aplicando el parche a {full_path}: {e}. Enviando error.")
+        traceback.print_exc()
+        print(f"--- Fin /api/patch_file ---\n")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
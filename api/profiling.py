@@ -0,0 +1,55 @@
+# api/profiling.py
+import io # Para generar el resumen en texto de un pstats.
+import pstats # Formato estándar de cProfile (se puede abrir con snakeviz, pstats, etc.).
+from flask import Blueprint, request, jsonify, Response # Lo básico de Flask, y Response para los perfiles en texto o binario.
+from profiling import is_authorized, store # Búfer circular de perfiles en disco y comprobación del token.
+
+# Blueprint para consultar los perfiles de peticiones guardados por profiling.py.
+# Todas las rutas exigen la cabecera 'X-Profile' con el token de FILES_MANAGER_PROFILE_TOKEN.
+profiling_bp = Blueprint('profiling_bp', __name__)
+
+
+def _forbidden():
+    return jsonify({'success': False, 'message': 'No autorizado (hace falta la cabecera X-Profile con el token)'}), 403
+
+
+# --- Endpoint para listar los perfiles guardados ---
+@profiling_bp.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """Lista los perfiles guardados (los más recientes primero)."""
+    if not is_authorized():
+        return _forbidden()
+    return jsonify({'success': True, 'profiles': store.list()})
+
+
+# --- Endpoint para descargar un perfil ---
+@profiling_bp.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Descarga un perfil. 'format': 'collapsed' (pilas colapsadas, perfiles por muestreo), 'pstats' (binario de
+    cProfile) o 'text' (resumen de pstats ordenado por tiempo acumulado).
+    """
+    if not is_authorized():
+        return _forbidden()
+    fmt = request.args.get('format', '')
+    if not fmt:
+        fmt = 'collapsed' if store.path(profile_id, '.folded') else 'text'
+    if fmt == 'collapsed':
+        full = store.path(profile_id, '.folded')
+        if full:
+            with open(full, 'r', encoding='utf-8') as f:
+                return Response(f.read(), mimetype='text/plain')
+    elif fmt in ('pstats', 'text'):
+        full = store.path(profile_id, '.pstats')
+        if full and fmt == 'pstats':
+            with open(full, 'rb') as f:
+                response = Response(f.read(), mimetype='application/octet-stream')
+            response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}.pstats"'
+            return response
+        if full:
+            out = io.StringIO()
+            pstats.Stats(full, stream=out).sort_stats('cumulative').print_stats(50)
+            return Response(out.getvalue(), mimetype='text/plain')
+    else:
+        return jsonify({'success': False, 'message': f"Formato no válido: '{fmt}'. Disponibles: collapsed, pstats, text"})
+    return jsonify({'success': False, 'message': f"Perfil '{profile_id}' no encontrado en formato '{fmt}'"}), 404
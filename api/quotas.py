@@ -0,0 +1,55 @@
+# api/quotas.py
+from flask import Blueprint, request, jsonify # Lo básico de Flask: Blueprint, datos de la petición y respuestas JSON.
+from quotas import quota_manager # Registro de cuotas con sus contadores de uso.
+from jobs import create_job, start_job # La reconciliación recorre árboles enteros: se ejecuta como trabajo en segundo plano.
+
+# Blueprint para consultar las cuotas de almacenamiento y forzar su reconciliación con el disco.
+quotas_bp = Blueprint('quotas_bp', __name__)
+
+
+# --- Endpoint para consultar las cuotas ---
+@quotas_bp.route('/api/quotas', methods=['GET'])
+def list_quotas():
+    """
+    Devuelve las cuotas configuradas con su límite y su uso actual.
+    Es solo leer los contadores en memoria (no recorre ningún directorio), así que es instantáneo.
+    Parámetro opcional 'root' para ver solo las cuotas de una raíz.
+    """
+    root_name = request.args.get('root', '')
+    quotas = [q for q in quota_manager.list() if not root_name or q['root'] == root_name]
+    return jsonify({'success': True, 'quotas': quotas})
+
+
+# --- Endpoint para reconciliar las cuotas ---
+@quotas_bp.route('/api/quotas/reconcile', methods=['POST'])
+def reconcile_quotas():
+    """
+    Vuelve a medir en disco los subárboles con cuota y corrige los contadores (ej: tras cambios hechos fuera de la aplicación).
+    Acepta opcionalmente {'keys': ['data/usuarios/ana', ...]} para reconciliar solo esas cuotas.
+    Devuelve un 'job_id' para consultar el resultado en /api/jobs/<id>.
+    """
+    print(f"\n--- /api/quotas/reconcile ---")
+    data = request.get_json(silent=True) or {}
+    keys = data.get('keys') or None
+    known = {q['key'] for q in quota_manager.list()}
+    if keys is not None:
+        unknown = [k for k in keys if k not in known]
+        if unknown:
+            print(f"/api/quotas/reconcile: Cuotas desconocidas: {unknown}. Enviando error.")
+            print(f"--- Fin /api/quotas/reconcile ---\n")
+            return jsonify({'success': False, 'message': f"Cuotas desconocidas: {', '.join(unknown)}"})
+    if not known:
+        print(f"/api/quotas/reconcile: No hay cuotas configuradas.")
+        print(f"--- Fin /api/quotas/reconcile ---\n")
+        return jsonify({'success': False, 'message': 'No hay cuotas configuradas'})
+
+    job = create_job('quota_reconcile', 'Reconciliar cuotas')
+    start_job(job, _run_reconcile, keys)
+    print(f"/api/quotas/reconcile: Trabajo {job.id} iniciado ({'todas' if keys is None else ', '.join(keys)}).")
+    print(f"--- Fin /api/quotas/reconcile ---\n")
+    return jsonify({'success': True, 'job_id': job.id, 'message': 'Reconciliación de cuotas iniciada'})
+
+
+def _run_reconcile(job, keys):
+    results = quota_manager.reconcile(keys)
+    job.finish(f"{len(results)} cuota(s) reconciliadas", result={'quotas': results})
@@ -0,0 +1,183 @@
+# api/replace.py
+import os # Rutas relativas y tamaños de los archivos reescritos.
+from concurrent.futures import FIRST_COMPLETED, wait # Recogemos resultados del pool según van terminando.
+from concurrent.futures.process import BrokenProcessPool # Un proceso del pool murió (ej: sin memoria).
+from flask import Blueprint, request, jsonify # Lo básico de Flask: Blueprint, datos de la petición y respuestas JSON.
+from utils import get_full_path, get_root # Rutas seguras dentro de la raíz.
+from jobs import create_job, start_job # El reemplazo recorre árboles enteros: se ejecuta como trabajo en segundo plano.
+from walker import walk # Recorrido paralelo para encontrar los archivos candidatos.
+from events import notify_change # Evento 'modify' para quien esté mirando la carpeta de cada archivo cambiado.
+from journal import record_mutation # Cada archivo reescrito se anota en el diario que siguen las réplicas.
+from quotas import QuotaExceeded, quota_manager # Un reemplazo más largo que el original hace crecer el archivo.
+from replace import (REPLACE_INFLIGHT_PER_PROCESS, REPLACE_MAX_PROCESSES, commit_rewrite, compile_check,
+                     discard_rewrite, get_pool, matches_glob, process_file, reset_pool)
+
+# Blueprint para buscar y reemplazar texto en muchos archivos a la vez.
+replace_bp = Blueprint('replace_bp', __name__)
+
+REPLACE_MAX_LISTED = 1000 # Archivos (con su número de coincidencias) que se devuelven como mucho en el resultado.
+
+
+# --- Endpoint para buscar y reemplazar ---
+@replace_bp.route('/api/replace', methods=['POST'])
+def replace_endpoint():
+    """
+    Busca 'find' y lo cambia por 'replace' en todos los archivos bajo 'path' (un archivo o una carpeta).
+    JSON: {'root', 'path', 'find', 'replace', 'regex': false, 'ignore_case': false,
+           'glob': '*.conf' o ['*.conf', 'etc/*.yml'], 'dry_run': false}
+    Con 'regex', 'replace' admite referencias a grupos (\\1, \\g<nombre>). Con 'dry_run' no se escribe nada y el
+    resultado trae cuántas coincidencias hay en cada archivo.
+    Devuelve un 'job_id' para consultar el progreso y el resultado en /api/jobs/<id>.
+    """
+    print(f"\n--- /api/replace ---")
+    data = request.get_json(silent=True)
+    if not data:
+        print(f"/api/replace: Datos no válidos. Enviando error.")
+        print(f"--- Fin /api/replace ---\n")
+        return jsonify({'success': False, 'message': 'Datos no válidos'})
+
+    path = data.get('path', '')
+    find = data.get('find', '')
+    replacement = data.get('replace', '')
+    is_regex = bool(data.get('regex', False))
+    ignore_case = bool(data.get('ignore_case', False))
+    dry_run = bool(data.get('dry_run', False))
+    globs = data.get('glob') or []
+    if isinstance(globs, str):
+        globs = [globs]
+    print(f"/api/replace: path='{path}', find='{find}', regex={is_regex}, glob={globs}, dry_run={dry_run}")
+
+    if not isinstance(find, str) or not find:
+        print(f"/api/replace: Falta el texto a buscar. Enviando error.")
+        print(f"--- Fin /api/replace ---\n")
+        return jsonify({'success': False, 'message': "'find' es obligatorio"})
+    if not isinstance(replacement, str) or not all(isinstance(g, str) for g in globs):
+        print(f"/api/replace: 'replace' o 'glob' no válidos. Enviando error.")
+        print(f"--- Fin /api/replace ---\n")
+        return jsonify({'success': False, 'message': "'replace' debe ser texto y 'glob' un patrón o una lista de patrones"})
+    pattern_error = compile_check(find, is_regex, ignore_case)
+    if pattern_error:
+        print(f"/api/replace: {pattern_error}. Enviando error.")
+        print(f"--- Fin /api/replace ---\n")
+        return jsonify({'success': False, 'message': pattern_error})
+
+    root = get_root(data.get('root', ''))
+    full_path = get_full_path(path, root) if root else None
+    if not full_path or not os.path.exists(full_path):
+        print(f"/api/replace: Ruta no válida '{full_path}'. Enviando error.")
+        print(f"--- Fin /api/replace ---\n")
+        return jsonify({'success': False, 'message': 'Ruta no válida o no existe'})
+
+    description = f"{'Contar' if dry_run else 'Reemplazar'} '{find}' en '{path or root.name}'"
+    job = create_job('replace', description)
+    start_job(job, _run_replace, root, full_path, find.encode('utf-8'), replacement.encode('utf-8'),
+              is_regex, ignore_case, dry_run, globs)
+    print(f"/api/replace: Trabajo {job.id} iniciado.")
+    print(f"--- Fin /api/replace ---\n")
+    return jsonify({'success': True, 'job_id': job.id, 'message': f"{description} iniciado"})
+
+
+def _candidates(root, full_path, globs):
+    """Archivos normales bajo 'full_path' que cumplen los patrones (los enlaces simbólicos no se tocan)."""
+    if not os.path.isdir(full_path):
+        if os.path.isfile(full_path) and not os.path.islink(full_path):
+            yield full_path, os.path.getsize(full_path)
+        return
+    for item in walk(full_path, max_workers=root.max_workers):
+        if item.is_dir or item.is_symlink:
+            continue
+        rel_path = os.path.relpath(item.path, full_path).replace(os.sep, '/')
+        if not matches_glob(globs, item.name, rel_path):
+            continue
+        try:
+            size = item.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        yield item.path, size
+
+
+def _run_replace(job, root, full_path, find, replacement, is_regex, ignore_case, dry_run, globs):
+    summary = {'dry_run': dry_run, 'files_scanned': 0, 'files_matched': 0, 'replacements': 0,
+               'skipped_binary': 0, 'files': [], 'errors': [], 'truncated': False}
+
+    def listed(result):
+        return os.path.relpath(result['path'], root.path).replace(os.sep, '/')
+
+    def failed(result, message):
+        if len(summary['errors']) < REPLACE_MAX_LISTED:
+            summary['errors'].append({'path': listed(result), 'message': message})
+        else:
+            summary['truncated'] = True
+
+    def collect(result):
+        """Procesa el resultado de un archivo (en el hilo del trabajo: aquí sí se tocan cuotas, eventos y diario)."""
+        summary['files_scanned'] += 1
+        status = result['status']
+        if status == 'binary':
+            summary['skipped_binary'] += 1
+        elif status == 'error':
+            failed(result, result['message'])
+        elif status in ('match', 'rewritten'):
+            if status == 'rewritten':
+                growth = result['new_size'] - result['size']
+                try:
+                    quota_manager.charge(root, result['path'], growth) # Si encoge, la cuota recupera espacio.
+                except QuotaExceeded as e:
+                    discard_rewrite(result)
+                    failed(result, e.message)
+                    return result.get('size', 0)
+                error = commit_rewrite(result)
+                if error:
+                    quota_manager.release(root, result['path'], growth)
+                    failed(result, error)
+                    return result.get('size', 0)
+                notify_change(root.name, result['path'])
+                record_mutation('write', root.name, result['path'])
+            summary['files_matched'] += 1
+            summary['replacements'] += result['count']
+            if len(summary['files']) < REPLACE_MAX_LISTED:
+                summary['files'].append({'path': listed(result), 'count': result['count']})
+            else:
+                summary['truncated'] = True
+        return result.get('size', 0)
+
+    def finish(future):
+        """
+        Saca 'future' de los pendientes y procesa su resultado. Los que aún no se sacaron siguen en 'inflight', así
+        que si algo falla aquí, el bloque 'finally' borra sus temporales (y este se borra antes de propagar el error).
+        """
+        inflight.discard(future)
+        result = future.result()
+        try:
+            return collect(result)
+        except BaseException:
+            discard_rewrite(result)
+            raise
+
+    # Encargamos los archivos al pool poco a poco (como mucho REPLACE_INFLIGHT_PER_PROCESS por proceso):
+    # el recorrido y el reemplazo avanzan a la vez y nunca hay miles de tareas esperando en memoria.
+    pool = get_pool()
+    inflight = set()
+    max_inflight = REPLACE_MAX_PROCESSES * REPLACE_INFLIGHT_PER_PROCESS
+    try:
+        for candidate, size in _candidates(root, full_path, globs):
+            job.add_total(items=1, nbytes=size)
+            inflight.add(pool.submit(process_file, candidate, find, replacement, is_regex, ignore_case, dry_run))
+            if len(inflight) >= max_inflight:
+                done = wait(inflight, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    job.advance(items=1, nbytes=finish(future))
+        for future in list(inflight):
+            job.advance(items=1, nbytes=finish(future))
+    except BrokenProcessPool:
+        reset_pool()
+        raise
+    finally:
+        # Si el trabajo falló a medias, los temporales ya escritos que nadie va a usar se borran.
+        pending = [future for future in inflight if not future.cancel()]
+        for future in wait(pending).done:
+            if future.exception() is None:
+                discard_rewrite(future.result())
+
+    verb = 'coincidencias encontradas' if dry_run else 'reemplazos hechos'
+    job.finish(f"{summary['replacements']} {verb} en {summary['files_matched']} archivo(s)", result=summary)
@@ -0,0 +1,39 @@
+# api/replication.py
+from flask import Blueprint, jsonify # Lo básico de Flask: Blueprint y respuestas JSON.
+from replication import replication # Replicadores configurados en 'replication.json'.
+from journal import journal # Para mostrar la última secuencia del diario.
+
+# Blueprint para consultar el estado de las réplicas y pedir una puesta al día completa.
+replication_bp = Blueprint('replication_bp', __name__)
+
+
+# --- Endpoint para consultar el estado de la replicación ---
+@replication_bp.route('/api/replication', methods=['GET'])
+def replication_status():
+    """
+    Devuelve cada réplica con su último registro aplicado, cuántos registros va por detrás y el retraso en segundos.
+    """
+    return jsonify({
+        'success': True,
+        'journal': {'enabled': journal.enabled, 'head': journal.head, 'first_seq': journal.first_seq()},
+        'replicas': replication.status()
+    })
+
+
+# --- Endpoint para forzar una puesta al día completa ---
+@replication_bp.route('/api/replication/<name>/resync', methods=['POST'])
+def resync_replica(name):
+    """
+    Pide al replicador 'name' que compare toda la raíz con la réplica (ej: si alguien tocó la réplica a mano).
+    La hace el propio hilo del replicador; el progreso se ve en GET /api/replication.
+    """
+    print(f"\n--- /api/replication/{name}/resync ---")
+    replicator = replication.get(name)
+    if replicator is None:
+        print(f"/api/replication: Réplica desconocida '{name}'. Enviando error.")
+        print(f"--- Fin /api/replication/{name}/resync ---\n")
+        return jsonify({'success': False, 'message': f"Réplica desconocida: '{name}'"})
+    replicator.request_resync()
+    print(f"/api/replication: Puesta al día completa pedida para '{name}'.")
+    print(f"--- Fin /api/replication/{name}/resync ---\n")
+    return jsonify({'success': True, 'message': f"Puesta al día completa de '{name}' solicitada"})
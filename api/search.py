@@ -1,6 +1,10 @@
 import os # Necesitamos 'os' para interactuar con el sistema de archivos, ¡especialmente para buscar directorios y archivos de forma recursiva!
 from flask import Blueprint, request, jsonify # Lo de siempre de Flask: Blueprint para organizar, request para coger los datos de la búsqueda y jsonify para la respuesta JSON.
-from utils import get_full_path # Importamos get_full_path para verificar y convertir la ruta de inicio de la búsqueda a una ruta absoluta y segura.
+from utils import RootBusyError, get_full_path, get_root, root_busy_response # Importamos get_full_path para verificar y convertir la ruta de inicio de la búsqueda a una ruta absoluta y segura, y get_root para saber en qué raíz buscar.
+from sorting import parse_sort_args, select_sorted, sort_key # Orden configurable (sort/order/top) de los resultados.
+from compact import FORMAT_JSON, entry_flags, make_response, negotiate_format # Formatos compactos para muchos resultados.
+from walker import walk # Recorrido paralelo de directorios (varias carpetas leídas a la vez).
+from search_cache import SEARCH_CACHE_MAX_CANDIDATES, lookup, search_session, store # Reutilizar búsquedas mientras se escribe.
 
 # Creamos un Blueprint específico para las funcionalidades de búsqueda.
 # Lo llamamos 'search_bp'. Esto nos ayuda a mantener el código ordenado por temática.
@@ -20,6 +24,8 @@ def search_files():
     search_term = request.args.get('term', '').lower()
     # También obtenemos la ruta desde donde empezar la búsqueda ('path'). Si no viene, asumimos la raíz.
     current_path = request.args.get('path', '')
+    # Y la raíz de datos donde buscar (vacío = 'data').
+    root_name = request.args.get('root', '')
 
     # --- Logueo para ver qué término y ruta de inicio nos llegaron ---
     print(f"\n--- /api/search ---")
@@ -35,9 +41,33 @@ def search_files():
             'message': 'Por favor, ingrese un término de búsqueda' # Mensaje para el usuario.
         })
 
+    # Leemos cómo quiere el cliente los resultados: orden (sort/order) y cuántos como máximo (top).
+    sort_spec, sort_error = parse_sort_args(request.args)
+    if sort_error:
+        print(f"/api/search: {sort_error}. Enviando error.")
+        print(f"--- Fin /api/search ---\n")
+        return jsonify({'success': False, 'message': sort_error})
+
+    # Formato de la respuesta: JSON de siempre, compacto por columnas o binario (msgpack).
+    response_format, format_error = negotiate_format(request)
+    if format_error:
+        print(f"/api/search: {format_error}. Enviando error.")
+        print(f"--- Fin /api/search ---\n")
+        return jsonify({'success': False, 'message': format_error})
+
+    # Comprobamos que la raíz pedida exista.
+    root = get_root(root_name)
+    if not root:
+        print(f"/api/search: Raíz desconocida '{root_name}'. Enviando error.")
+        print(f"--- Fin /api/search ---\n")
+        return jsonify({
+            'success': False,
+            'message': f"Raíz de datos desconocida: '{root_name}'"
+        })
+
     # Validamos y convertimos la ruta de inicio de la búsqueda a una ruta COMPLETA y SEGURA.
     # Si la ruta del frontend era "mala", 'get_full_path' devolverá None.
-    full_current_path = get_full_path(current_path)
+    full_current_path = get_full_path(current_path, root)
     print(f"/api/search: get_full_path devolvió: '{full_current_path}'")
 
     # Si la ruta de inicio de la búsqueda no es válida, mandamos un error.
@@ -62,70 +92,124 @@ def search_files():
 
     # Si todo lo anterior está bien, ¡podemos empezar la búsqueda!
     try:
-        # Creamos una lista vacía donde guardaremos todos los resultados que coincidan.
-        matches = []
         # --- ¡La magia de la búsqueda recursiva! ---
-        # 'os.walk()' es una función increíble que recorre un directorio
-        # Y TODOS sus subdirectorios, uno por uno.
-        # En cada iteración, nos da:
-        # - 'root': La ruta del directorio actual que está visitando.
-        # - 'dirs': Una lista con los nombres de los subdirectorios DENTRO de 'root'.
-        # - 'files': Una lista con los nombres de los archivos DENTRO de 'root'.
+        # 'walk()' (walker.py) recorre el directorio y TODOS sus subdirectorios, leyendo varias carpetas a la vez
+        # con un pool de hilos: en discos de red, donde cada lectura de carpeta tarda, la búsqueda va mucho más rápida.
+        # Por cada archivo o carpeta encontrado nos da un WalkEntry con su nombre, su ruta completa y si es carpeta.
         print(f"/api/search: Iniciando búsqueda recursiva desde '{full_current_path}'...")
-        for root, dirs, files in os.walk(full_current_path):
-            # --- Buscamos coincidencias en los nombres de los directorios ---
-            for dir_name in dirs:
-                # Convertimos el nombre del directorio a minúsculas y vemos si el término de búsqueda está dentro.
-                if search_term in dir_name.lower():
-                    # Si coincide, construimos la ruta completa de este directorio encontrado.
-                    dir_path = os.path.join(root, dir_name)
-                    # Necesitamos la ruta relativa a nuestro 'DATA_DIR' para mostrarla correctamente en el frontend.
-                    # Aquí hay algo a tener en cuenta: el código está recalculando la ruta de DATA_DIR usando os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data')).
-                    # Esto puede ser un poco arriesgado si la estructura de carpetas cambia o si el script se ejecuta desde un lugar inesperado.
-                    # Idealmente, se debería acceder a la variable global DATA_DIR que se inicializa de forma segura al inicio de la aplicación en utils.py.
-                    # Pero como no debemos cambiar la funcionalidad, mantenemos el código original y solo lo comentamos.
-                    relative_path = os.path.relpath(dir_path, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))) # <-- ¡Ojo! Esto recalcula DATA_DIR.
-
-                    # Añadimos la información del directorio encontrado a nuestra lista de resultados.
-                    matches.append({
-                        'name': dir_name, # El nombre del directorio.
-                        'path': relative_path.replace(os.sep, '/'), # La ruta relativa con barras web '/'
-                        'is_dir': True, # Confirmamos que es un directorio.
-                        'is_file': False # No es un archivo.
-                    })
-
-            # --- Buscamos coincidencias en los nombres de los archivos ---
-            for file_name in files:
-                # Hacemos lo mismo que con los directorios: convertimos el nombre del archivo a minúsculas y buscamos el término.
-                if search_term in file_name.lower():
-                    # Si coincide, construimos la ruta completa de este archivo encontrado.
-                    file_path = os.path.join(root, file_name)
-                    # De nuevo, calculamos la ruta relativa para el frontend.
-                    # Recordar la nota sobre recalcular DATA_DIR aquí.
-                    relative_path = os.path.relpath(file_path, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))) # <-- ¡Ojo! Recalculando DATA_DIR de nuevo.
-
-                    # Añadimos la información del archivo encontrado a nuestra lista de resultados.
-                    matches.append({
-                        'name': file_name, # El nombre del archivo.
-                        'path': relative_path.replace(os.sep, '/'), # La ruta relativa con barras web '/'
-                        'is_dir': False, # No es un directorio.
-                        'is_file': True # Confirmamos que es un archivo.
-                    })
-
-        # Después de recorrer todo, ordenamos los resultados.
-        # Ponemos las carpetas primero, luego los archivos, y dentro de cada grupo, por nombre alfabéticamente (sin importar mayúsculas/minúsculas).
-        matches.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
-
-        print(f"/api/search: Búsqueda completada. Encontrados {len(matches)} resultados para '{search_term}'.")
+        # Las rutas relativas se calculan respecto a la raíz donde buscamos.
+        data_dir_abs = root.path
+
+        # --- Búsqueda mientras se escribe ---
+        # Si esta sesión ya buscó hace poco un término contenido en este (ej: 'conf' y ahora 'config') en la misma
+        # carpeta, sus coincidencias son un superconjunto de las nuevas: las filtramos sin tocar el disco.
+        session = search_session(request)
+        cached = lookup(root, session, full_current_path, search_term)
+        # Las coincidencias de esta búsqueda se guardan para la siguiente (salvo que sean demasiadas).
+        collected = []
+
+        def walk_candidates():
+            """Recorre el disco y genera (nombre, ruta_completa, es_directorio, DirEntry) de cada elemento."""
+            for item in walk(full_current_path, max_workers=root.max_workers):
+                yield item.name, item.path, item.is_dir, item
+
+        def cached_candidates():
+            """Genera las coincidencias guardadas del término anterior (sin DirEntry: el stat se hace por ruta)."""
+            for name, match_path, is_dir in cached[1]:
+                yield name, match_path, is_dir, None
+
+        def find_matches(candidates):
+            """
+            Genera (clave_de_orden, (nombre, ruta_completa, es_directorio)) por cada coincidencia.
+            La clave se calcula una sola vez por coincidencia; el stat solo se hace si se ordena por tamaño o fecha.
+            """
+            nonlocal collected
+            for name, match_path, is_dir, item in candidates:
+                # Convertimos el nombre a minúsculas y vemos si el término de búsqueda está dentro.
+                if search_term not in name.lower():
+                    continue
+                if collected is not None:
+                    collected.append((name, match_path, is_dir))
+                    if len(collected) > SEARCH_CACHE_MAX_CANDIDATES:
+                        collected = None
+                st = None
+                if sort_spec.needs_stat:
+                    try:
+                        st = item.stat() if item is not None else os.stat(match_path)
+                    except OSError:
+                        st = None
+                # El recorrido paralelo no tiene un orden fijo: la ruta desempata nombres iguales en carpetas
+                # distintas, así dos búsquedas iguales devuelven siempre lo mismo.
+                key = sort_key(sort_spec, name, is_dir, st) + (match_path,)
+                yield key, (name, match_path, is_dir)
+
+        # Ordenamos por la clave pedida (por defecto: carpetas primero y luego por nombre, sin importar mayúsculas/minúsculas).
+        # Con 'top' solo guardamos los k mejores resultados en memoria, aunque haya muchísimas coincidencias.
+        if cached:
+            print(f"/api/search: Reutilizando {len(cached[1])} coincidencias de '{cached[0]}' (sin recorrer el disco).")
+            selected, total = select_sorted(sort_spec, find_matches(cached_candidates()))
+        else:
+            # Ocupamos un hueco de concurrencia de la raíz durante todo el recorrido.
+            with root.slot():
+                selected, total = select_sorted(sort_spec, find_matches(walk_candidates()))
+        if collected is not None:
+            store(root, session, full_current_path, search_term, collected)
+
+        # Construimos la lista de resultados solo con los elementos seleccionados.
+        matches = []
+        if response_format != FORMAT_JSON:
+            # Formato compacto: los resultados comparten pocos directorios padre, así que cada directorio se envía
+            # una sola vez en la tabla 'dirs' y cada resultado solo lleva su índice (path = dirs[dir] + name).
+            dir_index = {}
+            dirs_table = []
+            columns = {'name': [], 'flags': [], 'dir': []}
+            for name, match_path, is_dir in selected:
+                parent = os.path.dirname(match_path)
+                index = dir_index.get(parent)
+                if index is None:
+                    rel_parent = os.path.relpath(parent, data_dir_abs)
+                    index = dir_index[parent] = len(dirs_table)
+                    dirs_table.append('' if rel_parent == '.' else rel_parent.replace(os.sep, '/') + '/')
+                columns['name'].append(name)
+                columns['flags'].append(entry_flags(is_dir, not is_dir))
+                columns['dir'].append(index)
+        else:
+            for name, match_path, is_dir in selected:
+                # Necesitamos la ruta relativa a la raíz para mostrarla correctamente en el frontend.
+                relative_path = os.path.relpath(match_path, data_dir_abs)
+                matches.append({
+                    'name': name, # El nombre del archivo o directorio.
+                    'path': relative_path.replace(os.sep, '/'), # La ruta relativa con barras web '/'
+                    'is_dir': is_dir, # Si es un directorio...
+                    'is_file': not is_dir # ...o un archivo.
+                })
+
+        print(f"/api/search: Búsqueda completada. Encontrados {total} resultados para '{search_term}' (enviando {len(selected)}).")
         print(f"--- Fin /api/search ---\n")
 
         # Preparamos la respuesta exitosa con los resultados.
-        return jsonify({
+        payload = {
             'success': True, # ¡Todo bien!
-            'results': matches, # La lista de coincidencias encontradas.
-            'message': f'Se encontraron {len(matches)} resultados para "{search_term}"', # Un mensaje amigable para el usuario.
-            'search_term': search_term # También devolvemos el término por si el frontend lo necesita.
-        })
+            'message': f'Se encontraron {total} resultados para "{search_term}"', # Un mensaje amigable para el usuario.
+            'total': total, # Total de coincidencias (con 'top' se envían como mucho k).
+            'truncated': len(selected) < total, # True si 'top' dejó resultados fuera.
+            'sort': sort_spec.to_dict(), # El orden aplicado.
+            'search_term': search_term, # También devolvemos el término por si el frontend lo necesita.
+            'cached': bool(cached), # True si se filtraron resultados de una búsqueda anterior (sin recorrer el disco).
+            'root': root.name # Y la raíz donde se buscó.
+        }
+        if response_format == FORMAT_JSON:
+            payload['results'] = matches # La lista de coincidencias encontradas.
+        else:
+            payload['format'] = 'compact'
+            payload['dirs'] = dirs_table
+            payload['columns'] = columns
+        return make_response(payload, response_format)
+    except RootBusyError as e:
+        # La raíz está saturada: 503 con Retry-After, sin dejar el hilo esperando un hueco.
+        print(f"/api/search: {e.message}. Enviando 503.")
+        print(f"--- Fin /api/search ---\n")
+        return root_busy_response(e)
     except Exception as e:
         # Si ocurre algún error inesperado durante la búsqueda (ej. permisos, archivo corrupto), lo capturamos.
         print(f"/api/search: Error durante la búsqueda desde {full_current_path} con el término '{search_term}': {e}. Enviando error.")
@@ -0,0 +1,102 @@
+# api/tail.py
+import json # Los eventos SSE llevan su contenido en JSON.
+import os # Para validar que la ruta sea un archivo.
+import queue # Para esperar eventos con timeout (y mandar keepalives mientras tanto).
+from flask import Blueprint, Response, request, jsonify, stream_with_context # Response + stream_with_context para el flujo SSE.
+from utils import get_full_path, get_root # Rutas seguras dentro de la raíz.
+from events import KEEPALIVE_INTERVAL # Mismo intervalo de keepalive que /api/watch.
+from tail import TAIL_DEFAULT_LINES, TAIL_MAX_LINES, read_backlog, tails # Lectores compartidos de archivos que crecen.
+
+# Blueprint para seguir archivos que crecen ("tail -f") mediante Server-Sent Events.
+tail_bp = Blueprint('tail_bp', __name__)
+
+
+def _sse(event, payload, event_id=None):
+    """Formatea un evento SSE. El 'id' es el offset hasta el que llegó el cliente (para reanudar al reconectar)."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+# --- Endpoint SSE para seguir un archivo ---
+@tail_bp.route('/api/tail')
+def tail_file():
+    """
+    Abre un flujo SSE con el contenido nuevo de un archivo. Parámetros: 'root', 'path' y dónde empezar:
+    'offset' (byte) o 'lines' (últimas N líneas; por defecto 10). Al reconectar, el navegador manda la cabecera
+    Last-Event-ID con el último offset recibido y se sigue desde ahí sin perder ni repetir nada.
+    Eventos: 'ready', 'data' ({'offset', 'end', 'text'}), 'truncate', 'rotate', 'missing' y 'resync'.
+    """
+    path = request.args.get('path', '')
+    root_name = request.args.get('root', '')
+    print(f"\n--- /api/tail ---")
+    print(f"Ruta recibida del frontend: '{path}'")
+
+    root = get_root(root_name)
+    full_path = get_full_path(path, root) if root else None
+    if not full_path or not os.path.isfile(full_path):
+        print(f"/api/tail: '{full_path}' no es un archivo válido. Enviando error.")
+        print(f"--- Fin /api/tail ---\n")
+        return jsonify({'success': False, 'message': 'Invalid file path or not a file'})
+
+    # Dónde empieza el cliente: Last-Event-ID (reconexión) > 'offset' > 'lines'.
+    start_offset = request.headers.get('Last-Event-ID', '') or request.args.get('offset', '')
+    lines = request.args.get('lines', '')
+    if start_offset and not start_offset.isdigit():
+        print(f"/api/tail: Offset no válido '{start_offset}'. Enviando error.")
+        print(f"--- Fin /api/tail ---\n")
+        return jsonify({'success': False, 'message': "'offset' debe ser un número entero no negativo"})
+    if lines and (not lines.isdigit() or int(lines) > TAIL_MAX_LINES):
+        print(f"/api/tail: Número de líneas no válido '{lines}'. Enviando error.")
+        print(f"--- Fin /api/tail ---\n")
+        return jsonify({'success': False, 'message': f"'lines' debe ser un número entre 0 y {TAIL_MAX_LINES}"})
+
+    sub, end_offset = tails.subscribe(full_path)
+    if sub is None:
+        print(f"/api/tail: Demasiadas conexiones de seguimiento. Enviando 503.")
+        print(f"--- Fin /api/tail ---\n")
+        response = jsonify({'success': False, 'message': 'Demasiadas conexiones de seguimiento activas. Inténtalo más tarde.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(KEEPALIVE_INTERVAL)
+        return response
+
+    # Historial inicial: desde donde pidió el cliente hasta donde empieza el lector compartido.
+    try:
+        if start_offset:
+            backlog_start, backlog = read_backlog(full_path, end_offset, start_offset=int(start_offset))
+        else:
+            backlog_start, backlog = read_backlog(full_path, end_offset, lines=int(lines) if lines else TAIL_DEFAULT_LINES)
+    except OSError as e:
+        tails.unsubscribe(sub)
+        print(f"/api/tail: Error leyendo el historial de '{full_path}': {e}. Enviando error.")
+        print(f"--- Fin /api/tail ---\n")
+        return jsonify({'success': False, 'message': str(e)})
+    print(f"/api/tail: Suscriptor {sub.id} siguiendo '{full_path}' desde el byte {backlog_start}.")
+    print(f"--- Fin /api/tail ---\n")
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            yield _sse('ready', {'stream_id': sub.id, 'root': root.name, 'path': path, 'offset': backlog_start})
+            if backlog:
+                yield _sse('data', {'offset': backlog_start, 'end': end_offset, 'text': backlog}, end_offset)
+            while True:
+                try:
+                    event = sub.queue.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if sub.overflowed:
+                    # El cliente no da abasto: que reconecte desde el último offset que recibió.
+                    yield _sse('resync', {})
+                    return
+                event = dict(event) # El mismo evento va a todos los clientes del archivo: no lo modificamos.
+                kind = event.pop('event')
+                yield _sse(kind, event, event.get('end', event.get('offset')))
+        finally:
+            tails.unsubscribe(sub)
+            print(f"/api/tail: Suscriptor {sub.id} desconectado.")
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Evita que nginx acumule los eventos en su búfer.
+    return response
@@ -0,0 +1,219 @@
+# api/transfer.py
+import os # Para validar rutas, comprobar existencia y tipo de los elementos.
+from flask import Blueprint, request, jsonify # Lo básico de Flask: Blueprint, datos de la petición y respuestas JSON.
+from utils import get_full_path, get_root # Rutas seguras dentro de DATA_DIR (o de otra raíz con nombre).
+from fileops import copy_item, move_item, same_filesystem # Copias en el kernel y movimientos con rename.
+from jobs import create_job, get_job, start_job # Los trabajos largos se ejecutan en segundo plano y se consultan por id.
+from events import notify_change # Avisamos a los clientes suscritos (SSE) de los cambios en origen y destino.
+from journal import record_mutation # Y anotamos los cambios en el diario que siguen las réplicas.
+from quotas import QuotaExceeded, measure_tree, quota_manager, quota_error_response # Cuotas de almacenamiento por carpeta.
+
+# Blueprint para las operaciones de copiar y mover elementos dentro del servidor.
+# Antes, copiar significaba descargar y volver a subir el archivo desde el navegador; ahora todo ocurre en el servidor.
+transfer_bp = Blueprint('transfer_bp', __name__)
+
+
+def _validate_transfer(endpoint, data):
+    """
+    Valida los datos comunes de /api/copy y /api/move.
+    Espera 'source' (ruta del elemento), 'destination' (directorio destino) y opcionalmente 'name' (nuevo nombre).
+    También acepta 'root' (raíz del origen) y 'destination_root' (raíz del destino; por defecto la misma),
+    así se puede copiar o mover entre volúmenes distintos.
+    Devuelve (full_source, full_target, source_root, target_root, error_response). Si hay error, solo error_response no es None.
+    """
+    if not data:
+        return None, None, None, None, jsonify({'success': False, 'message': 'Datos no válidos'})
+
+    source = data.get('source', '').strip() # Ruta del elemento a copiar/mover.
+    destination = data.get('destination', '').strip() # Directorio donde dejarlo ('' es la raíz).
+    name = data.get('name', '').strip() # Nuevo nombre opcional; por defecto, el mismo nombre.
+
+    source_root_name = data.get('root', '') # Raíz del origen (vacío = 'data').
+    target_root_name = data.get('destination_root', '') or source_root_name # Raíz del destino (por defecto, la misma).
+
+    print(f"{endpoint}: source='{source}' ({source_root_name or 'data'}), destination='{destination}' ({target_root_name or 'data'}), name='{name}'")
+
+    if not source:
+        return None, None, None, None, jsonify({'success': False, 'message': 'Source path is required'})
+
+    source_root = get_root(source_root_name)
+    target_root = get_root(target_root_name)
+    if not source_root or not target_root:
+        return None, None, None, None, jsonify({'success': False, 'message': 'Raíz de datos desconocida'})
+
+    full_source = get_full_path(source, source_root)
+    if not full_source or not os.path.lexists(full_source):
+        return None, None, None, None, jsonify({'success': False, 'message': f'El elemento "{source}" no existe'})
+
+    # ¡Nunca permitimos copiar o mover una raíz entera!
+    if full_source == source_root.path:
+        return None, None, None, None, jsonify({'success': False, 'message': 'Cannot copy or move the root directory'})
+
+    full_destination = get_full_path(destination, target_root)
+    if not full_destination or not os.path.isdir(full_destination):
+        return None, None, None, None, jsonify({'success': False, 'message': 'Invalid destination directory or it does not exist'})
+
+    target_name = name or os.path.basename(full_source)
+    # El nombre no puede contener separadores: solo elegimos el nombre final, no otra ruta.
+    if '/' in target_name or os.sep in target_name or target_name in ('.', '..'):
+        return None, None, None, None, jsonify({'success': False, 'message': f'Nombre no válido: {target_name}'})
+
+    full_target = get_full_path(os.path.join(destination, target_name), target_root)
+    if not full_target:
+        return None, None, None, None, jsonify({'success': False, 'message': 'Invalid target path'})
+
+    if os.path.lexists(full_target):
+        return None, None, None, None, jsonify({
+            'success': False,
+            'message': f'Ya existe un archivo/directorio con el nombre "{target_name}" en el destino'
+        })
+
+    # Un directorio no se puede copiar/mover dentro de sí mismo (¡recursión infinita!).
+    if os.path.isdir(full_source) and (full_target + os.sep).startswith(full_source + os.sep):
+        return None, None, None, None, jsonify({'success': False, 'message': 'No se puede copiar/mover un directorio dentro de sí mismo'})
+
+    return full_source, full_target, source_root, target_root, None
+
+
+# --- Endpoint para copiar un archivo o directorio ---
+@transfer_bp.route('/api/copy', methods=['POST'])
+def copy_endpoint():
+    """
+    Copia un archivo o un árbol de directorios a otro directorio dentro de DATA_DIR.
+    La copia se hace en segundo plano; devolvemos un 'job_id' para consultar el progreso en /api/jobs/<id>.
+    """
+    print(f"\n--- /api/copy ---")
+    full_source, full_target, source_root, target_root, error = _validate_transfer('/api/copy', request.get_json(silent=True))
+    if error:
+        print(f"--- Fin /api/copy ---\n")
+        return error
+
+    # Si el destino está bajo alguna cuota, reservamos ya el tamaño de lo que se copia:
+    # así la copia se rechaza antes de empezar en vez de llenar la cuota a medias.
+    reserved = (0, 0)
+    if quota_manager.quotas_for(target_root, full_target):
+        reserved = measure_tree(full_source)
+        try:
+            quota_manager.charge(target_root, full_target, *reserved)
+        except QuotaExceeded as e:
+            print(f"/api/copy: {e.message}. Enviando error.")
+            print(f"--- Fin /api/copy ---\n")
+            return quota_error_response(e)
+
+    job = create_job('copy', f"Copiar '{os.path.basename(full_source)}'")
+    start_job(job, _run_copy, full_source, full_target, target_root, reserved)
+    print(f"/api/copy: Trabajo {job.id} iniciado: '{full_source}' -> '{full_target}'")
+    print(f"--- Fin /api/copy ---\n")
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'message': f"Copia de '{os.path.basename(full_source)}' iniciada"
+    })
+
+
+def _run_copy(job, full_source, full_target, target_root, reserved=(0, 0)):
+    # Los archivos se copian con el pool de hilos de la raíz destino: su límite de hilos se respeta.
+    try:
+        copy_item(full_source, full_target, job=job, executor=target_root.executor())
+    except BaseException:
+        if reserved != (0, 0):
+            # La copia falló: devolvemos a la cuota la parte reservada que no llegó a escribirse.
+            copied = measure_tree(full_target)
+            quota_manager.release(target_root, full_target, reserved[0] - copied[0], reserved[1] - copied[1])
+        raise
+    finally:
+        notify_change(target_root.name, full_target) # Incluso si falló a medias, el destino pudo cambiar.
+        record_mutation('sync', target_root.name, full_target) # La réplica compara el árbol copiado entero.
+    job.finish(f"'{os.path.basename(full_source)}' copiado correctamente")
+
+
+# --- Endpoint para mover un archivo o directorio ---
+@transfer_bp.route('/api/move', methods=['POST'])
+def move_endpoint():
+    """
+    Mueve un archivo o directorio a otra carpeta dentro de DATA_DIR.
+    Si origen y destino están en el mismo sistema de archivos, es un os.rename instantáneo y el trabajo
+    se devuelve ya terminado. Si no, se copia en segundo plano y luego se borra el origen.
+    """
+    print(f"\n--- /api/move ---")
+    full_source, full_target, source_root, target_root, error = _validate_transfer('/api/move', request.get_json(silent=True))
+    if error:
+        print(f"--- Fin /api/move ---\n")
+        return error
+
+    # El uso del elemento pasa de las cuotas del origen a las del destino. Se reserva en el destino antes de mover.
+    quota_plan = quota_manager.plan_move(source_root, full_source, target_root, full_target)
+    try:
+        quota_plan.charge()
+    except QuotaExceeded as e:
+        print(f"/api/move: {e.message}. Enviando error.")
+        print(f"--- Fin /api/move ---\n")
+        return quota_error_response(e)
+
+    job = create_job('move', f"Mover '{os.path.basename(full_source)}'")
+    if same_filesystem(full_source, os.path.dirname(full_target)):
+        # Camino rápido: rename atómico, no hace falta hilo de fondo.
+        try:
+            job.status = 'running'
+            move_item(full_source, full_target, job=job)
+            quota_plan.commit()
+            notify_change(source_root.name, full_source)
+            notify_change(target_root.name, full_target)
+            _record_move(source_root, full_source, target_root, full_target)
+            job.finish(f"'{os.path.basename(full_source)}' movido correctamente", result={'method': 'rename'})
+        except OSError as e:
+            print(f"/api/move: OS Error al mover '{full_source}' a '{full_target}': {e}")
+            quota_plan.rollback()
+            job.fail(str(e))
+            print(f"--- Fin /api/move ---\n")
+            return jsonify({'success': False, 'job_id': job.id, 'message': f'Error al mover: {str(e)}'})
+    else:
+        start_job(job, _run_move, full_source, full_target, source_root, target_root, quota_plan)
+
+    print(f"/api/move: Trabajo {job.id} ({job.status}): '{full_source}' -> '{full_target}'")
+    print(f"--- Fin /api/move ---\n")
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'message': job.message or f"Movimiento de '{os.path.basename(full_source)}' iniciado"
+    })
+
+
+def _run_move(job, full_source, full_target, source_root, target_root, quota_plan=None):
+    try:
+        method = move_item(full_source, full_target, job=job, executor=target_root.executor())
+        if quota_plan is not None:
+            quota_plan.commit() # El origen ya no existe: su uso sale de las cuotas del origen.
+    except BaseException:
+        if quota_plan is not None:
+            quota_plan.rollback()
+        # El movimiento no se hizo (o quedó a medias): la réplica NO debe mover nada. Que compare ambos
+        # lados con el estado real del original.
+        record_mutation('sync', source_root.name, full_source)
+        record_mutation('sync', target_root.name, full_target)
+        raise
+    finally:
+        notify_change(source_root.name, full_source)
+        notify_change(target_root.name, full_target)
+    _record_move(source_root, full_source, target_root, full_target) # Solo si el movimiento terminó bien.
+    job.finish(f"'{os.path.basename(full_source)}' movido correctamente", result={'method': method})
+
+
+def _record_move(source_root, full_source, target_root, full_target):
+    """Anota un movimiento en el diario: en la misma raíz es un 'rename'; entre raíces, borrar + sincronizar."""
+    if source_root.name == target_root.name:
+        record_mutation('rename', source_root.name, full_source, to_path=full_target)
+    else:
+        record_mutation('delete', source_root.name, full_source)
+        record_mutation('sync', target_root.name, full_target)
+
+
+# --- Endpoint para consultar el progreso de un trabajo ---
+@transfer_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Devuelve el estado y el progreso de un trabajo en segundo plano."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'})
+    return jsonify({'success': True, 'job': job.to_dict()})
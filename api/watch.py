@@ -0,0 +1,102 @@
+# api/watch.py
+import json # Los eventos SSE llevan su contenido en JSON.
+import os # Para validar que las rutas a vigilar sean directorios.
+import queue # Para esperar eventos con timeout (y mandar keepalives mientras tanto).
+from flask import Blueprint, Response, request, jsonify, stream_with_context # Response + stream_with_context para el flujo SSE.
+from utils import get_full_path, get_root # Rutas seguras dentro de la raíz.
+from events import hub, KEEPALIVE_INTERVAL # El registro de suscriptores y cambios de directorios.
+
+# Blueprint para la suscripción a cambios en directorios mediante Server-Sent Events (SSE).
+# El navegador abre UNA conexión a /api/watch y recibe los cambios de los directorios que está viendo,
+# en vez de volver a pedir /api/browse después de cada acción.
+watch_bp = Blueprint('watch_bp', __name__)
+
+
+def _resolve_dirs(root, paths):
+    """Convierte las rutas del frontend en rutas absolutas de directorios existentes. Ignora las que no lo son."""
+    full_dirs = []
+    for path in paths:
+        full_path = get_full_path(path, root)
+        if full_path and os.path.isdir(full_path):
+            full_dirs.append(full_path)
+    return full_dirs
+
+
+def _sse(event, payload):
+    """Formatea un evento en el formato de texto de Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+# --- Endpoint SSE para recibir cambios de directorios ---
+@watch_bp.route('/api/watch')
+def watch_directories():
+    """
+    Abre un flujo SSE. Parámetros: 'root' y uno o varios 'path' con los directorios a vigilar.
+    El primer evento ('ready') trae el 'stream_id' para cambiar luego los directorios con POST /api/watch/<id>.
+    Después llegan eventos 'change' con {'event': 'add'|'remove'|'modify', 'root', 'dir', 'item'}
+    y, si el cliente se quedó atrás y perdió eventos, un 'resync' para que vuelva a listar.
+    """
+    root_name = request.args.get('root', '')
+    root = get_root(root_name)
+    if not root:
+        return jsonify({'success': False, 'message': f"Raíz de datos desconocida: '{root_name}'"})
+
+    sub = hub.subscribe()
+    if sub is None:
+        response = jsonify({'success': False, 'message': 'Demasiadas suscripciones activas. Inténtalo más tarde.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(KEEPALIVE_INTERVAL)
+        return response
+
+    hub.set_interest(sub.id, root.name, _resolve_dirs(root, request.args.getlist('path')))
+    print(f"/api/watch: Suscriptor {sub.id} conectado (raíz '{root.name}').")
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n" # Si se corta la conexión, el navegador reintenta a los 3 segundos.
+            yield _sse('ready', {'stream_id': sub.id, 'root': root.name})
+            while True:
+                try:
+                    event = sub.queue.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n" # Comentario SSE: mantiene viva la conexión a través de proxies.
+                    continue
+                if sub.overflowed:
+                    # Perdimos eventos: mejor que el cliente vuelva a listar que mostrar algo incorrecto.
+                    sub.overflowed = False
+                    with sub.queue.mutex:
+                        sub.queue.queue.clear()
+                    yield _sse('resync', {})
+                    continue
+                yield _sse('change', event)
+        finally:
+            # El cliente cerró la conexión (o el servidor se apaga): limpiamos la suscripción.
+            hub.unsubscribe(sub.id)
+            print(f"/api/watch: Suscriptor {sub.id} desconectado.")
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Evita que nginx acumule los eventos en su búfer.
+    return response
+
+
+# --- Endpoint para cambiar los directorios vigilados de una conexión SSE ---
+@watch_bp.route('/api/watch/<stream_id>', methods=['POST'])
+def update_watch(stream_id):
+    """
+    Reemplaza los directorios que vigila una conexión SSE ya abierta (ej: al navegar a otra carpeta).
+    Espera JSON con 'paths' (lista de rutas) y opcionalmente 'root'.
+    """
+    data = request.get_json(silent=True) or {}
+    root_name = data.get('root', '')
+    root = get_root(root_name)
+    if not root:
+        return jsonify({'success': False, 'message': f"Raíz de datos desconocida: '{root_name}'"})
+
+    paths = data.get('paths', [])
+    if not isinstance(paths, list):
+        return jsonify({'success': False, 'message': "'paths' debe ser una lista"})
+
+    if not hub.set_interest(stream_id, root.name, _resolve_dirs(root, paths)):
+        return jsonify({'success': False, 'message': 'Suscripción no encontrada'})
+    return jsonify({'success': True})
@@ -8,12 +8,23 @@ from api.file_content import file_content_bp
 from api.creation import creation_bp
 from api.modification import modification_bp
 from api.search import search_bp
+from api.transfer import transfer_bp
+from api.watch import watch_bp
+from api.quotas import quotas_bp
+from api.replication import replication_bp
+from api.tail import tail_bp
+from api.replace import replace_bp
+from api.profiling import profiling_bp
 
 # Importar la función de inicialización de rutas y la función para obtener DATA_DIR.
 # Es VITAL que importemos get_data_dir_abs() aquí para poder usarla.
 # YA NO importamos DATA_DIR directamente aquí, ya que su valor global está en utils
 # y se obtiene de forma segura con get_data_dir_abs().
 from utils import initialize_paths, get_data_dir_abs # <-- ¡ESTA ES LA LÍNEA CORREGIDA!
+from admission import init_admission # Control de admisión: límites de concurrencia por ruta y carril prioritario.
+from quotas import init_quotas # Cuotas de almacenamiento por carpeta (contadores persistidos y reconciliados).
+from replication import init_replication # Diario de mutaciones y réplicas incrementales.
+from profiling import init_profiling # Perfiles opcionales por petición (muestreo de pilas o cProfile).
 
 # --- Espacio Reservado para Anticopia ---
 # Este string sirve como un marcador básico y fácil de identificar.
@@ -29,25 +40,55 @@ app = Flask(__name__)
 # Debe ser un valor difícil de adivinar y secreto.
 app.secret_key = b'_5#y2L"F4Q8z\n\xec]/' # Clave secreta (usada principalmente para flash messages)
 
-# --- ¡Paso CRUCIAL! Inicializar las rutas ANTES de registrar los Blueprints ---
-# Esto configura de forma segura dónde está nuestra carpeta 'data' en el sistema de archivos.
-# Obtenemos la ruta absoluta del directorio donde se encuentra este archivo 'app.py'.
-app_dir = os.path.dirname(os.path.abspath(__file__))
-# Llamamos a la función de utilidades y le pasamos la ruta raíz de nuestro proyecto.
-initialize_paths(app_dir)
+# --- Procesos del Pool de Buscar y Reemplazar ---
+# replace.py arranca sus procesos con 'forkserver' (o 'spawn') y multiprocessing vuelve a importar este archivo en
+# ellos con el nombre '__mp_main__'. Ahí no hay que configurar nada (ni arrancar replicadores, cuotas...): esos
+# procesos solo ejecutan replace_worker.process_file.
+if __name__ != '__mp_main__':
+    # --- ¡Paso CRUCIAL! Inicializar las rutas ANTES de registrar los Blueprints ---
+    # Esto configura de forma segura dónde está nuestra carpeta 'data' en el sistema de archivos.
+    # Obtenemos la ruta absoluta del directorio donde se encuentra este archivo 'app.py'.
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    # Llamamos a la función de utilidades y le pasamos la ruta raíz de nuestro proyecto.
+    initialize_paths(app_dir)
 
-# Opcional: Verificar la ruta de DATA_DIR después de la inicialización.
-# Ahora obtenemos el valor seguro llamando a la función get_data_dir_abs().
-# Esto demuestra que la inicialización funcionó y que la función se importó bien.
-print(f"app.py: DATA_DIR configurado en: {get_data_dir_abs()}") # <-- Esta línea ahora debería funcionar
+    # Opcional: Verificar la ruta de DATA_DIR después de la inicialización.
+    # Ahora obtenemos el valor seguro llamando a la función get_data_dir_abs().
+    # Esto demuestra que la inicialización funcionó y que la función se importó bien.
+    print(f"app.py: DATA_DIR configurado en: {get_data_dir_abs()}") # <-- Esta línea ahora debería funcionar
 
-# --- Registrar Blueprints ---
-# Conectamos cada Blueprint (grupo de rutas de API) a la aplicación Flask principal.
-app.register_blueprint(browse_bp)
-app.register_blueprint(file_content_bp)
-app.register_blueprint(creation_bp)
-app.register_blueprint(modification_bp)
-app.register_blueprint(search_bp)
+    # --- Cuotas de Almacenamiento ---
+    # Cargamos las cuotas de 'quotas.json' (si existe) y sus contadores guardados. Necesita las raíces ya inicializadas.
+    init_quotas(app_dir)
+
+    # --- Diario y Réplicas ---
+    # Si existe 'replication.json', cada cambio se anota en un diario y los replicadores lo aplican en las réplicas.
+    init_replication(app_dir)
+
+    # --- Registrar Blueprints ---
+    # Conectamos cada Blueprint (grupo de rutas de API) a la aplicación Flask principal.
+    app.register_blueprint(browse_bp)
+    app.register_blueprint(file_content_bp)
+    app.register_blueprint(creation_bp)
+    app.register_blueprint(modification_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(transfer_bp)
+    app.register_blueprint(watch_bp)
+    app.register_blueprint(quotas_bp)
+    app.register_blueprint(replication_bp)
+    app.register_blueprint(tail_bp)
+    app.register_blueprint(replace_bp)
+    app.register_blueprint(profiling_bp)
+
+    # --- Control de Admisión ---
+    # Limita cuántas peticiones pesadas (búsquedas, borrados, copias...) se ejecutan a la vez y da prioridad
+    # a las interactivas (explorar, ver contenido), para que la interfaz siga respondiendo bajo carga.
+    init_admission(app)
+
+    # --- Perfiles por Petición ---
+    # Solo se activan con FILES_MANAGER_PROFILE_TOKEN (cabecera X-Profile) o FILES_MANAGER_PROFILE_RATE (muestreo).
+    # Desactivados, no añaden nada a las peticiones. Los perfiles guardados se consultan en /api/profiles.
+    init_profiling(app, app_dir)
 
 
 # --- Ruta principal ---
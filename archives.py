@@ -0,0 +1,280 @@
+# archives.py
+import os # stat del archivo comprimido (la clave de su índice) y rutas.
+import posixpath # Los nombres dentro de los archivos comprimidos siempre usan '/'.
+import stat # Modo de los elementos (para el campo 'mode' y para distinguir carpetas de archivos).
+import tarfile # Archivos .tar, .tar.gz, .tar.bz2, .tar.xz.
+import time # Las fechas de un zip vienen como tupla (año, mes, día...).
+import threading # Dos peticiones al mismo archivo comprimido construyen su índice una sola vez.
+import weakref # Los locks de construcción viven mientras alguien los use.
+import zipfile # Archivos .zip (y .jar): su directorio central ya es un índice.
+from utils import LRUCache # Índices de los archivos comprimidos abiertos recientemente.
+
+# --- Explorar Archivos Comprimidos sin Extraerlos ---
+# Un .zip o un .tar dentro de la raíz se puede explorar como si fuera una carpeta: 'datos/copia.zip/docs/'.
+# - Zip: la lista de elementos sale de su directorio central (al final del archivo): unos pocos KB aunque el
+#   archivo pese 10 GB. Cada elemento se lee descomprimiéndolo al vuelo, por bloques.
+# - Tar: no tiene índice, así que la primera vez se recorren sus cabeceras (sin leer los datos si no está
+#   comprimido; un .tar.gz sí hay que descomprimirlo entero una vez) y el índice se guarda en memoria.
+# - Los índices se guardan en una caché LRU con clave (ruta, dispositivo, inodo, fecha, tamaño): si el archivo
+#   cambia, la clave cambia y el índice viejo deja de usarse.
+# - Los elementos con rutas peligrosas ('..', absolutas) se ignoran y los enlaces de un tar no se siguen.
+
+ZIP_SUFFIXES = ('.zip', '.jar')
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_INDEX_CACHE_SIZE = 32 # Índices de archivos comprimidos guardados en memoria.
+ARCHIVE_MAX_MEMBERS = 200000 # Archivos con más elementos no se exploran (su índice ocuparía demasiado).
+ARCHIVE_READ_CHUNK = 256 * 1024 # Bytes por bloque al leer un elemento.
+ARCHIVE_PREVIEW_MAX_BYTES = 5 * 1024 * 1024 # Elementos más grandes no se previsualizan como texto (se descargan).
+
+_indexes = LRUCache(ARCHIVE_INDEX_CACHE_SIZE)
+# Un lock por archivo comprimido (misma clave que la caché). Desaparece solo cuando ya nadie lo tiene, así que
+# quien llegue mientras se construye el índice siempre espera a ese mismo lock en vez de construirlo en paralelo.
+_build_locks = weakref.WeakValueDictionary()
+_build_locks_lock = threading.Lock()
+
+
+class ArchiveError(Exception):
+    """El archivo comprimido está dañado, no se puede leer o tiene demasiados elementos."""
+    pass
+
+
+def archive_kind(path):
+    """'zip', 'tar' o None según la extensión."""
+    lower = path.lower()
+    if lower.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if lower.endswith(TAR_SUFFIXES):
+        return 'tar'
+    return None
+
+
+class ArchiveMember:
+    """
+    Un elemento de un archivo comprimido. Imita a os.DirEntry (name, path, is_dir(), is_file(), is_symlink(),
+    stat()), así el listado de /api/browse lo trata igual que una entrada de scandir.
+    """
+
+    __slots__ = ('name', 'path', 'inner', '_is_dir', '_is_link', 'size', 'mtime', 'mode', 'link_target', 'child_count')
+
+    def __init__(self, name, path, inner, is_dir, size=0, mtime=0.0, mode=None, is_link=False,
+                 link_target=None, child_count=None):
+        self.name = name
+        self.path = path # Ruta "virtual": la del archivo comprimido + '/' + la ruta interna.
+        self.inner = inner
+        self._is_dir = is_dir
+        self._is_link = is_link
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode if mode is not None else (stat.S_IFDIR | 0o755 if is_dir else stat.S_IFREG | 0o644)
+        self.link_target = link_target # Destino de un enlace de un tar (solo informativo: nunca se sigue).
+        self.child_count = child_count # Elementos de una carpeta interna (sale del índice, sin leer nada).
+
+    def is_dir(self, follow_symlinks=True):
+        return self._is_dir
+
+    def is_file(self, follow_symlinks=True):
+        return not self._is_dir and not self._is_link
+
+    def is_symlink(self):
+        return self._is_link
+
+    def stat(self, follow_symlinks=True):
+        return os.stat_result((self.mode, 0, 0, 1, 0, 0, self.size, self.mtime, self.mtime, self.mtime))
+
+
+def _clean_name(name):
+    """Normaliza la ruta interna de un elemento. Devuelve None si es peligrosa ('..' o absoluta)."""
+    name = name.replace('\\', '/').lstrip('/')
+    cleaned = posixpath.normpath(name) if name else ''
+    if cleaned in ('', '.') or cleaned.startswith('../') or cleaned == '..':
+        return None
+    return cleaned
+
+
+class ArchiveIndex:
+    """
+    Índice de un archivo comprimido:
+    ruta interna -> (es_carpeta, tamaño, fecha, modo, es_enlace, referencia, destino_del_enlace).
+    """
+
+    def __init__(self, archive_path, kind):
+        self.archive_path = archive_path
+        self.kind = kind
+        self.entries = {'': (True, 0, 0.0, None, False, None, None)}
+        self.children = {'': {}} # carpeta interna -> {nombre: ruta interna}
+
+    def _add(self, inner, is_dir, size, mtime, mode, is_link, ref, link_target=None):
+        # Las carpetas intermedias pueden no tener entrada propia (muy común en zips): las creamos.
+        parent, _, name = inner.rpartition('/')
+        if parent not in self.entries:
+            self._add(parent, True, 0, mtime, None, False, None)
+        self.children[parent][name] = inner
+        if inner in self.entries and self.entries[inner][0] and is_dir:
+            self.entries[inner] = (True, 0, mtime, mode, False, ref, None) # Carpeta implícita que luego aparece.
+            return
+        self.entries[inner] = (is_dir, size, mtime, mode, is_link, ref, link_target)
+        if is_dir:
+            self.children.setdefault(inner, {})
+
+    def build(self):
+        try:
+            if self.kind == 'zip':
+                with zipfile.ZipFile(self.archive_path) as zf:
+                    infos = zf.infolist()
+                    if len(infos) > ARCHIVE_MAX_MEMBERS:
+                        raise ArchiveError(f"El archivo tiene demasiados elementos ({len(infos)})")
+                    for info in infos:
+                        inner = _clean_name(info.filename)
+                        if inner is None:
+                            continue
+                        mode = (info.external_attr >> 16) or None
+                        if mode is not None and not stat.S_IFMT(mode):
+                            mode |= stat.S_IFDIR if info.is_dir() else stat.S_IFREG # Zips sin el tipo en los permisos.
+                        mtime = _zip_mtime(info)
+                        self._add(inner, info.is_dir(), info.file_size, mtime, mode, False, info.filename)
+            else:
+                with tarfile.open(self.archive_path, 'r:*') as tf:
+                    count = 0
+                    for info in tf:
+                        count += 1
+                        if count > ARCHIVE_MAX_MEMBERS:
+                            raise ArchiveError(f"El archivo tiene más de {ARCHIVE_MAX_MEMBERS} elementos")
+                        inner = _clean_name(info.name)
+                        if inner is None:
+                            continue
+                        is_link = info.issym() or info.islnk()
+                        mode = (stat.S_IFDIR if info.isdir() else stat.S_IFLNK if is_link else stat.S_IFREG) | info.mode
+                        self._add(inner, info.isdir(), info.size if info.isfile() else 0, float(info.mtime),
+                                  mode, is_link, info if info.isfile() else None, info.linkname if is_link else None)
+                    tf.members = [] # Los TarInfo que necesitamos ya están en el índice.
+        except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+            raise ArchiveError(f"No se pudo leer el archivo comprimido: {e}")
+        return self
+
+    def member(self, inner, base_path):
+        """ArchiveMember de 'inner' (ruta virtual construida a partir de 'base_path') o None si no existe."""
+        entry = self.entries.get(inner)
+        if entry is None:
+            return None
+        is_dir, size, mtime, mode, is_link, _, link_target = entry
+        name = inner.rpartition('/')[2] or os.path.basename(self.archive_path)
+        child_count = len(self.children.get(inner, ())) if is_dir else None
+        return ArchiveMember(name, base_path, inner, is_dir, size, mtime, mode, is_link, link_target, child_count)
+
+    def list_dir(self, inner):
+        """Elementos de la carpeta interna 'inner' como ArchiveMember, o None si no es una carpeta."""
+        names = self.children.get(inner)
+        if names is None:
+            return None
+        base = self.archive_path + ('/' + inner if inner else '')
+        return [self.member(child, base + '/' + name) for name, child in names.items()]
+
+    def open(self, inner):
+        """
+        Abre un elemento para leerlo por bloques (el llamante lo cierra). Lanza ArchiveError si no es un archivo.
+        El zip o tar se abre en cada lectura: el índice no guarda descriptores abiertos.
+        """
+        entry = self.entries.get(inner)
+        if entry is None or entry[0] or entry[4] or entry[5] is None:
+            raise ArchiveError('El elemento no existe o no es un archivo')
+        if self.kind == 'zip':
+            zf = zipfile.ZipFile(self.archive_path)
+            try:
+                return _ClosingReader(zf.open(entry[5]), zf)
+            except BaseException:
+                zf.close()
+                raise
+        tf = tarfile.open(self.archive_path, 'r:*')
+        try:
+            return _ClosingReader(tf.extractfile(entry[5]), tf)
+        except BaseException:
+            tf.close()
+            raise
+
+
+class _ClosingReader:
+    """Envuelve el lector de un elemento y cierra también el zip/tar del que sale."""
+
+    def __init__(self, reader, container):
+        self._reader = reader
+        self._container = container
+
+    def read(self, size=-1):
+        return self._reader.read(size)
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self._container.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _zip_mtime(info):
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+def get_index(archive_path):
+    """Índice del archivo comprimido (de la caché si no cambió; si no, se construye una sola vez)."""
+    kind = archive_kind(archive_path)
+    if kind is None:
+        raise ArchiveError('No es un archivo comprimido reconocido')
+    try:
+        st = os.stat(archive_path)
+    except OSError as e:
+        raise ArchiveError(str(e))
+    key = (archive_path, st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    with _build_locks_lock:
+        lock = _build_locks.get(key)
+        if lock is None:
+            lock = _build_locks[key] = threading.Lock()
+    with lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ArchiveIndex(archive_path, kind).build()
+            # Si el archivo cambió, su índice viejo ya no sirve: lo quitamos en vez de esperar a que caduque.
+            _indexes.discard_where(lambda k: k[0] == archive_path and k != key)
+            _indexes.set(key, index)
+        return index
+
+
+def locate(root_path, full_path):
+    """
+    Si 'full_path' es un archivo comprimido o una ruta dentro de uno, devuelve (ruta_del_archivo, ruta_interna);
+    si no, None. Sube por la ruta hasta encontrar el primer componente que existe en disco.
+    """
+    candidate = full_path
+    inner_parts = []
+    root_prefix = root_path.rstrip(os.sep) + os.sep
+    while not os.path.lexists(candidate):
+        parent = os.path.dirname(candidate)
+        if parent == candidate or not (parent + os.sep).startswith(root_prefix):
+            return None
+        inner_parts.append(os.path.basename(candidate))
+        candidate = parent
+    if archive_kind(candidate) is None or not os.path.isfile(candidate) or os.path.islink(candidate):
+        return None
+    return candidate, '/'.join(reversed(inner_parts))
+
+
+def iter_member(reader, chunk_size=ARCHIVE_READ_CHUNK):
+    """Genera el contenido de un elemento por bloques y cierra el lector al terminar."""
+    try:
+        while True:
+            block = reader.read(chunk_size)
+            if not block:
+                break
+            yield block
+    finally:
+        reader.close()
@@ -0,0 +1,73 @@
+# compact.py
+import json # El formato compacto se serializa con json.dumps directamente (sin ordenar claves ni espacios).
+from flask import Response, jsonify # Para construir la respuesta con el tipo de contenido de cada formato.
+
+# msgpack es opcional: si no está instalado, el formato binario simplemente no se ofrece.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# --- Formatos Compactos para Listados y Búsquedas ---
+# El JSON de siempre repite las claves ('name', 'path', 'is_dir', 'is_file') en cada elemento y cada 'path'
+# repite el directorio padre. Con 100.000 elementos, la mayoría de los bytes (y del tiempo de jsonify) es relleno.
+# El formato compacto es opt-in (parámetro 'format=' o cabecera Accept) y envía:
+# - Columnas: una lista por campo en vez de un diccionario por elemento ({'name': [...], 'flags': [...], ...}).
+# - Un prefijo común ('base') en vez de la ruta completa de cada elemento: path = base + name.
+# - El tipo empaquetado en un entero pequeño ('flags'): 1 = directorio, 2 = archivo, 4 = enlace simbólico.
+# El mismo contenido se puede pedir en binario con msgpack (más pequeño y rápido de generar y de leer).
+
+FORMAT_JSON = 'json'
+FORMAT_COMPACT = 'compact'
+FORMAT_MSGPACK = 'msgpack'
+COMPACT_MIMETYPE = 'application/vnd.files-manager.compact+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+FLAG_DIR = 1
+FLAG_FILE = 2
+FLAG_SYMLINK = 4
+
+
+def available_formats():
+    """Formatos que este servidor puede generar (msgpack solo si la librería está instalada)."""
+    formats = [FORMAT_JSON, FORMAT_COMPACT]
+    if msgpack is not None:
+        formats.append(FORMAT_MSGPACK)
+    return formats
+
+
+def negotiate_format(req):
+    """
+    Decide el formato de la respuesta. El parámetro 'format=' manda; si no viene, se mira la cabecera Accept.
+    Devuelve (formato, None) o (None, mensaje_de_error).
+    """
+    explicit = req.args.get('format', '').strip().lower()
+    if explicit:
+        if explicit not in available_formats():
+            return None, f"Formato no disponible: '{explicit}'. Disponibles: {', '.join(available_formats())}"
+        return explicit, None
+    mimetypes = {'application/json': FORMAT_JSON, COMPACT_MIMETYPE: FORMAT_COMPACT}
+    if msgpack is not None:
+        mimetypes[MSGPACK_MIMETYPE] = FORMAT_MSGPACK
+    # El JSON va primero: un Accept genérico (*/*) de un navegador sigue recibiendo el JSON de siempre.
+    best = req.accept_mimetypes.best_match(list(mimetypes))
+    return mimetypes.get(best, FORMAT_JSON), None
+
+
+def entry_flags(is_dir, is_file, is_symlink=False):
+    """Empaqueta el tipo de un elemento en un entero pequeño."""
+    return (FLAG_DIR if is_dir else 0) | (FLAG_FILE if is_file else 0) | (FLAG_SYMLINK if is_symlink else 0)
+
+
+def make_response(payload, fmt):
+    """Serializa 'payload' en el formato elegido y devuelve la respuesta de Flask."""
+    if fmt == FORMAT_MSGPACK:
+        response = Response(msgpack.packb(payload, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+    elif fmt == FORMAT_COMPACT:
+        # Sin espacios, sin ordenar claves y sin escapar caracteres no ASCII: menos bytes y menos CPU.
+        body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+        response = Response(body, mimetype=COMPACT_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.vary.add('Accept') # La misma URL puede dar formatos distintos según la cabecera Accept.
+    return response
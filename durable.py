@@ -0,0 +1,240 @@
+# durable.py
+import ctypes # syncfs(2) de la libc: un solo vaciado de disco para todo un lote de escrituras.
+import errno # Para reconocer los sistemas de archivos que no admiten enlaces duros (creación exclusiva).
+import os # Archivos temporales, fsync, link y rename atómico.
+import tempfile # El contenido nuevo se escribe en un temporal junto al destino.
+import threading # El hilo de "group commit" y las esperas de quien escribe.
+from contextlib import contextmanager # atomic_write se usa con 'with'.
+
+# --- Escrituras Atómicas y Duraderas ---
+# Escribir directamente sobre el archivo final ('open(ruta, "w")') tiene dos problemas:
+# - Quien lo lea mientras tanto ve un archivo a medias, y si el servidor se cae queda truncado.
+# - Sin fsync, el contenido puede estar solo en la caché del kernel: un corte de luz lo pierde aunque el
+#   cliente ya recibió "creado correctamente".
+# Aquí el contenido se escribe en un temporal en la MISMA carpeta, se hace duradero y se publica con un rename
+# atómico (o un enlace duro, si el archivo no debe existir todavía): se ve la versión vieja o la nueva, nunca una
+# a medias. Después se hace duradera la propia carpeta (el rename vive en ella).
+# Cuánto se espera al disco lo decide FILES_MANAGER_DURABILITY:
+# - 'none': solo atomicidad (sin fsync). Tras una caída puede quedar la versión anterior.
+# - 'sync': un fdatasync por escritura, en el hilo de la petición.
+# - 'group' (por defecto): las peticiones entregan sus descriptores a un hilo de "group commit". Mientras ese hilo
+#   vacía un lote (un fdatasync por descriptor), las escrituras que llegan se acumulan en el siguiente. Cada petición
+#   espera a que su lote esté en disco antes de responder: misma garantía que 'sync', pero los hilos que atienden
+#   peticiones no hacen fsync y el sistema de archivos puede agrupar los de un lote en una sola confirmación.
+# Con FILES_MANAGER_GROUP_SYNCFS=1, los lotes de varios descriptores en el mismo sistema de archivos se vacían con UN
+# solo syncfs. Es opcional porque syncfs vacía TODO lo pendiente en ese disco, no solo el lote: si a la vez hay una
+# copia o un reemplazo de varios GB escribiendo, cada pequeña escritura esperaría a que termine de bajar a disco.
+
+DURABILITY_NONE = 'none'
+DURABILITY_SYNC = 'sync'
+DURABILITY_GROUP = 'group'
+DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_SYNC, DURABILITY_GROUP)
+GROUP_COMMIT_MAX_BATCH = 256 # Descriptores vaciados como máximo en un mismo lote.
+GROUP_SYNCFS = os.environ.get('FILES_MANAGER_GROUP_SYNCFS', '').strip().lower() in ('1', 'true', 'yes')
+TEMP_PREFIX = '.write-' # Prefijo de los temporales (si el servidor se cae, se reconocen fácilmente).
+
+_mode = os.environ.get('FILES_MANAGER_DURABILITY', DURABILITY_GROUP).strip().lower()
+if _mode not in DURABILITY_MODES:
+    print(f"durable.py: FILES_MANAGER_DURABILITY='{_mode}' no es válido ({', '.join(DURABILITY_MODES)}). Usando '{DURABILITY_GROUP}'.")
+    _mode = DURABILITY_GROUP
+DURABILITY = _mode
+
+# Permisos de los archivos nuevos: los mismos que daría open() (0o666 menos la umask), no los 0o600 de mkstemp.
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+# syncfs solo existe en Linux (y solo se usa si se activó FILES_MANAGER_GROUP_SYNCFS).
+_syncfs = None
+if GROUP_SYNCFS:
+    try:
+        _syncfs = ctypes.CDLL(None, use_errno=True).syncfs
+        _syncfs.argtypes = [ctypes.c_int]
+    except (OSError, AttributeError):
+        print("durable.py: syncfs no está disponible en esta plataforma; se usa un fdatasync por descriptor.")
+# fdatasync basta (el tamaño del archivo también se sincroniza) y no espera a metadatos como la fecha de acceso.
+_datasync = getattr(os, 'fdatasync', os.fsync)
+
+
+class _SyncRequest:
+    """Un descriptor esperando a que su lote llegue a disco."""
+
+    __slots__ = ('fd', 'dev', 'done', 'error')
+
+    def __init__(self, fd, dev):
+        self.fd = fd
+        self.dev = dev
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitter:
+    """Hilo que vacía a disco, por lotes, los descriptores que le entregan las peticiones."""
+
+    def __init__(self, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self.batches = 0
+        self.requests = 0
+
+    def sync(self, fd):
+        """Espera a que 'fd' esté en disco. Lanza OSError si el vaciado falló."""
+        request = _SyncRequest(fd, os.fstat(fd).st_dev)
+        with self._cond:
+            self._pending.append(request)
+            self._ensure_thread()
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+
+    def _ensure_thread(self):
+        # Se llama con el lock tomado.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_device = {}
+        for request in batch:
+            by_device.setdefault(request.dev, []).append(request)
+        for requests in by_device.values():
+            if len(requests) > 1 and _syncfs is not None:
+                # Un solo vaciado del sistema de archivos cubre todo el lote.
+                error = None
+                if _syncfs(requests[0].fd) != 0:
+                    code = ctypes.get_errno()
+                    error = OSError(code, os.strerror(code))
+                for request in requests:
+                    request.error = error
+                    request.done.set()
+                continue
+            for request in requests:
+                # Cada descriptor se vacía por separado: un error solo afecta a su petición.
+                try:
+                    _datasync(request.fd)
+                except OSError as e:
+                    request.error = e
+                request.done.set()
+        self.batches += 1
+        self.requests += len(batch)
+
+
+committer = GroupCommitter()
+
+
+def flush_fd(fd):
+    """Hace duradero lo escrito en 'fd' según el modo configurado."""
+    if DURABILITY == DURABILITY_SYNC:
+        _datasync(fd)
+    elif DURABILITY == DURABILITY_GROUP:
+        committer.sync(fd)
+
+
+def flush_dir(directory):
+    """Hace duraderas las entradas de 'directory' (un rename o un enlace nuevo vive en la carpeta)."""
+    if DURABILITY == DURABILITY_NONE:
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+    except OSError:
+        return # Plataformas que no permiten abrir carpetas: lo máximo que podemos hacer es el rename.
+    try:
+        flush_fd(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(tmp_path, path, fd=None, exclusive=False, data_synced=False):
+    """
+    Publica el temporal 'tmp_path' (ya escrito y en la misma carpeta) como 'path':
+    primero hace duradero su contenido (con 'fd' si lo tenemos abierto; si no, se abre un momento),
+    luego lo renombra atómicamente y por último hace duradera la carpeta.
+    Con 'exclusive', falla con FileExistsError si 'path' ya existe (en vez de reemplazarlo).
+    'data_synced' indica que el contenido ya se sincronizó (ej: en otro proceso).
+    Si algo falla, el temporal se borra.
+    """
+    try:
+        if not data_synced and DURABILITY != DURABILITY_NONE:
+            if fd is not None:
+                flush_fd(fd)
+            else:
+                tmp_fd = os.open(tmp_path, os.O_RDONLY)
+                try:
+                    flush_fd(tmp_fd)
+                finally:
+                    os.close(tmp_fd)
+        if exclusive:
+            _link_exclusive(tmp_path, path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        discard(tmp_path)
+        raise
+    flush_dir(os.path.dirname(path) or '.')
+
+
+def _link_exclusive(tmp_path, path):
+    """Como un rename, pero sin pisar nada: el enlace duro falla si 'path' ya existe."""
+    try:
+        os.link(tmp_path, path)
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EMLINK):
+            raise
+        # Sistemas de archivos sin enlaces duros (FAT, algunos montajes de red): comprobamos y renombramos.
+        if os.path.lexists(path):
+            raise FileExistsError(errno.EEXIST, 'El archivo ya existe', path)
+        os.rename(tmp_path, path)
+        return
+    os.unlink(tmp_path)
+
+
+def discard(tmp_path):
+    """Borra un temporal que no se va a publicar."""
+    try:
+        os.unlink(tmp_path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding=None, exclusive=False):
+    """
+    Escribe 'path' de forma atómica y duradera:
+        with atomic_write(ruta, 'w', encoding='utf-8', exclusive=True) as f:
+            f.write(contenido)
+    El archivo solo aparece (o cambia) si el bloque 'with' termina sin errores.
+    Si 'path' ya existe, el archivo nuevo conserva sus permisos.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+    try:
+        try:
+            permissions = os.stat(path).st_mode & 0o7777
+        except OSError:
+            permissions = NEW_FILE_MODE
+        os.fchmod(fd, permissions)
+        f = os.fdopen(fd, mode, encoding=encoding)
+    except BaseException:
+        os.close(fd)
+        discard(tmp_path)
+        raise
+    try:
+        with f:
+            yield f
+            f.flush()
+            publish(tmp_path, path, fd=f.fileno(), exclusive=exclusive)
+    except BaseException:
+        discard(tmp_path)
+        raise
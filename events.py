@@ -0,0 +1,292 @@
+# events.py
+import os # Para listar directorios (scandir) y comparar su contenido entre una vista y la siguiente.
+import queue # Cada suscriptor tiene su propia cola de eventos, acotada.
+import threading # El vigilante de cambios externos corre en un hilo de fondo.
+import time # Para el intervalo de sondeo y la marca de tiempo de los eventos.
+import uuid # Cada conexión SSE tiene un id para poder cambiar sus directorios de interés.
+from utils import get_root # Para calcular rutas relativas a la raíz de cada evento.
+from tail import tails # Seguidores de archivos que crecen (se despiertan con cada cambio hecho por la API).
+from resolver import invalidate # Descriptores de directorio cacheados que dejan de valer al borrar o renombrar.
+import search_cache # Resultados de búsqueda guardados que dejan de valer cuando algo cambia en la carpeta buscada.
+import listing_cache # Listados ya serializados del directorio donde cambió algo.
+
+# --- Eventos de Cambios en Directorios ---
+# Los clientes se suscriben a los directorios que están viendo y reciben eventos incrementales
+# ('add', 'remove', 'modify') en vez de volver a pedir el listado entero después de cada acción.
+# Hay dos fuentes de cambios y ambas pasan por el MISMO camino (comparar la vista guardada del directorio con la actual):
+# - Las mutaciones hechas por la API llaman a notify_change() en cuanto terminan.
+# - Un hilo vigilante sondea cada pocos segundos los directorios con suscriptores para detectar cambios externos
+#   (otros procesos, otros usuarios por SSH...). Primero mira la fecha del directorio (un solo stat) y solo
+#   relista si cambió; los directorios pequeños se revisan entero para detectar archivos modificados.
+# Así nunca se emite el mismo evento dos veces: quien llega segundo ya no ve diferencias.
+
+WATCH_POLL_INTERVAL = 2.0 # Segundos entre sondeos del vigilante.
+WATCH_FULL_STAT_LIMIT = 2000 # Directorios con más entradas solo se comparan por nombres (añadir/quitar).
+MAX_SUBSCRIBERS = 200 # Conexiones SSE simultáneas como máximo.
+SUBSCRIBER_QUEUE_SIZE = 1000 # Eventos pendientes por suscriptor antes de considerarlo atascado.
+KEEPALIVE_INTERVAL = 15 # Segundos sin eventos tras los que mandamos un comentario para mantener viva la conexión.
+
+
+def _snapshot_entry(entry, with_stat):
+    """Resume una entrada de scandir: (es_directorio, tamaño, mtime_ns). Tamaño y fecha solo si 'with_stat'."""
+    try:
+        is_dir = entry.is_dir()
+        if with_stat:
+            st = entry.stat()
+            return (is_dir, st.st_size, st.st_mtime_ns)
+        return (is_dir, None, None)
+    except OSError:
+        return (False, None, None)
+
+
+def _take_snapshot(full_dir, force_names=()):
+    """
+    Lista 'full_dir' y devuelve {nombre: (is_dir, size, mtime_ns)}.
+    En directorios grandes solo se hace stat de los nombres en 'force_names'.
+    """
+    with os.scandir(full_dir) as it:
+        entries = list(it)
+    with_stat = len(entries) <= WATCH_FULL_STAT_LIMIT
+    return {entry.name: _snapshot_entry(entry, with_stat or entry.name in force_names) for entry in entries}
+
+
+class Subscriber:
+    """Una conexión SSE: su cola de eventos y el conjunto de directorios (raíz, ruta relativa) que le interesan."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dirs = set()
+        self.overflowed = False # Si la cola se llenó, el cliente debe volver a listar (perdió eventos).
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class ChangeHub:
+    """Registro de suscriptores y de la última vista conocida de cada directorio vigilado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {} # id -> Subscriber
+        self._watched = {} # (raíz, dir_relativo) -> {'subs': set(ids), 'mtime_ns': int, 'snapshot': dict}
+        self._watcher = None
+
+    # --- Suscripciones ---
+
+    def subscribe(self):
+        """Crea un suscriptor nuevo (o None si ya hay demasiados)."""
+        with self._lock:
+            if len(self._subscribers) >= MAX_SUBSCRIBERS:
+                return None
+            sub = Subscriber()
+            self._subscribers[sub.id] = sub
+        self._ensure_watcher()
+        return sub
+
+    def unsubscribe(self, sub_id):
+        with self._lock:
+            sub = self._subscribers.pop(sub_id, None)
+            if sub:
+                for key in sub.dirs:
+                    self._drop_interest(key, sub_id)
+
+    def get(self, sub_id):
+        with self._lock:
+            return self._subscribers.get(sub_id)
+
+    def set_interest(self, sub_id, root_name, full_dirs):
+        """Reemplaza los directorios que le interesan al suscriptor. Devuelve False si el suscriptor no existe."""
+        root = get_root(root_name)
+        new_keys = {(root.name, _rel_dir(root, d)) for d in full_dirs}
+        fresh = []
+        with self._lock:
+            sub = self._subscribers.get(sub_id)
+            if not sub:
+                return False
+            for key in sub.dirs - new_keys:
+                self._drop_interest(key, sub_id)
+            for key in new_keys - sub.dirs:
+                watched = self._watched.get(key)
+                if watched is None:
+                    watched = {'subs': set(), 'mtime_ns': None, 'snapshot': None, 'refresh_lock': threading.Lock()}
+                    self._watched[key] = watched
+                    fresh.append(key)
+                watched['subs'].add(sub_id)
+            sub.dirs = new_keys
+        # La primera vista de un directorio recién vigilado se toma fuera del lock (scandir puede tardar).
+        for key in fresh:
+            self._refresh(key, emit=False)
+        return True
+
+    def _drop_interest(self, key, sub_id):
+        """Quita el interés de un suscriptor por un directorio. Se llama con el lock tomado."""
+        watched = self._watched.get(key)
+        if watched:
+            watched['subs'].discard(sub_id)
+            if not watched['subs']:
+                del self._watched[key]
+
+    # --- Detección de cambios ---
+
+    def _refresh(self, key, emit=True, force_names=(), check_mtime=False):
+        """
+        Compara la vista guardada de un directorio con la actual y publica las diferencias.
+        Si 'check_mtime' es True y el directorio no cambió de fecha, solo se revisa si es pequeño.
+        Los refrescos de un mismo directorio van de uno en uno (su 'refresh_lock'): si dos se solaparan, el que tomó la
+        vista más vieja podría guardarla el último y publicar 'remove'/'add' falsos de un archivo recién creado.
+        """
+        root_name, rel_dir = key
+        root = get_root(root_name)
+        if root is None:
+            return
+        with self._lock:
+            watched = self._watched.get(key)
+            if watched is None:
+                return
+            refresh_lock = watched['refresh_lock']
+        with refresh_lock:
+            self._refresh_locked(key, watched, root, rel_dir, emit, force_names, check_mtime)
+
+    def _refresh_locked(self, key, watched, root, rel_dir, emit, force_names, check_mtime):
+        """
+        Cuerpo de _refresh. Se llama con el 'refresh_lock' de 'watched' tomado. Si el directorio se dejó de vigilar
+        (y quizá se volvió a vigilar, con otro 'watched'), no se toca nada.
+        """
+        full_dir = root.path if not rel_dir else os.path.join(root.path, rel_dir.replace('/', os.sep))
+        with self._lock:
+            if self._watched.get(key) is not watched:
+                return
+            old_mtime = watched['mtime_ns']
+            old_snapshot = watched['snapshot']
+        try:
+            mtime_ns = os.stat(full_dir).st_mtime_ns
+            if check_mtime and mtime_ns == old_mtime and old_snapshot is not None \
+                    and len(old_snapshot) > WATCH_FULL_STAT_LIMIT:
+                return # Directorio grande sin cambios de fecha: no relistamos.
+            snapshot = _take_snapshot(full_dir, force_names)
+        except OSError:
+            # El directorio desapareció: no hay nada que listar.
+            mtime_ns, snapshot = None, {}
+
+        with self._lock:
+            if self._watched.get(key) is not watched:
+                return
+            # Nadie más refresca este directorio mientras tanto: la vista guardada sigue siendo 'old_snapshot'.
+            watched['snapshot'] = snapshot
+            watched['mtime_ns'] = mtime_ns
+            subs = [self._subscribers[s] for s in watched['subs'] if s in self._subscribers]
+
+        if not emit or old_snapshot is None or not subs:
+            return
+        for event in _diff_snapshots(root, rel_dir, old_snapshot, snapshot, force_names):
+            for sub in subs:
+                sub.push(event)
+
+    def notify_change(self, root_name, full_path):
+        """
+        Avisa de que 'full_path' (archivo o directorio) fue creado, borrado o modificado por la API.
+        Refresca su directorio padre (y el propio directorio, si lo borraron y alguien lo miraba).
+        """
+        root = get_root(root_name)
+        if root is None:
+            return
+        parent_key = (root.name, _rel_dir(root, os.path.dirname(full_path)))
+        self_key = (root.name, _rel_dir(root, full_path))
+        with self._lock:
+            keys = [k for k in (parent_key, self_key) if k in self._watched]
+        for key in keys:
+            force = (os.path.basename(full_path),) if key == parent_key else ()
+            self._refresh(key, force_names=force)
+
+    def poll_once(self):
+        """Una pasada del vigilante por todos los directorios con suscriptores."""
+        with self._lock:
+            keys = list(self._watched)
+        for key in keys:
+            self._refresh(key, check_mtime=True)
+
+    # --- Hilo vigilante ---
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch_loop, name='dir-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(WATCH_POLL_INTERVAL)
+            with self._lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    return # Sin suscriptores no hay nada que vigilar; el hilo se recrea cuando haga falta.
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"events.py: Error en el vigilante de directorios: {e}")
+
+
+def _rel_dir(root, full_dir):
+    """Ruta relativa (con '/') de un directorio respecto a su raíz; '' para la propia raíz."""
+    rel = os.path.relpath(full_dir, root.path)
+    return '' if rel == '.' else rel.replace(os.sep, '/')
+
+
+def _diff_snapshots(root, rel_dir, old, new, force_names=()):
+    """Genera los eventos 'add', 'remove' y 'modify' entre dos vistas de un directorio."""
+    events = []
+    now = time.time()
+
+    def make(kind, name, info):
+        is_dir = bool(info and info[0])
+        return {
+            'event': kind,
+            'root': root.name,
+            'dir': rel_dir,
+            'item': {
+                'name': name,
+                'path': f'{rel_dir}/{name}' if rel_dir else name,
+                'is_dir': is_dir,
+                'is_file': not is_dir,
+                # Mismos campos que pide el navegador en /api/browse (si la vista tiene stat de la entrada).
+                'size': info[1] if info and not is_dir else None,
+                'mtime': info[2] / 1e9 if info and info[2] is not None else None,
+            },
+            'time': now,
+        }
+
+    for name in old.keys() - new.keys():
+        events.append(make('remove', name, old[name]))
+    for name in new.keys() - old.keys():
+        events.append(make('add', name, new[name]))
+    for name in new.keys() & old.keys():
+        before, after = old[name], new[name]
+        if before[0] != after[0]:
+            # Cambió de tipo (se borró un archivo y se creó un directorio con el mismo nombre).
+            events.append(make('remove', name, before))
+            events.append(make('add', name, after))
+        elif after[1] is not None and (before[1], before[2]) != (after[1], after[2]) \
+                and (before[1] is not None or name in force_names):
+            events.append(make('modify', name, after))
+    return events
+
+
+# Instancia única usada por toda la aplicación.
+hub = ChangeHub()
+
+
+def notify_change(root_name, full_path):
+    """Atajo para que los endpoints de mutación avisen de un cambio. Nunca lanza excepciones."""
+    try:
+        invalidate(root_name, full_path) # Si era un directorio borrado o renombrado, su descriptor ya no vale.
+        search_cache.invalidate(root_name, full_path) # Las búsquedas guardadas de las carpetas que lo contienen, también.
+        listing_cache.invalidate(root_name, full_path) # Y los listados guardados de su directorio.
+        hub.notify_change(root_name, full_path)
+        tails.wake(full_path) # Quien siga este archivo (/api/tail) recibe los bytes nuevos sin esperar al sondeo.
+    except Exception as e:
+        print(f"events.py: Error notificando el cambio de '{full_path}': {e}")
@@ -0,0 +1,564 @@
+# fileops.py
+import os # Todas las operaciones de bajo nivel con archivos (descriptores, copy_file_range, sendfile, rename...).
+import ctypes # renameat2(RENAME_NOREPLACE) de la libc: mover sin pisar lo que haya en el destino.
+import errno # Para distinguir 'no soportado' de 'ya existe' al mover sin reemplazar.
+import base64 # Los parches pueden traer bytes binarios codificados en base64.
+import hashlib # Para calcular el checksum (SHA-256) del archivo base de un parche.
+import itertools # Sumas acumuladas para la suma rodante de cada bloque.
+import mmap # Los deltas rodantes recorren el archivo mapeado en memoria, sin leerlo entero.
+import tempfile # Los parches se escriben en un archivo temporal junto al original.
+import shutil # Para copiar permisos/fechas (copystat) y como último recurso de copia (copyfileobj).
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait # Para copiar muchos archivos pequeños en paralelo.
+from contextlib import contextmanager # Para aceptar tanto rutas como archivos ya abiertos.
+from durable import TEMP_PREFIX, discard, publish # Publicación atómica y duradera de copias y archivos reescritos.
+
+# --- Operaciones de Archivos de Bajo Nivel ---
+# Aquí agrupamos las funciones que copian y mueven datos dentro del servidor.
+# La idea es que los bytes NUNCA pasen por el navegador: el kernel los copia directamente de un archivo a otro.
+
+# Tamaño máximo de cada llamada a copy_file_range/sendfile. Trozos grandes = menos llamadas al sistema.
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# Número de hilos para copiar árboles con muchos archivos.
+DEFAULT_COPY_WORKERS = 8
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+
+# renameat2 solo existe en Linux (glibc 2.28+). Sin él, rename_exclusive usa enlaces duros o un directorio reservado.
+try:
+    _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+except (OSError, AttributeError):
+    _renameat2 = None
+
+
+def same_filesystem(path_a, path_b):
+    """
+    Indica si dos rutas (existentes) están en el mismo sistema de archivos.
+    Si es así, mover es un simple os.rename (instantáneo, sin copiar datos).
+    """
+    try:
+        return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+    except OSError:
+        return False
+
+
+def copy_range(src_fd, dst_fd, offset, count, dst_offset=None):
+    """
+    Copia 'count' bytes desde 'offset' en 'src_fd' hacia 'dst_fd'.
+    Si 'dst_offset' es None, escribe en la posición actual de 'dst_fd' (y la avanza).
+    Intenta primero os.copy_file_range (copia dentro del kernel, incluso reflink en algunos FS),
+    luego os.sendfile, y si ninguno está disponible, lee y escribe por bloques en espacio de usuario.
+    Devuelve el número de bytes copiados.
+    """
+    copied = 0
+    use_copy_file_range = hasattr(os, 'copy_file_range')
+    use_sendfile = hasattr(os, 'sendfile')
+
+    while copied < count:
+        chunk = min(COPY_CHUNK_SIZE, count - copied)
+        n = None
+        if use_copy_file_range:
+            try:
+                if dst_offset is None:
+                    n = os.copy_file_range(src_fd, dst_fd, chunk, offset + copied)
+                else:
+                    n = os.copy_file_range(src_fd, dst_fd, chunk, offset + copied, dst_offset + copied)
+            except OSError:
+                # EXDEV (distinto FS en kernels antiguos), ENOSYS, EINVAL... pasamos al siguiente método.
+                use_copy_file_range = False
+                n = None
+        if n is None and use_sendfile and dst_offset is None:
+            try:
+                n = os.sendfile(dst_fd, src_fd, offset + copied, chunk)
+            except OSError:
+                use_sendfile = False
+                n = None
+        if n is None:
+            # Último recurso: copia clásica por bloques con pread/write.
+            data = os.pread(src_fd, chunk, offset + copied)
+            n = len(data)
+            if n:
+                if dst_offset is None:
+                    os.write(dst_fd, data)
+                else:
+                    os.pwrite(dst_fd, data, dst_offset + copied)
+        if n == 0:
+            break # Fin del archivo origen (se truncó mientras copiábamos).
+        copied += n
+    return copied
+
+
+def copy_file_data(src_path, dst_path, progress=None):
+    """
+    Copia un archivo completo de 'src_path' a 'dst_path' usando copy_range (copia en el kernel).
+    Conserva permisos y fechas. 'progress(nbytes)' se llama con los bytes copiados.
+    La copia se hace en un temporal junto al destino que se publica al terminar (durable.publish): nadie ve el
+    destino a medias y, si la copia falla (disco lleno, error de lectura...), no queda un archivo truncado.
+    Como antes, falla con FileExistsError si 'dst_path' ya existe.
+    """
+    src_fd = os.open(src_path, os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=os.path.dirname(dst_path) or '.')
+        try:
+            copied = copy_range(src_fd, dst_fd, 0, size)
+            shutil.copystat(src_path, tmp_path) # Permisos y fechas antes de publicar (el rename los conserva).
+            publish(tmp_path, dst_path, fd=dst_fd, exclusive=True)
+        except BaseException:
+            discard(tmp_path)
+            raise
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    if progress:
+        progress(copied)
+    return copied
+
+
+def plan_tree_copy(src_dir, dst_dir):
+    """
+    Recorre 'src_dir' y devuelve (directorios_a_crear, pares_de_archivos, bytes_totales).
+    Los enlaces simbólicos se recrean como enlaces (no los seguimos para no salirnos del árbol).
+    """
+    dirs = [dst_dir]
+    files = []
+    symlinks = []
+    total_bytes = 0
+    for root, dirnames, filenames in os.walk(src_dir):
+        rel_root = os.path.relpath(root, src_dir)
+        target_root = dst_dir if rel_root == '.' else os.path.join(dst_dir, rel_root)
+        for name in dirnames:
+            src = os.path.join(root, name)
+            if os.path.islink(src):
+                symlinks.append((src, os.path.join(target_root, name)))
+            else:
+                dirs.append(os.path.join(target_root, name))
+        for name in filenames:
+            src = os.path.join(root, name)
+            dst = os.path.join(target_root, name)
+            if os.path.islink(src):
+                symlinks.append((src, dst))
+                continue
+            files.append((src, dst))
+            try:
+                total_bytes += os.path.getsize(src)
+            except OSError:
+                pass
+    return dirs, files, symlinks, total_bytes
+
+
+def copy_tree(src_dir, dst_dir, job=None, executor=None, max_workers=DEFAULT_COPY_WORKERS):
+    """
+    Copia un árbol de directorios completo. Los archivos se copian en paralelo con un pool de hilos:
+    con muchos archivos pequeños la latencia por archivo domina y el paralelismo ayuda mucho.
+    Si se pasa un 'executor' se usa ese pool; si no, se crea uno temporal.
+    Si la copia falla, se borra lo que se llegó a crear: el destino queda como estaba (sin el árbol).
+    """
+    dirs, files, symlinks, total_bytes = plan_tree_copy(src_dir, dst_dir)
+    if job:
+        job.add_total(items=len(files) + len(symlinks), nbytes=total_bytes)
+
+    os.makedirs(dst_dir) # Si el destino ya existe, falla aquí y no tocamos nada suyo.
+    try:
+        _fill_tree(src_dir, dirs, files, symlinks, job, executor, max_workers)
+    except BaseException:
+        # Una copia a medias no debe quedarse en el destino (ni, en un movimiento, parecer ya movida).
+        shutil.rmtree(dst_dir, ignore_errors=True)
+        raise
+
+
+def _fill_tree(src_dir, dirs, files, symlinks, job, executor, max_workers):
+    """Crea dentro del destino (ya creado, dirs[0]) las carpetas, los enlaces y los archivos de copy_tree."""
+    dst_dir = dirs[0]
+    # Primero los directorios (en orden, los padres antes que los hijos).
+    for d in dirs[1:]:
+        os.makedirs(d, exist_ok=True)
+    for src, dst in symlinks:
+        os.symlink(os.readlink(src), dst)
+        if job:
+            job.advance(items=1)
+
+    def copy_one(pair):
+        src, dst = pair
+        copied = copy_file_data(src, dst)
+        if job:
+            job.advance(items=1, nbytes=copied)
+        return copied
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='copy-tree')
+    futures = []
+    try:
+        futures = [executor.submit(copy_one, pair) for pair in files]
+        for future in as_completed(futures):
+            future.result() # Propaga la primera excepción que haya ocurrido.
+    except BaseException:
+        # Las copias que aún no empezaron se cancelan y se espera a las que están en marcha:
+        # así nadie sigue escribiendo en el destino mientras quien nos llamó lo borra.
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+
+    # Las fechas de los directorios se copian al final (crear archivos dentro las modifica).
+    for root, dirnames, _ in os.walk(src_dir):
+        rel_root = os.path.relpath(root, src_dir)
+        target_root = dst_dir if rel_root == '.' else os.path.join(dst_dir, rel_root)
+        try:
+            shutil.copystat(root, target_root)
+        except OSError:
+            pass
+
+
+def copy_item(src_path, dst_path, job=None, executor=None):
+    """Copia un archivo o un directorio completo de 'src_path' a 'dst_path'."""
+    if os.path.isdir(src_path) and not os.path.islink(src_path):
+        copy_tree(src_path, dst_path, job=job, executor=executor)
+    elif os.path.islink(src_path):
+        os.symlink(os.readlink(src_path), dst_path)
+        if job:
+            job.add_total(items=1)
+            job.advance(items=1)
+    else:
+        if job:
+            job.add_total(items=1, nbytes=os.path.getsize(src_path))
+        copy_file_data(src_path, dst_path, progress=(lambda n: job.advance(items=1, nbytes=n)) if job else None)
+
+
+def rename_exclusive(src_path, dst_path):
+    """
+    Como os.rename, pero sin pisar nunca el destino: lanza FileExistsError si 'dst_path' ya existe,
+    aunque alguien lo cree justo antes (os.rename lo reemplazaría en silencio).
+    """
+    if _renameat2 is not None:
+        if _renameat2(_AT_FDCWD, os.fsencode(src_path), _AT_FDCWD, os.fsencode(dst_path), _RENAME_NOREPLACE) == 0:
+            return
+        code = ctypes.get_errno()
+        if code not in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise OSError(code, os.strerror(code), src_path, None, dst_path)
+        # El sistema de archivos no admite RENAME_NOREPLACE: seguimos con los métodos de abajo.
+    if os.path.isdir(src_path) and not os.path.islink(src_path):
+        # Reservamos el nombre con un mkdir (falla si ya existe) y renombramos sobre esa carpeta vacía, que es nuestra.
+        # Si alguien mete algo dentro entre medias, el rename falla (ENOTEMPTY) en vez de reemplazarlo.
+        os.mkdir(dst_path)
+        try:
+            os.rename(src_path, dst_path)
+        except OSError as e:
+            try:
+                os.rmdir(dst_path)
+            except OSError:
+                pass
+            if e.errno in (errno.ENOTEMPTY, errno.EEXIST):
+                raise FileExistsError(errno.EEXIST, 'El destino ya existe', dst_path)
+            raise
+        return
+    try:
+        os.link(src_path, dst_path, follow_symlinks=False) # Falla con FileExistsError si el destino ya existe.
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK):
+            raise
+        # Sin enlaces duros (FAT, algunos montajes de red): lo máximo que podemos hacer es comprobar y renombrar.
+        if os.path.lexists(dst_path):
+            raise FileExistsError(errno.EEXIST, 'El destino ya existe', dst_path)
+        os.rename(src_path, dst_path)
+        return
+    os.unlink(src_path)
+
+
+def move_item(src_path, dst_path, job=None, executor=None):
+    """
+    Mueve un archivo o directorio. Si origen y destino comparten sistema de archivos,
+    es un rename atómico e instantáneo (sin reemplazar: FileExistsError si el destino ya existe).
+    Si no, copiamos (en el kernel) y luego borramos el origen.
+    Si la copia falla, el origen sigue intacto y en el destino no queda nada a medias.
+    Devuelve 'rename' o 'copy' según el método usado.
+    """
+    if same_filesystem(src_path, os.path.dirname(dst_path)):
+        rename_exclusive(src_path, dst_path)
+        if job:
+            job.add_total(items=1)
+            job.advance(items=1)
+        return 'rename'
+    copy_item(src_path, dst_path, job=job, executor=executor)
+    if os.path.isdir(src_path) and not os.path.islink(src_path):
+        shutil.rmtree(src_path)
+    else:
+        os.remove(src_path)
+    return 'copy'
+
+
+# --- Parches por Deltas ---
+# Para editar un archivo grande sin reenviarlo entero, el cliente manda solo los cambios como una lista de operaciones:
+#   {'copy': [offset, length]}  -> copia 'length' bytes del archivo original desde 'offset'.
+#   {'data': 'texto'}           -> inserta ese texto (UTF-8).
+#   {'data_b64': '...'}         -> inserta esos bytes (codificados en base64).
+# Es el mismo formato que produce un delta estilo rsync. El resultado se escribe en un archivo temporal
+# (copiando en el kernel los rangos sin cambios) y se renombra atómicamente sobre el original.
+
+@contextmanager
+def _binary_source(source):
+    """Abre 'source' en binario si es una ruta; si ya es un archivo abierto (ej: de resolver.py), lo usa tal cual."""
+    if hasattr(source, 'read'):
+        yield source
+    else:
+        with open(source, 'rb') as f:
+            yield f
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Calcula el SHA-256 de un archivo (ruta o archivo abierto en binario) leyéndolo por bloques (memoria acotada)."""
+    digest = hashlib.sha256()
+    with _binary_source(path) as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _op_bytes(op):
+    """Devuelve los bytes literales de una operación de datos."""
+    if 'data_b64' in op:
+        return base64.b64decode(op['data_b64'], validate=True)
+    return str(op['data']).encode('utf-8')
+
+
+def edits_to_delta(edits, base_size):
+    """
+    Convierte una lista de reemplazos por rangos de bytes [{'offset', 'length', 'data'|'data_b64'}, ...]
+    en una lista de operaciones delta (copy/data) equivalente. Los rangos no pueden solaparse.
+    """
+    if not all(isinstance(edit, dict) for edit in edits):
+        raise ValueError("Cada edición debe ser un objeto {'offset', 'length', 'data'|'data_b64'}")
+    ops = []
+    position = 0
+    for edit in sorted(edits, key=lambda e: int(e.get('offset', 0))):
+        offset = int(edit.get('offset', 0))
+        length = int(edit.get('length', 0))
+        if offset < position or length < 0 or offset + length > base_size:
+            raise ValueError(f'Rango de edición no válido: offset={offset}, length={length}')
+        if offset > position:
+            ops.append({'copy': [position, offset - position]})
+        if 'data' in edit or 'data_b64' in edit:
+            ops.append({k: edit[k] for k in ('data', 'data_b64') if k in edit})
+        position = offset + length
+    if position < base_size:
+        ops.append({'copy': [position, base_size - position]})
+    return ops
+
+
+def delta_output_size(ops):
+    """
+    Calcula el tamaño que tendrá el archivo tras aplicar 'ops', sin leer ni escribir nada
+    (las cuotas necesitan saberlo antes de escribir). El base64 no se decodifica: su longitud basta.
+    """
+    size = 0
+    for op in ops:
+        if 'copy' in op:
+            size += max(0, int(op['copy'][1]))
+        elif 'data_b64' in op:
+            encoded = str(op['data_b64'])
+            size += len(encoded) // 4 * 3 - len(encoded) + len(encoded.rstrip('='))
+        elif 'data' in op:
+            size += len(str(op['data']).encode('utf-8'))
+    return size
+
+
+class DeltaConflict(Exception):
+    """El archivo base no es el que esperaba el parche (o cambió mientras se aplicaba)."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _file_identity(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def apply_delta(path, ops, base_size=None, base_sha256=None):
+    """
+    Aplica una lista de operaciones delta sobre el archivo 'path' y reemplaza el original de forma atómica.
+    Devuelve un diccionario con el tamaño nuevo, los bytes copiados del original y los bytes literales recibidos.
+    'base_size' y 'base_sha256' (opcionales) se comprueban sobre el MISMO descriptor del que se copian los rangos,
+    y antes de publicar se comprueba que nadie cambió el archivo mientras tanto (ej: un /api/append_file).
+    Lanza ValueError si alguna operación no es válida y DeltaConflict si el archivo base no coincide o cambió.
+    """
+    directory = os.path.dirname(path)
+    src = open(path, 'rb')
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.patch')
+    copied = literal = 0
+    try:
+        try:
+            src_fd = src.fileno()
+            identity = _file_identity(os.fstat(src_fd))
+            current_size = identity[2]
+            if base_size is not None and int(base_size) != current_size:
+                raise DeltaConflict(f'El archivo base cambió (tamaño {current_size}, se esperaba {base_size})')
+            if base_sha256 and file_sha256(src) != str(base_sha256).lower():
+                raise DeltaConflict('El archivo base cambió (checksum distinto)')
+            for op in ops:
+                if 'copy' in op:
+                    offset, length = (int(v) for v in op['copy'])
+                    if offset < 0 or length < 0 or offset + length > current_size:
+                        raise ValueError(f'Rango de copia fuera del archivo: offset={offset}, length={length}')
+                    copied += copy_range(src_fd, tmp_fd, offset, length)
+                elif 'data' in op or 'data_b64' in op:
+                    data = _op_bytes(op)
+                    view = memoryview(data)
+                    while view:
+                        written = os.write(tmp_fd, view)
+                        view = view[written:]
+                    literal += len(data)
+                else:
+                    raise ValueError(f'Operación delta desconocida: {sorted(op)}')
+        finally:
+            src.close()
+            os.close(tmp_fd)
+        shutil.copymode(path, tmp_path) # El archivo nuevo conserva los permisos del original.
+        # Si alguien escribió en el original mientras tanto, publicar perdería su cambio sin avisar.
+        if _file_identity(os.stat(path)) != identity:
+            raise DeltaConflict('El archivo cambió mientras se aplicaba el parche')
+        # Reemplazo atómico y duradero: los lectores ven el archivo viejo o el nuevo, nunca uno a medias.
+        publish(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {'size': copied + literal, 'copied_bytes': copied, 'literal_bytes': literal}
+
+
+# --- Deltas por Suma Rodante (estilo rsync) ---
+# Para sincronizar un archivo con una copia vieja que está en otro sitio (ej: una réplica), la copia vieja manda
+# su "firma": una suma débil y una fuerte por cada bloque. Aquí se recorre el archivo nuevo con una ventana del
+# tamaño de un bloque cuya suma débil se actualiza en O(1) al avanzar un byte (suma rodante); solo cuando la suma
+# débil coincide se calcula la fuerte. El resultado es una lista de operaciones delta en el mismo formato que
+# /api/patch_file: los bloques que ya tiene la copia se referencian con 'copy' y solo viajan los bytes nuevos.
+
+SIGNATURE_BLOCK_SIZE = 8 * 1024 # Tamaño de bloque de las firmas.
+ROLLING_SKIP_BLOCKS = 16 # En zonas sin coincidencias, bloques que se saltan entre cada recorrido byte a byte.
+_ROLL_MOD = 1 << 16
+
+
+def _weak_sums(block):
+    """Sumas débiles (a, b) de un bloque: a = suma de bytes, b = suma ponderada por posición (como rsync)."""
+    return sum(block) % _ROLL_MOD, sum(itertools.accumulate(block)) % _ROLL_MOD
+
+
+def _strong_sum(block):
+    """Suma fuerte de un bloque (solo se calcula cuando la débil coincide)."""
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+
+def file_signature(path, block_size=SIGNATURE_BLOCK_SIZE):
+    """
+    Calcula la firma de un archivo: {'block_size', 'size', 'blocks': [[suma_débil, suma_fuerte], ...]}.
+    El último bloque puede ser más corto que 'block_size'. 'path' también puede ser un archivo abierto en binario.
+    """
+    blocks = []
+    size = 0
+    with _binary_source(path) as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            a, b = _weak_sums(block)
+            blocks.append([a | (b << 16), _strong_sum(block)])
+            size += len(block)
+    return {'block_size': block_size, 'size': size, 'blocks': blocks}
+
+
+def rolling_delta(path, signature):
+    """
+    Calcula las operaciones delta que convierten el archivo descrito por 'signature' en el archivo 'path'.
+    Devuelve una lista de {'copy': [offset, length]} (bloques que ya tiene el otro lado) y {'data_b64': ...} (bytes nuevos).
+    """
+    block_size = int(signature['block_size'])
+    base_size = int(signature.get('size', 0))
+    index = {} # suma_débil -> [(suma_fuerte, número_de_bloque), ...] (solo bloques completos)
+    tail = None # El último bloque si es más corto: (longitud, suma_fuerte, offset).
+    for number, (weak, strong) in enumerate(signature['blocks']):
+        offset = number * block_size
+        length = min(block_size, base_size - offset)
+        if length == block_size:
+            index.setdefault(weak, []).append((strong, number))
+        else:
+            tail = (length, strong, offset)
+
+    ops = []
+
+    def add_copy(offset, length):
+        last = ops[-1] if ops else None
+        if last and 'copy' in last and last['copy'][0] + last['copy'][1] == offset:
+            last['copy'][1] += length # Bloques consecutivos: una sola operación.
+        else:
+            ops.append({'copy': [offset, length]})
+
+    def add_literal(data):
+        if data:
+            ops.append({'data_b64': base64.b64encode(data).decode('ascii')})
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return ops
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            pos = literal_start = 0
+            if index and size >= block_size:
+                expected = 0 # Bloque del otro lado que esperamos a continuación (el siguiente al último que coincidió).
+                # Bytes que quedan por recorrer de uno en uno antes de saltar por bloques. Dos bloques: un cambio dentro de
+                # un bloque (ej: unos bytes insertados) se reencuentra como mucho un bloque más allá, algo desplazado.
+                probe_left = 2 * block_size
+                skip_left = 0 # Bloques que quedan por saltar antes de volver a recorrer byte a byte.
+                window_ready = False # True si (a, b) son las sumas de la ventana que empieza en 'pos'.
+                while pos + block_size <= size:
+                    match = None
+                    # Atajo 1: justo tras una coincidencia (o al principio), lo normal es que siga el bloque siguiente
+                    # del otro lado (partes sin cambios, archivos a los que solo se añadió). Una suma fuerte, sin rodar.
+                    if pos == literal_start and (expected + 1) * block_size <= base_size:
+                        if _strong_sum(data[pos:pos + block_size]) == signature['blocks'][expected][1]:
+                            match = expected
+                    if match is None:
+                        if not window_ready:
+                            a, b = _weak_sums(data[pos:pos + block_size])
+                            window_ready = True
+                        candidates = index.get(a | (b << 16))
+                        if candidates:
+                            strong = _strong_sum(data[pos:pos + block_size])
+                            match = next((n for s, n in candidates if s == strong), None)
+                    if match is not None:
+                        add_literal(data[literal_start:pos])
+                        add_copy(match * block_size, block_size)
+                        pos += block_size
+                        literal_start = pos
+                        expected = match + 1
+                        probe_left, skip_left, window_ready = 2 * block_size, 0, False
+                        continue
+                    if probe_left > 0:
+                        if pos + block_size < size:
+                            # Avanzamos la ventana un byte: sale data[pos] y entra data[pos + block_size].
+                            out_byte, in_byte = data[pos], data[pos + block_size]
+                            a = (a - out_byte + in_byte) % _ROLL_MOD
+                            b = (b - block_size * out_byte + a) % _ROLL_MOD
+                        pos += 1
+                        probe_left -= 1
+                        if probe_left == 0:
+                            skip_left = ROLLING_SKIP_BLOCKS
+                    else:
+                        # Atajo 2: ya probamos todos los desplazamientos de dos bloques sin coincidencias (zona
+                        # nueva o muy cambiada). Avanzar byte a byte en Python por toda la zona costaría minutos en
+                        # archivos grandes, así que saltamos de bloque en bloque (mirando solo esas posiciones) y cada
+                        # ROLLING_SKIP_BLOCKS bloques volvemos a recorrer dos byte a byte para reencontrar la alineación.
+                        # Como mucho se envían como literales ROLLING_SKIP_BLOCKS bloques que el otro lado ya tenía.
+                        pos += block_size
+                        window_ready = False
+                        skip_left -= 1
+                        if skip_left == 0:
+                            probe_left = 2 * block_size
+            end = size
+            if tail is not None and size - tail[0] >= literal_start and _strong_sum(data[size - tail[0]:size]) == tail[1]:
+                end = size - tail[0] # El final coincide con el último bloque (corto) del otro lado.
+            add_literal(data[literal_start:end])
+            if end < size:
+                add_copy(tail[2], tail[0])
+    return ops
@@ -0,0 +1,124 @@
+# jobs.py
+import threading # Los trabajos largos (copiar, mover...) se ejecutan en hilos de fondo para no bloquear la petición HTTP.
+import time # Para guardar cuándo empezó y terminó cada trabajo.
+import traceback # Para loguear el error completo si un trabajo falla.
+import uuid # Cada trabajo se identifica con un id único que el frontend usa para consultar el progreso.
+from collections import OrderedDict # Mantiene el orden de creación, así podemos descartar los trabajos más antiguos.
+
+# --- Registro de Trabajos ---
+# Guardamos los trabajos en memoria. Es suficiente para un solo proceso; si el servidor se reinicia, se pierden.
+# Limitamos cuántos trabajos TERMINADOS recordamos para que el registro no crezca sin control.
+MAX_FINISHED_JOBS = 200
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    """
+    Representa una operación larga que se ejecuta en segundo plano (ej: copiar un árbol de directorios).
+    El frontend consulta su estado con el 'id' para ir mostrando el progreso.
+    """
+
+    def __init__(self, kind, description=''):
+        self.id = uuid.uuid4().hex # Identificador único del trabajo.
+        self.kind = kind # Tipo de trabajo ('copy', 'move', ...).
+        self.description = description # Texto legible para mostrar en el frontend.
+        self.status = 'pending' # Estados posibles: 'pending', 'running', 'done', 'error'.
+        self.total_items = 0 # Número total de elementos a procesar (si se conoce).
+        self.done_items = 0 # Elementos procesados hasta ahora.
+        self.total_bytes = 0 # Bytes totales a procesar (si se conoce).
+        self.done_bytes = 0 # Bytes procesados hasta ahora.
+        self.message = '' # Mensaje final (éxito o error).
+        self.result = None # Datos extra que el trabajo quiera devolver al terminar.
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock() # Varios hilos trabajadores pueden actualizar el progreso a la vez.
+
+    def add_total(self, items=0, nbytes=0):
+        """Suma elementos/bytes al total conocido del trabajo."""
+        with self._lock:
+            self.total_items += items
+            self.total_bytes += nbytes
+
+    def advance(self, items=0, nbytes=0):
+        """Registra progreso: elementos y bytes ya procesados."""
+        with self._lock:
+            self.done_items += items
+            self.done_bytes += nbytes
+
+    def finish(self, message='', result=None):
+        """Marca el trabajo como terminado con éxito."""
+        with self._lock:
+            self.status = 'done'
+            self.message = message
+            self.result = result
+            self.finished_at = time.time()
+
+    def fail(self, message):
+        """Marca el trabajo como fallido."""
+        with self._lock:
+            self.status = 'error'
+            self.message = message
+            self.finished_at = time.time()
+
+    def to_dict(self):
+        """Devuelve el estado del trabajo en un formato listo para jsonify."""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'description': self.description,
+                'status': self.status,
+                'total_items': self.total_items,
+                'done_items': self.done_items,
+                'total_bytes': self.total_bytes,
+                'done_bytes': self.done_bytes,
+                'message': self.message,
+                'result': self.result,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+
+
+def _prune_finished_jobs():
+    """Descarta los trabajos terminados más antiguos si superamos MAX_FINISHED_JOBS. Se llama con _jobs_lock tomado."""
+    finished = [job_id for job_id, job in _jobs.items() if job.status in ('done', 'error')]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job_id]
+
+
+def create_job(kind, description=''):
+    """Crea y registra un nuevo trabajo. Todavía no lo ejecuta."""
+    job = Job(kind, description)
+    with _jobs_lock:
+        _prune_finished_jobs()
+        _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id):
+    """Devuelve el trabajo con ese id, o None si no existe (o ya fue descartado)."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def start_job(job, target, *args, **kwargs):
+    """
+    Ejecuta 'target(job, *args, **kwargs)' en un hilo de fondo.
+    Si 'target' no marca el trabajo como terminado, lo marcamos nosotros al acabar.
+    Cualquier excepción se captura y deja el trabajo en estado 'error'.
+    """
+    def runner():
+        job.status = 'running'
+        try:
+            target(job, *args, **kwargs)
+            if job.status == 'running':
+                job.finish('Completado')
+        except Exception as e:
+            print(f"jobs.py: El trabajo {job.id} ({job.kind}) falló: {e}")
+            traceback.print_exc()
+            job.fail(str(e))
+
+    thread = threading.Thread(target=runner, name=f'job-{job.kind}-{job.id[:8]}', daemon=True)
+    thread.start()
+    return job
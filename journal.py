@@ -0,0 +1,251 @@
+# journal.py
+import errno # Un segmento cerrado al rotar mientras otro hilo lo sincronizaba (EBADF).
+import os # Segmentos del diario, fsync y rutas relativas.
+import json # Cada registro del diario es una línea JSON.
+import threading # Las escrituras llegan de varios hilos y los replicadores esperan registros nuevos.
+import time # Marca de tiempo de cada registro (para calcular el retraso de las réplicas).
+from collections import OrderedDict # Cursores de lectura recientes (los más viejos se descartan).
+from utils import get_root # Las rutas se guardan relativas a su raíz.
+
+# --- Diario de Mutaciones ---
+# Cada cambio que hace la API (crear, añadir, parchear, borrar, renombrar, copiar, mover) se añade a un diario
+# duradero con un número de secuencia creciente. Los replicadores (replication.py) leen el diario desde su
+# último punto de control y aplican solo esos cambios en la réplica, en vez de volver a recorrer todo DATA_DIR.
+#
+# El diario es una carpeta de segmentos 'journal-<primera_secuencia>.log' con una línea JSON por registro:
+#   {"seq": 42, "ts": 1700000000.0, "op": "write", "root": "data", "path": "docs/a.txt"}
+# Operaciones: 'mkdir', 'write' (contenido nuevo o modificado), 'delete', 'rename' (con 'to') y 'sync'
+# (un árbol entero que hay que comparar, ej: el destino de una copia).
+# Cada registro se escribe con fsync antes de responder al cliente: si el servidor se cae, el cambio no se pierde.
+# El fsync se hace FUERA del lock del diario y por grupos: mientras un hilo sincroniza, los demás siguen añadiendo
+# registros, y el siguiente fsync cubre todos los que se escribieron mientras tanto (una sola llamada para varios).
+# Los segmentos que todos los replicadores ya aplicaron se borran (prune).
+
+JOURNAL_DIRNAME = '.journal'
+JOURNAL_SEGMENT_BYTES = 16 * 1024 * 1024 # Al pasar de este tamaño se empieza un segmento nuevo.
+JOURNAL_KEEP_SEGMENTS = 4 # Segmentos que se conservan si no hay replicadores que digan hasta dónde leyeron.
+JOURNAL_OPS = ('mkdir', 'write', 'delete', 'rename', 'sync')
+JOURNAL_READ_CURSORS = 64 # Posiciones de lectura recordadas (una por lote servido; cada replicador usa la última).
+
+
+def _segment_name(first_seq):
+    return f"journal-{first_seq:012d}.log"
+
+
+class Journal:
+    """Diario de mutaciones en disco, con números de secuencia y espera de registros nuevos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._new_records = threading.Condition(self._lock) # Despierta a los replicadores que esperan.
+        self._sync_lock = threading.Lock() # Un solo fsync a la vez (los demás esperan y casi siempre ya están cubiertos).
+        self._synced = 0 # Última secuencia que ya está en disco.
+        self.directory = None # None = diario desactivado (record() no hace nada).
+        self._segments = [] # Primeras secuencias de los segmentos, en orden.
+        self._file = None
+        self._file_size = 0
+        self.head = 0 # Última secuencia escrita.
+        # Secuencia -> (segmento, byte tras su línea). El siguiente lote de un replicador empieza en la secuencia
+        # que terminó el anterior: con esto se salta directamente ahí en vez de releer el segmento desde el principio.
+        self._cursors = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def open(self, directory):
+        """Abre (o crea) el diario en 'directory' y recupera la última secuencia escrita."""
+        os.makedirs(directory, exist_ok=True)
+        segments = sorted(int(name[8:-4]) for name in os.listdir(directory)
+                          if name.startswith('journal-') and name.endswith('.log'))
+        head = segments[-1] - 1 if segments else 0
+        if segments:
+            # La última secuencia es la del último registro completo del último segmento.
+            last_path = os.path.join(directory, _segment_name(segments[-1]))
+            with open(last_path, 'rb') as f:
+                for line in f:
+                    try:
+                        head = json.loads(line)['seq']
+                    except (ValueError, KeyError):
+                        break # Línea a medias por una caída: se ignora (y las siguientes, si las hubiera).
+        with self._lock:
+            self.directory = directory
+            self._segments = segments
+            self._cursors.clear()
+            self.head = head
+            self._synced = head
+            self._open_segment(segments[-1] if segments else 1)
+        print(f"journal.py: Diario abierto en '{directory}' (última secuencia: {head}).")
+
+    def _open_segment(self, first_seq):
+        """Abre el segmento que empieza en 'first_seq' para añadir registros. Se llama con el lock tomado."""
+        if self._file is not None:
+            # Quien espere su fsync puede tener registros en este segmento: lo sincronizamos antes de cerrarlo.
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = max(self._synced, self.head)
+            self._file.close()
+        if first_seq not in self._segments:
+            self._segments.append(first_seq)
+        self._file = open(os.path.join(self.directory, _segment_name(first_seq)), 'ab')
+        self._file_size = self._file.tell()
+
+    def append(self, op, root_name, path, **extra):
+        """Añade un registro al diario (durable al volver) y devuelve su secuencia."""
+        if op not in JOURNAL_OPS:
+            raise ValueError(f"Operación de diario desconocida: '{op}'")
+        with self._lock:
+            if self.directory is None:
+                return None
+            if self._file_size >= JOURNAL_SEGMENT_BYTES:
+                self._open_segment(self.head + 1)
+            record = {'seq': self.head + 1, 'ts': time.time(), 'op': op, 'root': root_name, 'path': path}
+            record.update(extra)
+            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+            self._file.write(line)
+            self._file.flush()
+            self._file_size += len(line)
+            self.head = seq = record['seq']
+            self._new_records.notify_all()
+        self._sync_through(seq)
+        return seq
+
+    def _sync_through(self, seq):
+        """
+        Espera a que el registro 'seq' esté en disco. Si otro hilo ya hizo un fsync que lo cubre, no hace nada;
+        si no, sincroniza de una vez todo lo escrito hasta ahora (incluidos los registros de otros hilos).
+        """
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._lock:
+                target = self.head
+                f = self._file
+            try:
+                os.fsync(f.fileno())
+            except (ValueError, OSError) as e:
+                if isinstance(e, OSError) and e.errno != errno.EBADF:
+                    raise
+                # El segmento se cerró al rotar, y _open_segment ya lo sincronizó antes de cerrarlo.
+            self._synced = max(self._synced, target)
+
+    def first_seq(self):
+        """Primera secuencia que todavía está en el diario (las anteriores ya se podaron)."""
+        with self._lock:
+            return self._segments[0] if self._segments else self.head + 1
+
+    def read_after(self, seq, limit=500):
+        """Devuelve hasta 'limit' registros con secuencia mayor que 'seq', en orden."""
+        with self._lock:
+            segments = list(self._segments)
+            directory = self.directory
+            head = self.head
+            cursor = self._cursors.get(seq)
+        if directory is None or seq >= head:
+            return []
+        offset = 0
+        if cursor is not None and cursor[0] in segments:
+            # Un lote anterior terminó justo en 'seq': seguimos leyendo desde ese byte.
+            start, offset = segments.index(cursor[0]), cursor[1]
+        else:
+            # Empezamos por el último segmento cuya primera secuencia sea <= seq + 1.
+            start = 0
+            for i, first in enumerate(segments):
+                if first <= seq + 1:
+                    start = i
+        records = []
+        last = None # (secuencia, segmento, byte) del último registro devuelto.
+        for first in segments[start:]:
+            try:
+                with open(os.path.join(directory, _segment_name(first)), 'rb') as f:
+                    f.seek(offset)
+                    position = offset
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break # Línea a medias: se está escribiendo.
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            break
+                        if record['seq'] > head:
+                            break # Escrito después de tomar 'head': lo leeremos en la próxima vuelta.
+                        position += len(line)
+                        if record['seq'] > seq:
+                            records.append(record)
+                            last = (record['seq'], first, position)
+                            if len(records) >= limit:
+                                break
+            except FileNotFoundError:
+                pass # Podado mientras leíamos.
+            offset = 0
+            if len(records) >= limit:
+                break
+        if last is not None:
+            self._remember_cursor(*last)
+        return records
+
+    def _remember_cursor(self, seq, first, position):
+        with self._lock:
+            self._cursors[seq] = (first, position)
+            self._cursors.move_to_end(seq)
+            while len(self._cursors) > JOURNAL_READ_CURSORS:
+                self._cursors.popitem(last=False)
+
+    def wait(self, seq, timeout):
+        """Espera hasta que haya registros después de 'seq' (o pase 'timeout'). Devuelve la secuencia actual."""
+        with self._lock:
+            if self.head <= seq:
+                self._new_records.wait(timeout)
+            return self.head
+
+    def prune(self, applied_seq=None):
+        """
+        Borra los segmentos cuyos registros son todos <= 'applied_seq' (ya aplicados por todas las réplicas).
+        Sin 'applied_seq', solo conserva los últimos JOURNAL_KEEP_SEGMENTS segmentos.
+        """
+        with self._lock:
+            if self.directory is None:
+                return 0
+            removable = []
+            for i, first in enumerate(self._segments[:-1]): # El segmento abierto nunca se borra.
+                last_in_segment = self._segments[i + 1] - 1
+                if applied_seq is not None:
+                    if last_in_segment <= applied_seq:
+                        removable.append(first)
+                elif i < len(self._segments) - JOURNAL_KEEP_SEGMENTS:
+                    removable.append(first)
+            for first in removable:
+                self._segments.remove(first)
+                try:
+                    os.remove(os.path.join(self.directory, _segment_name(first)))
+                except FileNotFoundError:
+                    pass
+            return len(removable)
+
+
+# Instancia única usada por toda la aplicación.
+journal = Journal()
+
+
+def _rel_path(root, full_path):
+    rel = os.path.relpath(full_path, root.path)
+    return '' if rel == '.' else rel.replace(os.sep, '/')
+
+
+def record_mutation(op, root_name, full_path, to_path=None):
+    """
+    Atajo para que los endpoints de mutación anoten un cambio en el diario (después de hacerlo).
+    'to_path' es la ruta nueva en un 'rename'. Nunca lanza excepciones: un fallo del diario se loguea
+    y la réplica se pondrá al día en la siguiente sincronización completa.
+    """
+    if not journal.enabled:
+        return None
+    try:
+        root = get_root(root_name)
+        if root is None:
+            return None
+        extra = {'to': _rel_path(root, to_path)} if to_path is not None else {}
+        return journal.append(op, root.name, _rel_path(root, full_path), **extra)
+    except Exception as e:
+        print(f"journal.py: Error anotando '{op}' de '{full_path}' en el diario: {e}")
+        return None
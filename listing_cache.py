@@ -0,0 +1,85 @@
+# listing_cache.py
+import os # Para comparar rutas (un cambio en un directorio invalida sus listados guardados).
+import time # Un directorio modificado hace muy poco no se guarda (ver store).
+from utils import get_root # Cada raíz guarda sus listados en su propia caché LRU ('listing').
+from prefetch import ETAG_SETTLE_SECONDS # Mismo margen que los ETag: fechas de poca resolución.
+
+# --- Caché de Listados en el Servidor ---
+# Varios usuarios y los refrescos del navegador tras cada acción piden el mismo directorio muchas veces por segundo.
+# Cada vez hay que hacer scandir, construir los diccionarios, ordenar, calcular rutas relativas y serializar.
+# Aquí se guarda la respuesta YA SERIALIZADA (los bytes del JSON, compacto o msgpack) de los últimos listados:
+# - La clave es (directorio, campos, orden, formato). Solo se guardan los listados que dependen únicamente de los
+#   nombres y tipos de las entradas (sin tamaños, fechas ni número de hijos): crear, borrar o renombrar una entrada
+#   cambia la fecha del directorio, así que basta el stat del directorio (el que ya hizo resolver.resolve) para
+#   saber si lo guardado sigue valiendo.
+# - Las mutaciones de la API descartan al momento los listados del directorio afectado (invalidate(), llamado desde
+#   events.notify_change); los cambios externos se detectan por la fecha.
+# - La caché es la LRU 'listing' de cada raíz: acotada en entradas, y los listados muy grandes no se guardan.
+
+LISTING_CACHE_ENTRIES = 128 # Listados guardados como máximo por raíz.
+LISTING_CACHE_MAX_BYTES = 512 * 1024 # Respuestas más grandes no se guardan (ocuparían demasiada memoria).
+
+
+class CachedListing:
+    """Una respuesta de /api/browse ya serializada, con el stat del directorio del que salió."""
+
+    __slots__ = ('identity', 'body', 'mimetype', 'count', 'total')
+
+    def __init__(self, identity, body, mimetype, count, total):
+        self.identity = identity # (dispositivo, inodo, mtime_ns) del directorio cuando se listó.
+        self.body = body
+        self.mimetype = mimetype
+        self.count = count # Elementos devueltos (con 'top' pueden ser menos que 'total').
+        self.total = total
+
+
+def _cache(root):
+    return root.cache('listing', LISTING_CACHE_ENTRIES)
+
+
+def _identity(st):
+    return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+
+def listing_key(full_dir, fields, sort_spec, response_format):
+    """Clave de un listado: el directorio y todo lo que cambia el contenido de la respuesta."""
+    return (full_dir, fields, sort_spec.sort, sort_spec.descending, sort_spec.top, sort_spec.dirs_first, response_format)
+
+
+def lookup(root, key, st):
+    """Devuelve el CachedListing de 'key' si el directorio no cambió desde que se guardó (según 'st'), o None."""
+    cached = _cache(root).get(key)
+    if cached is None:
+        return None
+    if cached.identity != _identity(st):
+        _cache(root).pop(key) # El directorio cambió fuera de la API: lo guardado ya no sirve.
+        return None
+    return cached
+
+
+def store(root, key, st, body, mimetype, count, total):
+    """
+    Guarda una respuesta serializada. 'st' es el stat del directorio tomado ANTES de listarlo: si algo cambia
+    mientras tanto, la fecha nueva ya no coincide y lo guardado simplemente no se usa.
+    No se guarda si el directorio cambió hace menos de ETAG_SETTLE_SECONDS (dos cambios en el mismo instante
+    podrían dejar la misma fecha) ni si la respuesta es demasiado grande.
+    """
+    if len(body) > LISTING_CACHE_MAX_BYTES or time.time() - st.st_mtime < ETAG_SETTLE_SECONDS:
+        return False
+    _cache(root).set(key, CachedListing(_identity(st), body, mimetype, count, total))
+    return True
+
+
+def invalidate(root_name, full_path):
+    """Descarta los listados del directorio de 'full_path', del propio 'full_path' y de lo que cuelga de él."""
+    root = get_root(root_name)
+    if root is None:
+        return 0
+    parent = os.path.dirname(full_path)
+    prefix = full_path.rstrip(os.sep) + os.sep
+
+    def affected(key):
+        listed = key[0]
+        return listed == parent or listed == full_path or listed.startswith(prefix)
+
+    return _cache(root).discard_where(affected)
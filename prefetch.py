@@ -0,0 +1,125 @@
+# prefetch.py
+import os # Para leer la fecha de modificación de los directorios (validador de los listados).
+import hashlib # El ETag es un hash corto de los datos que identifican una versión del listado.
+import threading # El presupuesto y los contadores de visitas se comparten entre hilos.
+import time # Para recargar el presupuesto de prefetch con el tiempo.
+from utils import LRUCache # Clientes y contadores de visitas se guardan en cachés acotadas.
+
+# --- Caché de Listados y Prefetch ---
+# El navegador guarda los últimos listados y los revalida con un ETag: si el directorio no cambió,
+# el servidor responde 304 sin volver a listarlo. Además, el navegador pide por adelantado ("prefetch")
+# los subdirectorios que el usuario probablemente abrirá (al pasar el ratón o los más visitados).
+# Para que eso no dispare escaneos sin control, cada cliente tiene un presupuesto de prefetch que el servidor hace cumplir.
+
+PREFETCH_HEADER = 'X-Prefetch' # Cabecera con la que el navegador marca las peticiones especulativas.
+PREFETCH_BUDGET = 30 # Listados especulativos que puede pedir un cliente de golpe...
+PREFETCH_REFILL_SECONDS = 60 # ...y tiempo en el que se recarga el presupuesto completo.
+MAX_TRACKED_CLIENTS = 1024 # Clientes cuyo presupuesto recordamos (los más antiguos se olvidan).
+MAX_HINTS = 5 # Subdirectorios sugeridos como máximo por /api/browse/hints.
+VISITS_CACHE_ENTRIES = 2048 # Directorios padre cuyos contadores de visitas recordamos por raíz.
+ETAG_SETTLE_SECONDS = 1.0 # Un directorio modificado hace menos de esto no recibe ETag (ver listing_etag).
+LISTING_ETAG_VERSION = '1' # Cambiarlo invalida todos los ETag si cambia el formato de la respuesta.
+
+
+def is_prefetch(req):
+    """Indica si la petición es especulativa (prefetch) y no una navegación real del usuario."""
+    return req.headers.get(PREFETCH_HEADER) == '1'
+
+
+def client_key(req):
+    """Identifica al cliente para repartir el presupuesto de prefetch (por dirección IP)."""
+    return req.remote_addr or 'desconocido'
+
+
+class PrefetchBudget:
+    """
+    Presupuesto de prefetch por cliente ("token bucket"): cada listado especulativo gasta una ficha
+    y las fichas se recargan poco a poco hasta 'capacity'. Sin fichas, el servidor responde 429 sin listar nada.
+    """
+
+    def __init__(self, capacity=PREFETCH_BUDGET, refill_seconds=PREFETCH_REFILL_SECONDS, max_clients=MAX_TRACKED_CLIENTS):
+        self.capacity = capacity
+        self.rate = capacity / float(refill_seconds) # Fichas por segundo.
+        self._buckets = LRUCache(max_clients) # cliente -> [fichas, última_actualización]
+        self._lock = threading.Lock()
+
+    def _bucket(self, client, now):
+        """Devuelve el cubo del cliente con las fichas ya recargadas. Se llama con el lock tomado."""
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = [float(self.capacity), now]
+            self._buckets.set(client, bucket)
+        else:
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, client):
+        """Gasta una ficha. Devuelve (permitido, fichas_restantes, segundos_hasta_la_próxima_ficha)."""
+        with self._lock:
+            bucket = self._bucket(client, time.monotonic())
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, int(bucket[0]), 0
+            return False, 0, max(1, int((1 - bucket[0]) / self.rate + 0.999))
+
+    def remaining(self, client):
+        """Fichas que le quedan al cliente (sin gastar ninguna)."""
+        with self._lock:
+            return int(self._bucket(client, time.monotonic())[0])
+
+
+# Instancia única usada por toda la aplicación.
+budget = PrefetchBudget()
+
+
+def listing_etag(root, full_dir, variant='', st=None):
+    """
+    Calcula el ETag del listado de 'full_dir' a partir de su fecha de modificación: crear, borrar o renombrar
+    una entrada cambia la fecha del directorio, así que si la fecha no cambió, el listado tampoco.
+    'variant' distingue respuestas distintas del mismo directorio (ej: otros parámetros de la petición).
+    Devuelve None si el directorio se modificó hace muy poco: en sistemas de archivos con fechas de poca
+    resolución, dos cambios en el mismo segundo tendrían la misma fecha y el cliente se quedaría con un listado viejo.
+    Si quien llama ya tiene el stat del directorio (ej: de resolver.resolve), lo pasa en 'st' y no se repite.
+    """
+    if st is None:
+        try:
+            st = os.stat(full_dir)
+        except OSError:
+            return None
+    if time.time() - st.st_mtime < ETAG_SETTLE_SECONDS:
+        return None
+    raw = f"{LISTING_ETAG_VERSION}:{root.name}:{full_dir}:{st.st_dev}:{st.st_ino}:{st.st_mtime_ns}:{variant}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+# --- Visitas y Sugerencias ---
+# Cada navegación real (no prefetch) a un subdirectorio suma una visita a ese hijo dentro de su directorio padre.
+# Con eso, /api/browse/hints sugiere los hijos más visitados para pedirlos por adelantado.
+
+_visits_lock = threading.Lock()
+
+
+def record_visit(root, rel_path):
+    """Suma una visita al directorio 'rel_path' (ruta relativa con '/') dentro de su directorio padre."""
+    rel_path = rel_path.strip('/')
+    if not rel_path:
+        return # La raíz no tiene padre.
+    parent, _, name = rel_path.rpartition('/')
+    visits = root.cache('visits', VISITS_CACHE_ENTRIES)
+    with _visits_lock:
+        counts = visits.get(parent)
+        if counts is None:
+            counts = {}
+            visits.set(parent, counts)
+        counts[name] = counts.get(name, 0) + 1
+
+
+def top_children(root, rel_dir, limit=MAX_HINTS):
+    """Devuelve los nombres de los hijos más visitados de 'rel_dir', de más a menos visitas."""
+    counts = root.cache('visits', VISITS_CACHE_ENTRIES).get(rel_dir.strip('/'))
+    if not counts:
+        return []
+    with _visits_lock:
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [name for name, _ in ranked[:limit]]
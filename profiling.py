@@ -0,0 +1,242 @@
+# profiling.py
+import cProfile # Perfil determinista (todas las llamadas) de una petición.
+import json # Metadatos de cada perfil guardado.
+import os # Carpeta del búfer circular de perfiles en disco.
+import random # Muestreo: un porcentaje de las peticiones se perfila solo.
+import sys # sys._current_frames() para el perfilador por muestreo.
+import threading # El muestreador corre en su propio hilo mientras dura la petición.
+import time # Duración de las peticiones e intervalo de muestreo.
+import uuid # Id de cada perfil guardado.
+from collections import Counter # Pilas colapsadas -> número de muestras.
+from flask import g, request # 'g' guarda el perfil en curso de la petición.
+
+# --- Perfiles por Petición ---
+# Cuando una petición concreta va lenta en producción (una búsqueda en cierta ruta, un listado enorme...), queremos
+# ver en qué se va el tiempo: get_full_path, el bucle de scandir, jsonify... Se puede perfilar UNA petición:
+# - Con la cabecera 'X-Profile: <token>' (el token de FILES_MANAGER_PROFILE_TOKEN; sin token configurado, la cabecera
+#   se ignora). 'X-Profile-Mode: sample|cprofile' elige el perfilador.
+# - O por muestreo: FILES_MANAGER_PROFILE_RATE=0.01 perfila el 1% de las peticiones (con el modo por defecto),
+#   opcionalmente solo las de FILES_MANAGER_PROFILE_PATHS (prefijos separados por comas, ej: '/api/search,/api/browse').
+# Dos perfiladores:
+# - 'sample': un hilo mira la pila del hilo de la petición cada pocos milisegundos. Sobrecarga mínima.
+#   Se guarda como pilas colapsadas ("a;b;c 12"), el formato de entrada de flamegraph.pl y speedscope.
+# - 'cprofile': cProfile registra todas las llamadas (más preciso, más caro). Se guarda como pstats.
+# Los perfiles van a un búfer circular en disco (los más viejos se borran; la carpeta se crea con el primero) y se
+# consultan en /api/profiles (api/profiling.py), siempre con el token: muestran rutas y código del servidor.
+# Si no hay token ni muestreo configurados, los hooks NO se registran: coste cero para las peticiones normales.
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODE_HEADER = 'X-Profile-Mode'
+PROFILE_ID_HEADER = 'X-Profile-Id' # La respuesta perfilada lleva el id con el que se guardó el perfil.
+PROFILE_MODES = ('sample', 'cprofile')
+PROFILE_DEFAULT_MODE = 'sample'
+PROFILE_SAMPLE_INTERVAL = 0.002 # Segundos entre muestras del perfilador por muestreo.
+PROFILE_MAX_STACK_DEPTH = 128 # Marcos como máximo por muestra (recursiones muy profundas se recortan).
+PROFILE_RING_SIZE = 100 # Perfiles que se conservan en disco.
+PROFILE_DIRNAME = '.profiles'
+
+
+class StackSampler:
+    """Muestrea la pila de un hilo cada PROFILE_SAMPLE_INTERVAL segundos y cuenta las pilas colapsadas."""
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < PROFILE_MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1 # De la raíz a la hoja, como espera flamegraph.
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Búfer circular de perfiles en disco: '<id>.json' (metadatos) + '<id>.folded' o '<id>.pstats'."""
+
+    def __init__(self):
+        self.directory = None
+        self._created = False
+        self._lock = threading.Lock()
+
+    def open(self, directory):
+        # La carpeta no se crea aquí: sin perfiles guardados, arrancar no deja nada en disco.
+        self.directory = directory
+        self._created = False
+
+    def save(self, meta, collapsed=None, profiler=None):
+        profile_id = meta['id']
+        with self._lock:
+            if not self._created:
+                os.makedirs(self.directory, exist_ok=True) # El primer perfil crea la carpeta.
+                self._created = True
+            if collapsed is not None:
+                with open(os.path.join(self.directory, f"{profile_id}.folded"), 'w', encoding='utf-8') as f:
+                    f.write(collapsed)
+            if profiler is not None:
+                profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.pstats"))
+            # Los metadatos se escriben al final: un perfil sin .json no aparece en la lista.
+            with open(os.path.join(self.directory, f"{profile_id}.json"), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            self._trim()
+
+    def _trim(self):
+        """Borra los perfiles más antiguos si hay más de PROFILE_RING_SIZE. Se llama con el lock tomado."""
+        metas = sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+        for name in metas[:max(0, len(metas) - PROFILE_RING_SIZE)]:
+            base = name[:-5]
+            for ext in ('.json', '.folded', '.pstats'):
+                try:
+                    os.remove(os.path.join(self.directory, base + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue # Borrado por el búfer circular mientras listábamos.
+        return profiles
+
+    def path(self, profile_id, ext):
+        """Ruta del archivo del perfil (None si no existe). El id se valida: nada de rutas."""
+        if self.directory is None or not profile_id.replace('-', '').isalnum():
+            return None
+        full = os.path.join(self.directory, f"{profile_id}{ext}")
+        return full if os.path.isfile(full) else None
+
+
+# Instancia única usada por toda la aplicación.
+store = ProfileStore()
+_settings = {'token': None, 'rate': 0.0, 'paths': (), 'mode': PROFILE_DEFAULT_MODE}
+
+
+def _wanted_mode():
+    """Decide si esta petición se perfila y con qué modo. Devuelve el modo o None."""
+    token = _settings['token']
+    if token and request.headers.get(PROFILE_HEADER) == token:
+        mode = request.headers.get(PROFILE_MODE_HEADER, _settings['mode']).strip().lower()
+        return mode if mode in PROFILE_MODES else _settings['mode']
+    rate = _settings['rate']
+    if rate and random.random() < rate:
+        paths = _settings['paths']
+        if not paths or request.path.startswith(paths):
+            return _settings['mode']
+    return None
+
+
+def _before_request():
+    mode = _wanted_mode()
+    if mode is None:
+        return
+    profile = {'mode': mode, 'started': time.time(), 'clock': time.perf_counter()}
+    if mode == 'cprofile':
+        profile['profiler'] = cProfile.Profile()
+        profile['profiler'].enable()
+    else:
+        profile['sampler'] = StackSampler(threading.get_ident())
+        profile['sampler'].start()
+    g.profile = profile
+
+
+def _finish_profile(status):
+    """Detiene el perfil en curso (si lo hay) y lo guarda. Devuelve el id guardado o None."""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return None
+    elapsed = time.perf_counter() - profile['clock']
+    profiler = profile.get('profiler')
+    sampler = profile.get('sampler')
+    if profiler is not None:
+        profiler.disable()
+    if sampler is not None:
+        sampler.stop()
+    meta = {
+        # El id empieza por la fecha: ordenar por nombre es ordenar por antigüedad (para el búfer circular).
+        'id': f"{int(profile['started'] * 1000):013d}-{uuid.uuid4().hex[:8]}",
+        'mode': profile['mode'],
+        'method': request.method,
+        'path': request.path,
+        'query': request.query_string.decode('utf-8', errors='replace'),
+        'endpoint': request.endpoint,
+        'status': status,
+        'started': profile['started'],
+        'duration_ms': round(elapsed * 1000, 3),
+        'samples': sampler.samples if sampler is not None else None,
+    }
+    try:
+        store.save(meta, collapsed=sampler.collapsed() if sampler is not None else None, profiler=profiler)
+    except OSError as e:
+        print(f"profiling.py: No se pudo guardar el perfil de {request.path}: {e}")
+        return None
+    print(f"profiling.py: Perfil {meta['id']} ({meta['mode']}) de {request.method} {request.path}: {meta['duration_ms']} ms.")
+    return meta['id']
+
+
+def _after_request(response):
+    profile_id = _finish_profile(response.status_code)
+    if profile_id:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def _teardown_request(exc):
+    # Si la petición terminó con una excepción, after_request no se ejecutó: el perfil se guarda igualmente.
+    if exc is not None:
+        _finish_profile(500)
+
+
+def is_authorized():
+    """Los perfiles muestran rutas y código: solo se leen con el token (sin token configurado, nadie puede)."""
+    token = _settings['token']
+    return bool(token) and request.headers.get(PROFILE_HEADER) == token
+
+
+def init_profiling(app, project_root_path):
+    """
+    Lee la configuración de perfiles y, solo si está activa, registra los hooks en la aplicación.
+    Las rutas de consulta (/api/profiles) están en api/profiling.py y se registran como el resto de Blueprints.
+    """
+    _settings['token'] = os.environ.get('FILES_MANAGER_PROFILE_TOKEN') or None
+    try:
+        _settings['rate'] = min(1.0, max(0.0, float(os.environ.get('FILES_MANAGER_PROFILE_RATE', '0') or 0)))
+    except ValueError:
+        print("profiling.py: FILES_MANAGER_PROFILE_RATE no es un número; muestreo desactivado.")
+        _settings['rate'] = 0.0
+    _settings['paths'] = tuple(p.strip() for p in os.environ.get('FILES_MANAGER_PROFILE_PATHS', '').split(',') if p.strip())
+    mode = os.environ.get('FILES_MANAGER_PROFILE_MODE', PROFILE_DEFAULT_MODE).strip().lower()
+    _settings['mode'] = mode if mode in PROFILE_MODES else PROFILE_DEFAULT_MODE
+    store.open(os.environ.get('FILES_MANAGER_PROFILE_DIR') or os.path.join(project_root_path, PROFILE_DIRNAME))
+
+    if _settings['token'] or _settings['rate']:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
+        print(f"profiling.py: Perfiles activos (cabecera: {'sí' if _settings['token'] else 'no'}, "
+              f"muestreo: {_settings['rate']:.2%}, modo: {_settings['mode']}).")
+
@@ -0,0 +1,430 @@
+# quotas.py
+import atexit # Al cerrar la aplicación se guardan los contadores pendientes.
+import os # Para medir árboles de directorios y guardar el estado de las cuotas.
+import json # Configuración (quotas.json) y contadores persistidos (.quota_usage.json).
+import tempfile # El estado se guarda en un archivo temporal que luego se renombra (nunca queda a medias).
+import threading # Los contadores se comparten entre hilos y un hilo de fondo los guarda y los reconcilia.
+import time # Intervalos del hilo de fondo y fecha de la última reconciliación.
+from contextlib import contextmanager # Para 'with quota_manager.reserve(...)'.
+from flask import jsonify # Respuesta de error común cuando se supera una cuota.
+from utils import get_root # Cada cuota pertenece a una raíz de datos.
+from walker import walk # Medir un árbol grande lee varias carpetas a la vez.
+
+# --- Cuotas de Almacenamiento ---
+# Se pueden limitar los bytes y el número de elementos (archivos + carpetas) de cualquier subárbol de una raíz.
+# Medir el uso recorriendo el árbol en cada escritura sería carísimo, así que cada cuota tiene contadores:
+# - Cada escritura (crear, añadir, parchear, borrar, renombrar, copiar, mover) reserva o libera su tamaño ANTES
+#   de tocar el disco; si la operación falla, la reserva se deshace. Comprobar la cuota es mirar unos contadores.
+# - Los contadores se guardan en disco cada pocos segundos y se recuperan al arrancar.
+# - Un hilo de fondo reconcilia los contadores recorriendo los árboles de vez en cuando, para corregir cambios
+#   hechos fuera de la aplicación (o escrituras que fallaron a medias).
+#
+# Configuración en 'quotas.json' (raíz del proyecto) o en la ruta de FILES_MANAGER_QUOTAS_FILE:
+#   {"data/usuarios/ana": {"max_bytes": 1073741824, "max_files": 10000}, "scratch": {"max_bytes": 50000000000}}
+# La clave es '<raíz>/<ruta dentro de la raíz>'.
+
+QUOTAS_CONFIG_FILENAME = 'quotas.json'
+QUOTA_STATE_FILENAME = '.quota_usage.json' # Contadores persistidos (se regenera solo si se borra).
+QUOTA_FLUSH_INTERVAL = 5 # Segundos entre guardados de los contadores (solo si cambiaron).
+QUOTA_RECONCILE_INTERVAL = 600 # Segundos entre reconciliaciones completas con el disco.
+QUOTA_RECONCILE_SLOT_WAIT = 60 # Segundos que la reconciliación espera un hueco de concurrencia de la raíz.
+QUOTA_EXCEEDED_STATUS = 507 # HTTP 507 Insufficient Storage.
+
+
+class QuotaExceeded(Exception):
+    """Se lanza cuando una escritura superaría el límite de alguna cuota."""
+
+    def __init__(self, quota, message):
+        super().__init__(message)
+        self.quota = quota
+        self.message = message
+
+
+class Quota:
+    """Límites y uso actual de un subárbol de una raíz."""
+
+    def __init__(self, root_name, rel_path, max_bytes=None, max_files=None):
+        self.root_name = root_name
+        self.rel_path = rel_path # Ruta relativa a la raíz con '/' ('' = la raíz entera).
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.used_bytes = 0
+        self.used_files = 0
+        self.reconciled_at = None # None = todavía no se ha medido nunca.
+        self.measuring = None # Measurement de la reconciliación en curso (None si no se está midiendo).
+
+    @property
+    def key(self):
+        return f"{self.root_name}/{self.rel_path}" if self.rel_path else self.root_name
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'root': self.root_name,
+            'path': self.rel_path,
+            'max_bytes': self.max_bytes,
+            'max_files': self.max_files,
+            'used_bytes': self.used_bytes,
+            'used_files': self.used_files,
+            'reconciled_at': self.reconciled_at,
+        }
+
+
+class Measurement:
+    """
+    Progreso de una reconciliación en curso, para saber si el recorrido todavía verá un cambio en 'full_path':
+    - Carpeta aún sin leer: sí (verá el estado nuevo).
+    - Carpeta leída pero a medio medir: solo si el nombre estaba en el listado y aún no se midió.
+    - Carpeta ya medida entera: no.
+    Los cambios que el recorrido ya no verá se acumulan aparte (drift) y se suman a lo medido.
+    """
+
+    __slots__ = ('passed', 'pending', 'drift_bytes', 'drift_files')
+
+    def __init__(self):
+        self.passed = set() # Carpetas cuyo contenido ya se midió entero.
+        self.pending = {} # Carpeta leída -> nombres que faltan por medir.
+        self.drift_bytes = 0
+        self.drift_files = 0
+
+    def scanned(self, dirpath, entries):
+        # Llamado por el recorrido al leer cada carpeta. Una carpeta vacía ya está medida.
+        if entries:
+            self.pending[dirpath] = {entry.name for entry in entries}
+        else:
+            self.passed.add(dirpath)
+
+    def measured(self, item):
+        # Llamado tras medir cada entrada: con la última, la carpeta queda atrás.
+        names = self.pending.get(item.dirpath)
+        if names is None:
+            return
+        names.discard(item.name)
+        if not names:
+            self.passed.add(item.dirpath) # Primero 'passed': quien consulte a la vez nunca la ve en ningún sitio.
+            del self.pending[item.dirpath]
+
+    def covers(self, full_path):
+        """True si el recorrido ya no verá un cambio en 'full_path' (hay que sumarlo aparte)."""
+        directory, name = os.path.split(full_path)
+        if directory in self.passed:
+            return True
+        names = self.pending.get(directory)
+        return names is not None and name not in names
+
+
+def measure_tree(full_path, progress=None):
+    """
+    Devuelve (bytes, elementos) de un archivo o de un árbol completo (sin seguir enlaces simbólicos).
+    Con 'progress' (un Measurement), va anotando las carpetas que ya terminó de medir.
+    """
+    try:
+        st = os.lstat(full_path)
+    except OSError:
+        return 0, 0
+    if not os.path.isdir(full_path) or os.path.islink(full_path):
+        return st.st_size, 1
+    total_bytes, total_items = 0, 1 # El propio directorio cuenta como un elemento.
+    for item in walk(full_path, on_scanned=progress.scanned if progress is not None else None):
+        total_items += 1
+        if not item.is_dir: # Las carpetas cuentan como elementos pero no suman bytes.
+            try:
+                total_bytes += item.stat(follow_symlinks=False).st_size
+            except OSError:
+                total_items -= 1 # Borrado mientras medíamos.
+        if progress is not None:
+            progress.measured(item)
+    return total_bytes, total_items
+
+
+class QuotaManager:
+    """Registro de cuotas con sus contadores. Todas las operaciones sobre contadores son O(profundidad de la ruta)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock() # Una sola reconciliación a la vez (la de fondo o la pedida por la API).
+        self._quotas = {} # (raíz, ruta_relativa) -> Quota
+        self._state_path = None
+        self._dirty = False
+        self._thread = None
+        self._last_reconcile = 0.0
+
+    # --- Configuración y estado persistido ---
+
+    def load(self, project_root_path):
+        """Lee la configuración de cuotas y los contadores guardados. Arranca el hilo de fondo si hay cuotas."""
+        config_path = os.environ.get('FILES_MANAGER_QUOTAS_FILE') or os.path.join(project_root_path, QUOTAS_CONFIG_FILENAME)
+        self._state_path = os.environ.get('FILES_MANAGER_QUOTA_STATE') or os.path.join(project_root_path, QUOTA_STATE_FILENAME)
+        config = {}
+        if os.path.isfile(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            print(f"quotas.py: Configuración de cuotas leída de: {config_path}")
+
+        quotas = {}
+        for key, limits in config.items():
+            root_name, _, rel_path = key.strip('/').partition('/')
+            root = get_root(root_name)
+            if root is None:
+                print(f"quotas.py: Cuota '{key}' ignorada: la raíz '{root_name}' no existe.")
+                continue
+            quota = Quota(root.name, rel_path.strip('/'), limits.get('max_bytes'), limits.get('max_files'))
+            quotas[(quota.root_name, quota.rel_path)] = quota
+
+        state = {}
+        if os.path.isfile(self._state_path):
+            try:
+                with open(self._state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"quotas.py: No se pudo leer el estado de las cuotas ({e}). Se reconciliarán desde cero.")
+        for quota in quotas.values():
+            saved = state.get(quota.key)
+            if saved:
+                quota.used_bytes = saved.get('used_bytes', 0)
+                quota.used_files = saved.get('used_files', 0)
+                quota.reconciled_at = saved.get('reconciled_at')
+
+        with self._lock:
+            self._quotas = quotas
+        if quotas:
+            self._ensure_thread()
+            atexit.register(self.flush)
+        return list(quotas.values())
+
+    def flush(self):
+        """Guarda los contadores en disco si cambiaron (archivo temporal + renombrado atómico)."""
+        with self._lock:
+            if not self._dirty or not self._state_path:
+                return
+            state = {q.key: {'used_bytes': q.used_bytes, 'used_files': q.used_files, 'reconciled_at': q.reconciled_at}
+                     for q in self._quotas.values()}
+            self._dirty = False
+        directory = os.path.dirname(self._state_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.quota_usage.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            print(f"quotas.py: Error guardando el estado de las cuotas: {e}")
+            with self._lock:
+                self._dirty = True # Lo intentamos de nuevo en el próximo ciclo.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # --- Búsqueda de cuotas (la parte que se ejecuta en cada escritura) ---
+
+    def quotas_for(self, root, full_path):
+        """Cuotas que afectan a 'full_path': la de cada antepasado (y la suya propia) que tenga una."""
+        if not self._quotas:
+            return [] # Caso habitual: sin cuotas configuradas, no cuesta nada.
+        root = get_root(root)
+        rel = os.path.relpath(full_path, root.path)
+        rel = '' if rel == '.' else rel.replace(os.sep, '/')
+        candidates = [''] # La raíz entera.
+        if rel:
+            parts = rel.split('/')
+            candidates.extend('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        return [self._quotas[(root.name, c)] for c in candidates if (root.name, c) in self._quotas]
+
+    def usage_of(self, root, full_path):
+        """Mide lo que ocupa 'full_path', pero solo si alguna cuota lo abarca (si no, devuelve None sin medir nada)."""
+        if not self.quotas_for(root, full_path):
+            return None
+        return measure_tree(full_path)
+
+    # --- Reservas y liberaciones ---
+
+    def _apply(self, quotas, nbytes, nfiles, full_path):
+        """
+        Comprueba y suma (o resta) el uso en todas las cuotas a la vez. Se llama con el lock tomado.
+        'full_path' es lo que se escribe: si una reconciliación ya midió su carpeta, el cambio se le anota aparte.
+        """
+        for quota in quotas:
+            if nbytes > 0 and quota.max_bytes is not None and quota.used_bytes + nbytes > quota.max_bytes:
+                raise QuotaExceeded(quota, f"Cuota de espacio superada en '{quota.key}': "
+                                           f"{quota.used_bytes + nbytes} de {quota.max_bytes} bytes")
+            if nfiles > 0 and quota.max_files is not None and quota.used_files + nfiles > quota.max_files:
+                raise QuotaExceeded(quota, f"Cuota de elementos superada en '{quota.key}': "
+                                           f"{quota.used_files + nfiles} de {quota.max_files}")
+        for quota in quotas:
+            quota.used_bytes = max(0, quota.used_bytes + nbytes)
+            quota.used_files = max(0, quota.used_files + nfiles)
+            if quota.measuring is not None and quota.measuring.covers(full_path):
+                quota.measuring.drift_bytes += nbytes
+                quota.measuring.drift_files += nfiles
+        if quotas:
+            self._dirty = True
+
+    def charge(self, root, full_path, nbytes, nfiles=0):
+        """Suma uso a las cuotas de 'full_path'. Lanza QuotaExceeded (sin cambiar nada) si alguna se superaría."""
+        quotas = self.quotas_for(root, full_path)
+        if quotas:
+            with self._lock:
+                self._apply(quotas, nbytes, nfiles, full_path)
+
+    def release(self, root, full_path, nbytes, nfiles=0):
+        """Resta uso de las cuotas de 'full_path' (tras borrar o si una escritura reservada falló)."""
+        quotas = self.quotas_for(root, full_path)
+        if quotas:
+            with self._lock:
+                self._apply(quotas, -nbytes, -nfiles, full_path)
+
+    @contextmanager
+    def reserve(self, root, full_path, nbytes, nfiles=0):
+        """
+        Reserva el uso antes de escribir y lo deshace si el bloque 'with' falla:
+            with quota_manager.reserve(root, path, len(data), 1):
+                escribir(...)
+        """
+        self.charge(root, full_path, nbytes, nfiles)
+        try:
+            yield
+        except BaseException:
+            self.release(root, full_path, nbytes, nfiles)
+            raise
+
+    def plan_move(self, src_root, src_path, dst_root, dst_path):
+        """Prepara el traslado de uso de un elemento que se mueve (o renombra). Ver MovePlan."""
+        return MovePlan(self, src_root, src_path, dst_root, dst_path)
+
+    @contextmanager
+    def moving(self, src_root, src_path, dst_root, dst_path):
+        """Mueve el uso de cuota de 'src_path' a 'dst_path' alrededor de un rename/move síncrono."""
+        plan = self.plan_move(src_root, src_path, dst_root, dst_path)
+        plan.charge()
+        try:
+            yield
+        except BaseException:
+            plan.rollback()
+            raise
+        plan.commit()
+
+    # --- Reconciliación con el disco ---
+
+    def reconcile(self, keys=None):
+        """
+        Mide de nuevo los subárboles con cuota y corrige los contadores.
+        Las escrituras que ocurran mientras se mide se conservan sin contarlas dos veces: las de carpetas que el
+        recorrido ya midió se suman aparte (ver Measurement); las demás las verá el propio recorrido.
+        """
+        with self._reconcile_lock:
+            return self._reconcile(keys)
+
+    def _reconcile(self, keys):
+        with self._lock:
+            quotas = [q for q in self._quotas.values() if keys is None or q.key in keys]
+        results = []
+        for quota in quotas:
+            root = get_root(quota.root_name)
+            if root is None:
+                continue
+            full_path = os.path.join(root.path, quota.rel_path.replace('/', os.sep)) if quota.rel_path else root.path
+            progress = Measurement()
+            with self._lock:
+                quota.measuring = progress
+            try:
+                # En segundo plano podemos esperar más que una petición interactiva a que la raíz tenga un hueco libre.
+                with root.slot(timeout=QUOTA_RECONCILE_SLOT_WAIT):
+                    measured_bytes, measured_files = measure_tree(full_path, progress) if os.path.exists(full_path) else (0, 0)
+            except BaseException:
+                with self._lock:
+                    quota.measuring = None
+                raise
+            with self._lock:
+                quota.measuring = None
+                quota.used_bytes = max(0, measured_bytes + progress.drift_bytes)
+                quota.used_files = max(0, measured_files + progress.drift_files)
+                quota.reconciled_at = time.time()
+                self._dirty = True
+            results.append(quota.to_dict())
+        self._last_reconcile = time.monotonic()
+        self.flush()
+        return results
+
+    def list(self):
+        with self._lock:
+            return [q.to_dict() for q in self._quotas.values()]
+
+    # --- Hilo de fondo ---
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._background_loop, name='quota-keeper', daemon=True)
+            self._thread.start()
+
+    def _background_loop(self):
+        # Las cuotas que nunca se midieron (recién configuradas o sin estado guardado) se miden enseguida.
+        with self._lock:
+            unmeasured = [q.key for q in self._quotas.values() if q.reconciled_at is None]
+        if unmeasured:
+            self._safe_reconcile(unmeasured)
+        self._last_reconcile = time.monotonic()
+        while True:
+            time.sleep(QUOTA_FLUSH_INTERVAL)
+            self.flush()
+            if time.monotonic() - self._last_reconcile >= QUOTA_RECONCILE_INTERVAL:
+                self._safe_reconcile()
+
+    def _safe_reconcile(self, keys=None):
+        try:
+            self.reconcile(keys)
+        except Exception as e:
+            print(f"quotas.py: Error reconciliando las cuotas: {e}")
+
+
+class MovePlan:
+    """
+    Traslado de uso de cuota de un elemento que cambia de sitio. Solo se mide el elemento si el conjunto
+    de cuotas del origen y del destino es distinto (renombrar dentro de la misma carpeta no cuesta nada).
+    charge() reserva en las cuotas nuevas (puede lanzar QuotaExceeded); commit() libera las viejas
+    cuando el movimiento terminó bien; rollback() deshace la reserva si falló.
+    """
+
+    def __init__(self, manager, src_root, src_path, dst_root, dst_path):
+        self.manager = manager
+        self.src_path = src_path
+        self.dst_path = dst_path
+        src_quotas = manager.quotas_for(src_root, src_path)
+        dst_quotas = manager.quotas_for(dst_root, os.path.dirname(dst_path))
+        self.gained = [q for q in dst_quotas if q not in src_quotas]
+        self.lost = [q for q in src_quotas if q not in dst_quotas]
+        # Si la cuota es la del propio elemento (ej: renombrar la carpeta con cuota), su uso se va con él.
+        self.usage = measure_tree(src_path) if (self.gained or self.lost) else (0, 0)
+
+    def charge(self):
+        if self.gained:
+            with self.manager._lock:
+                self.manager._apply(self.gained, *self.usage, self.dst_path)
+
+    def rollback(self):
+        if self.gained:
+            with self.manager._lock:
+                self.manager._apply(self.gained, -self.usage[0], -self.usage[1], self.dst_path)
+
+    def commit(self):
+        if self.lost:
+            with self.manager._lock:
+                self.manager._apply(self.lost, -self.usage[0], -self.usage[1], self.src_path)
+
+
+def quota_error_response(error):
+    """Respuesta JSON común para una escritura rechazada por cuota (507 Insufficient Storage)."""
+    response = jsonify({'success': False, 'quota_exceeded': True, 'quota': error.quota.key, 'message': error.message})
+    response.status_code = QUOTA_EXCEEDED_STATUS
+    return response
+
+
+# Instancia única usada por toda la aplicación.
+quota_manager = QuotaManager()
+
+
+def init_quotas(project_root_path):
+    """Carga las cuotas configuradas (se llama una vez al arrancar, después de initialize_paths)."""
+    loaded = quota_manager.load(project_root_path)
+    if loaded:
+        print(f"quotas.py: {len(loaded)} cuota(s) activas: {', '.join(q.key for q in loaded)}")
+    return loaded
@@ -0,0 +1,94 @@
+# replace.py
+import fnmatch # Filtro de archivos por patrón ('*.conf', 'etc/*.yml').
+import multiprocessing # Contexto 'forkserver' (o 'spawn') para el pool de procesos.
+import os # stat y renombrado atómico.
+import re # Para reconocer expresiones regulares no válidas.
+import threading # El pool de procesos se crea una sola vez, aunque lo pidan varios hilos.
+from concurrent.futures import ProcessPoolExecutor # Reescribir miles de archivos usa varios núcleos.
+from durable import discard, publish # Rename atómico y carpeta duradera.
+from replace_worker import _compile, process_file # Lo que ejecutan los procesos del pool (módulo aparte y ligero).
+
+# --- Buscar y Reemplazar en Muchos Archivos ---
+# Cambiar un nombre de host o una clave en miles de archivos de configuración, en el servidor.
+# - El trabajo se reparte en un pool de PROCESOS (las expresiones regulares usan CPU y así no compiten por el GIL
+#   con los hilos que atienden peticiones).
+# - Cada archivo se analiza primero rápido: si parece binario (tiene bytes nulos al principio) o no contiene
+#   ninguna coincidencia, se salta sin escribir nada.
+# - Si hay coincidencias, el resultado se escribe en un archivo temporal en la misma carpeta recorriendo el original
+#   mapeado en memoria (nunca se carga entero) y se sincroniza con disco. El temporal sustituye al original con un
+#   rename atómico, que hace el proceso principal (commit_rewrite) tras comprobar que el original no cambió mientras
+#   tanto: quien lea el archivo ve la versión vieja o la nueva, nunca una a medias.
+# Todo trabaja con bytes: el texto a buscar y el reemplazo se codifican en UTF-8.
+
+REPLACE_MAX_PROCESSES = max(1, min(4, os.cpu_count() or 1)) # Procesos del pool.
+REPLACE_INFLIGHT_PER_PROCESS = 4 # Archivos encargados por proceso a la vez (no se encolan miles de golpe).
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def compile_check(find, is_regex, ignore_case=False):
+    """Compila el patrón para validarlo antes de lanzar el trabajo. Devuelve un mensaje de error o None."""
+    try:
+        _compile(find.encode('utf-8'), is_regex, ignore_case)
+    except re.error as e:
+        return f"Expresión regular no válida: {e}"
+    return None
+
+
+def commit_rewrite(result):
+    """
+    En el proceso principal: sustituye el original por el temporal con un rename atómico.
+    Devuelve None si se hizo, o un mensaje si el original cambió mientras se reescribía (el temporal se descarta).
+    """
+    try:
+        st = os.stat(result['path'], follow_symlinks=False)
+        if (st.st_size, st.st_mtime_ns, st.st_ino) != (result['size'], result['mtime_ns'], result['ino']):
+            discard_rewrite(result)
+            return 'El archivo cambió mientras se reescribía; no se tocó'
+        publish(result['tmp'], result['path'], data_synced=True)
+        return None
+    except OSError as e:
+        discard_rewrite(result)
+        return str(e)
+
+
+def discard_rewrite(result):
+    """Borra el temporal de un archivo reescrito que al final no se usa."""
+    if result.get('tmp'):
+        discard(result['tmp'])
+
+
+def matches_glob(patterns, name, rel_path):
+    """Sin patrones, todo vale. Los patrones con '/' se comparan con la ruta relativa; el resto, con el nombre."""
+    if not patterns:
+        return True
+    return any(fnmatch.fnmatchcase(rel_path if '/' in p else name, p) for p in patterns)
+
+
+def get_pool():
+    """Devuelve el pool de procesos compartido (se crea la primera vez o si uno de sus procesos murió)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or getattr(_pool, '_broken', False):
+            # Nunca 'fork': el servidor tiene hilos (replicadores, vigilantes, group commit...) y un hijo creado con
+            # fork hereda sus locks en el estado en que estuvieran. Con 'forkserver', los procesos salen de un
+            # servidor de procesos limpio que ya tiene importado replace_worker. Como cualquier proceso de
+            # multiprocessing, importan el programa principal como '__mp_main__' (app.py no arranca nada entonces).
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['__main__', 'replace_worker'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=REPLACE_MAX_PROCESSES, mp_context=context)
+        return _pool
+
+
+def reset_pool():
+    """Descarta el pool (ej: tras BrokenProcessPool); el siguiente get_pool() crea uno nuevo."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
@@ -0,0 +1,92 @@
+# replace_worker.py
+import mmap # Los archivos se recorren mapeados en memoria: buscar y reescribir sin leerlos enteros.
+import os # stat y archivos temporales.
+import re # Búsquedas con expresiones regulares.
+import stat # Para conservar los permisos del archivo original.
+import tempfile # El resultado se escribe en un temporal junto al original.
+from functools import lru_cache # Cada proceso compila la expresión regular una sola vez.
+from durable import DURABILITY, DURABILITY_NONE # Si hace falta fsync del temporal.
+
+# --- Trabajo de los Procesos de Buscar y Reemplazar ---
+# Lo que ejecutan los procesos del pool de replace.py. Está en un módulo aparte y pequeño a propósito: los procesos
+# se arrancan con 'forkserver' (o 'spawn') e importan este módulo, así que no debe importar la aplicación ni nada
+# que arranque hilos (solo la biblioteca estándar y las constantes de durable.py).
+
+BINARY_SNIFF_BYTES = 8192 # Bytes del principio del archivo en los que buscamos un byte nulo.
+REPLACE_WRITE_BUFFER = 1024 * 1024 # Búfer de escritura del temporal.
+TEMP_PREFIX = '.replace-' # Prefijo de los temporales (si el servidor se cae, se reconocen fácilmente).
+
+
+@lru_cache(maxsize=16)
+def _compile(find, is_regex, ignore_case):
+    flags = re.IGNORECASE if ignore_case else 0
+    return re.compile(find if is_regex else re.escape(find), flags | re.MULTILINE)
+
+
+def _matches(mm, pattern, is_literal, find):
+    """Genera (inicio, fin, match) de cada coincidencia. Los literales usan mm.find, que es más rápido."""
+    if is_literal:
+        position = mm.find(find)
+        while position >= 0:
+            yield position, position + len(find), None
+            position = mm.find(find, position + len(find))
+    else:
+        for match in pattern.finditer(mm):
+            yield match.start(), match.end(), match
+
+
+def process_file(full_path, find, replacement, is_regex, ignore_case, dry_run):
+    """
+    Se ejecuta en un proceso del pool. Analiza un archivo y, si hay coincidencias y no es un ensayo,
+    escribe el resultado en un temporal. Devuelve un diccionario con 'status':
+    'binary', 'nomatch', 'match' (ensayo), 'rewritten' (con 'tmp') o 'error'.
+    """
+    result = {'path': full_path, 'status': 'nomatch', 'count': 0}
+    tmp_path = None
+    try:
+        with open(full_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            result.update(size=st.st_size, mtime_ns=st.st_mtime_ns, ino=st.st_ino)
+            if st.st_size == 0:
+                return result
+            if b'\0' in f.read(BINARY_SNIFF_BYTES):
+                result['status'] = 'binary'
+                return result
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                is_literal = not is_regex and not ignore_case
+                pattern = _compile(find, is_regex, ignore_case)
+                # Análisis rápido: una sola búsqueda decide si hace falta hacer algo más.
+                if (mm.find(find) if is_literal else (0 if pattern.search(mm) else -1)) < 0:
+                    return result
+                if dry_run:
+                    result['status'] = 'match'
+                    result['count'] = sum(1 for _ in _matches(mm, pattern, is_literal, find))
+                    return result
+                directory = os.path.dirname(full_path)
+                fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+                count = 0
+                with open(fd, 'wb', buffering=REPLACE_WRITE_BUFFER) as out:
+                    position = 0
+                    for start, end, match in _matches(mm, pattern, is_literal, find):
+                        out.write(mm[position:start])
+                        # Solo las expresiones regulares usan plantilla (\1, \g<nombre>): un literal va tal cual,
+                        # aunque lleve barras invertidas ('C:\datos') y se busque sin distinguir mayúsculas.
+                        out.write(match.expand(replacement) if is_regex else replacement)
+                        position = end
+                        count += 1
+                    out.write(mm[position:])
+                    out.flush()
+                    os.fchmod(out.fileno(), stat.S_IMODE(st.st_mode)) # Mismos permisos que el original.
+                    if DURABILITY != DURABILITY_NONE:
+                        os.fsync(out.fileno()) # Aquí, en paralelo en cada proceso; el proceso principal solo renombra.
+                    new_size = out.tell()
+        result.update(status='rewritten', count=count, tmp=tmp_path, new_size=new_size)
+        return result
+    except (OSError, ValueError, re.error) as e:
+        if tmp_path:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        result.update(status='error', message=str(e))
+        return result
@@ -0,0 +1,473 @@
+# replication.py
+import os # Rutas, stat y operaciones en la réplica local.
+import json # Configuración, puntos de control y peticiones a la API de otra instancia.
+import shutil # Borrar árboles en la réplica local.
+import tempfile # Los puntos de control se escriben en un temporal que luego se renombra.
+import threading # Cada replicador sigue el diario en su propio hilo.
+import time # Retraso de replicación y esperas entre reintentos.
+import urllib.error # Errores de red al replicar contra otra instancia.
+import urllib.parse # Parámetros de las peticiones GET a la otra instancia.
+import urllib.request # Cliente HTTP sin dependencias extra.
+from utils import get_root # Cada replicador copia una raíz de datos.
+from journal import JOURNAL_DIRNAME, journal # Diario de mutaciones que siguen los replicadores.
+from fileops import apply_delta, copy_file_data, file_sha256, file_signature, rolling_delta # Transferencia por bloques (suma rodante).
+
+# --- Replicación Incremental ---
+# Mantiene una copia en caliente de una raíz de datos en otra carpeta (ej: otro disco) o en otra instancia
+# de esta aplicación (por su API HTTP). En vez de recorrer todo el árbol, cada replicador sigue el diario de
+# mutaciones (journal.py) desde su punto de control y aplica solo lo que cambió: el retraso baja a segundos.
+# - Los archivos modificados no se copian enteros: la réplica manda la firma de su copia (sumas por bloque)
+#   y solo viajan los bloques nuevos (delta por suma rodante, estilo rsync, ver fileops.rolling_delta).
+# - La primera vez (o si el diario ya no tiene los registros que faltan) se hace una puesta al día completa:
+#   se compara el árbol entero con la réplica (tamaño y fecha) y se transfieren por bloques solo las diferencias.
+# - El punto de control (última secuencia aplicada) se guarda en disco: al reiniciar se sigue donde se quedó.
+# Aplicar un registro es idempotente (se replica el estado ACTUAL de la ruta), así que repetir alguno tras una
+# caída no estropea nada.
+#
+# Configuración en 'replication.json' (raíz del proyecto) o en la ruta de FILES_MANAGER_REPLICATION_FILE:
+#   {"replicas": [{"name": "standby", "root": "data", "path": "/mnt/standby/data"},
+#                 {"name": "remoto", "root": "data", "url": "http://otro-servidor:5000", "remote_root": "data"}]}
+
+REPLICATION_CONFIG_FILENAME = 'replication.json'
+REPLICATION_BATCH = 500 # Registros del diario que se leen de una vez.
+REPLICATION_IDLE_WAIT = 5 # Segundos que un replicador al día espera registros nuevos antes de volver a mirar.
+REPLICATION_RETRY_SECONDS = 10 # Espera tras un error antes de reintentar el mismo registro.
+HTTP_TIMEOUT = 60 # Segundos de espera de cada petición a la otra instancia.
+
+
+class ReplicaError(Exception):
+    """Error al aplicar un cambio en la réplica (se reintenta más tarde)."""
+
+
+# --- Destinos de la réplica ---
+# Los dos destinos ofrecen las mismas operaciones, con rutas relativas con '/':
+# stat, listdir, mkdir, delete, rename, signature, apply_delta y write_new.
+
+class LocalReplica:
+    """Réplica en otra carpeta del mismo servidor."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def describe(self):
+        return self.path
+
+    def _full(self, rel):
+        return os.path.join(self.path, rel.replace('/', os.sep)) if rel else self.path
+
+    def stat(self, rel):
+        """Devuelve {'is_dir', 'size', 'mtime_ns'} o None si no existe."""
+        try:
+            st = os.lstat(self._full(rel))
+        except FileNotFoundError:
+            return None
+        return {'is_dir': os.path.isdir(self._full(rel)) and not os.path.islink(self._full(rel)),
+                'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def listdir(self, rel):
+        """Devuelve {nombre: stat} del directorio (vacío si no existe)."""
+        listing = {}
+        try:
+            with os.scandir(self._full(rel)) as it:
+                for entry in it:
+                    st = entry.stat(follow_symlinks=False)
+                    listing[entry.name] = {'is_dir': entry.is_dir(follow_symlinks=False),
+                                           'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        except FileNotFoundError:
+            pass
+        return listing
+
+    def mkdir(self, rel):
+        os.makedirs(self._full(rel), exist_ok=True)
+
+    def delete(self, rel):
+        full = self._full(rel)
+        if os.path.isdir(full) and not os.path.islink(full):
+            shutil.rmtree(full)
+        elif os.path.lexists(full):
+            os.remove(full)
+
+    def rename(self, rel, to_rel):
+        os.makedirs(os.path.dirname(self._full(to_rel)), exist_ok=True)
+        os.replace(self._full(rel), self._full(to_rel))
+
+    def signature(self, rel):
+        return file_signature(self._full(rel))
+
+    def apply_delta(self, rel, ops, source_full):
+        apply_delta(self._full(rel), ops)
+        self._copy_times(rel, source_full)
+
+    def write_new(self, rel, source_full):
+        full = self._full(rel)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        copy_file_data(source_full, full) # Copia en el kernel (y conserva permisos y fechas).
+
+    def same_file(self, rel, target_stat, source_full, source_stat):
+        # En local conservamos la fecha de modificación, así que tamaño + fecha basta para saber si cambió.
+        return target_stat['size'] == source_stat.st_size and target_stat['mtime_ns'] == source_stat.st_mtime_ns
+
+    def _copy_times(self, rel, source_full):
+        st = os.stat(source_full)
+        os.utime(self._full(rel), ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+class HttpReplica:
+    """Réplica en otra instancia de esta aplicación, usando su API (browse, file_signature, patch_file...)."""
+
+    def __init__(self, url, remote_root=''):
+        self.url = url.rstrip('/')
+        self.remote_root = remote_root
+
+    def describe(self):
+        return f"{self.url} ({self.remote_root or 'data'})"
+
+    def _request(self, method, endpoint, params=None, body=None):
+        url = f"{self.url}{endpoint}"
+        if params:
+            url += '?' + urllib.parse.urlencode(params, doseq=True)
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise ReplicaError(f"{method} {endpoint}: {e}")
+
+    def _call(self, endpoint, body):
+        result = self._request('POST', endpoint, body=dict(body, root=self.remote_root))
+        if not result.get('success'):
+            raise ReplicaError(f"{endpoint}: {result.get('message')}")
+        return result
+
+    def stat(self, rel):
+        parent, _, name = rel.rpartition('/')
+        return self.listdir(parent).get(name)
+
+    def listdir(self, rel):
+        result = self._request('GET', '/api/browse', {'root': self.remote_root, 'path': rel,
+                                                      'fields': 'name,is_dir,size,mtime'})
+        if not result.get('success'):
+            return {}
+        return {item['name']: {'is_dir': item['is_dir'], 'size': item.get('size') or 0, 'mtime_ns': None}
+                for item in result.get('items', [])}
+
+    def mkdir(self, rel):
+        parent, _, name = rel.rpartition('/')
+        if rel and self.stat(rel) is None: # La raíz remota ya existe.
+            self._call('/api/create_dir', {'path': parent, 'name': name})
+
+    def delete(self, rel):
+        if self.stat(rel) is not None:
+            self._call('/api/delete', {'path': rel})
+
+    def rename(self, rel, to_rel):
+        parent, _, name = rel.rpartition('/')
+        to_parent, _, to_name = to_rel.rpartition('/')
+        if parent == to_parent:
+            self._call('/api/rename_item', {'oldPath': rel, 'newName': to_name})
+        else:
+            self._call('/api/move', {'source': rel, 'destination': to_parent, 'name': to_name})
+
+    def signature(self, rel):
+        result = self._request('GET', '/api/file_signature', {'root': self.remote_root, 'path': rel})
+        if not result.get('success'):
+            raise ReplicaError(f"/api/file_signature: {result.get('message')}")
+        return result['signature']
+
+    def apply_delta(self, rel, ops, source_full):
+        self._call('/api/patch_file', {'path': rel, 'delta': ops})
+
+    def write_new(self, rel, source_full):
+        # Se crea vacío y el contenido (binario incluido) llega como un delta sin bloques que copiar.
+        parent, _, name = rel.rpartition('/')
+        self._call('/api/create_file', {'path': parent, 'name': name, 'content': ''})
+        ops = rolling_delta(source_full, {'block_size': 1, 'size': 0, 'blocks': []})
+        if ops:
+            self.apply_delta(rel, ops, source_full)
+
+    def same_file(self, rel, target_stat, source_full, source_stat):
+        # La otra instancia no conserva nuestras fechas: con el mismo tamaño, comparamos el SHA-256 de los dos lados
+        # (/api/file_checksum). Leer el archivo en cada lado es mucho más barato que pedir la firma por bloques y
+        # calcular el delta de cada archivo en una puesta al día completa en la que casi nada cambió.
+        if target_stat['size'] != source_stat.st_size:
+            return False
+        result = self._request('GET', '/api/file_checksum', {'root': self.remote_root, 'path': rel})
+        if not result.get('success'):
+            return False
+        try:
+            return result.get('sha256') == file_sha256(source_full)
+        except OSError:
+            return False
+
+
+class Replicator:
+    """Sigue el diario y aplica los cambios de una raíz en una réplica."""
+
+    def __init__(self, name, root_name, replica, checkpoint_path):
+        self.name = name
+        self.root_name = root_name
+        self.replica = replica
+        self.checkpoint_path = checkpoint_path
+        self.applied_seq = None # None = nunca se sincronizó (hace falta una puesta al día completa).
+        self.applied_ts = None # Marca de tiempo del último registro aplicado.
+        self.state = 'stopped' # 'stopped', 'catching_up', 'streaming', 'error'.
+        self.last_error = None
+        self.stats = {'records': 0, 'files': 0, 'literal_bytes': 0, 'copied_bytes': 0}
+        self._lock = threading.Lock() # Una sola puesta al día o aplicación a la vez.
+        self._thread = None
+        self._resync_requested = False
+        self._load_checkpoint()
+
+    # --- Punto de control ---
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.applied_seq = saved.get('seq')
+            self.applied_ts = saved.get('ts')
+        except (OSError, ValueError):
+            self.applied_seq = None
+
+    def _save_checkpoint(self):
+        directory = os.path.dirname(self.checkpoint_path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.applied_seq, 'ts': self.applied_ts}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Aplicar cambios ---
+
+    def _source(self, rel):
+        root = get_root(self.root_name)
+        return os.path.join(root.path, rel.replace('/', os.sep)) if rel else root.path
+
+    def sync_file(self, rel):
+        """Deja el archivo 'rel' de la réplica igual que el original, transfiriendo solo los bloques distintos."""
+        source_full = self._source(rel)
+        try:
+            source_stat = os.stat(source_full)
+        except FileNotFoundError:
+            return # Se borró después: el registro 'delete' correspondiente llegará detrás.
+        target_stat = self.replica.stat(rel)
+        if target_stat is not None and target_stat['is_dir']:
+            self.replica.delete(rel)
+            target_stat = None
+        if target_stat is None:
+            self.replica.write_new(rel, source_full)
+            self.stats['literal_bytes'] += source_stat.st_size
+        elif not self.replica.same_file(rel, target_stat, source_full, source_stat):
+            ops = rolling_delta(source_full, self.replica.signature(rel))
+            if ops == [{'copy': [0, source_stat.st_size]}] and target_stat['size'] == source_stat.st_size:
+                return # Mismo contenido (solo cambió la fecha o es una réplica remota ya al día).
+            literal = sum(len(op['data_b64']) * 3 // 4 for op in ops if 'data_b64' in op)
+            self.replica.apply_delta(rel, ops, source_full)
+            self.stats['literal_bytes'] += literal
+            self.stats['copied_bytes'] += source_stat.st_size - literal
+        else:
+            return
+        self.stats['files'] += 1
+
+    def sync_tree(self, rel):
+        """Compara el directorio 'rel' (recursivamente) con la réplica y corrige las diferencias."""
+        self.replica.mkdir(rel)
+        pending = [rel]
+        while pending:
+            current = pending.pop()
+            target_listing = self.replica.listdir(current)
+            source_full = self._source(current)
+            try:
+                entries = list(os.scandir(source_full))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                child = f"{current}/{entry.name}" if current else entry.name
+                target = target_listing.pop(entry.name, None)
+                if entry.is_dir(follow_symlinks=False):
+                    if target is not None and not target['is_dir']:
+                        self.replica.delete(child)
+                    if target is None or not target['is_dir']:
+                        self.replica.mkdir(child)
+                    pending.append(child)
+                elif entry.is_file(follow_symlinks=False): # Los enlaces simbólicos no se replican.
+                    if target is None or target['is_dir'] or not self.replica.same_file(child, target, entry.path,
+                                                                                        entry.stat(follow_symlinks=False)):
+                        self.sync_file(child)
+            for name in target_listing: # Lo que la réplica tiene de más.
+                self.replica.delete(f"{current}/{name}" if current else name)
+
+    def sync_path(self, rel):
+        """Replica el estado actual de 'rel' (archivo, árbol o ausencia)."""
+        source_full = self._source(rel)
+        if not os.path.lexists(source_full):
+            self.replica.delete(rel)
+        elif os.path.isdir(source_full) and not os.path.islink(source_full):
+            self.sync_tree(rel)
+        else:
+            self.sync_file(rel)
+
+    def apply(self, record):
+        """Aplica un registro del diario en la réplica."""
+        if record.get('root') != self.root_name:
+            return # Cambio en otra raíz: no nos toca.
+        op, rel = record['op'], record['path']
+        if op == 'mkdir':
+            if os.path.isdir(self._source(rel)):
+                self.replica.mkdir(rel)
+        elif op == 'write':
+            self.sync_path(rel)
+        elif op == 'delete':
+            if not os.path.lexists(self._source(rel)):
+                self.replica.delete(rel)
+        elif op == 'rename':
+            # Renombrar en la réplica evita volver a transferir el contenido. Pero solo si el original ya no tiene
+            # 'rel': al re-aplicar el registro tras una caída, o si 'rel' se volvió a crear después, lo que haya en
+            # 'rel' NO es lo que se movió, y renombrarlo pisaría un 'to_rel' correcto.
+            to_rel = record['to']
+            if not os.path.lexists(self._source(rel)) and os.path.lexists(self._source(to_rel)):
+                try:
+                    if self.replica.stat(rel) is not None:
+                        self.replica.rename(rel, to_rel)
+                except (OSError, ReplicaError):
+                    pass # Lo arregla la sincronización de abajo.
+            # En todos los casos, ambos lados acaban como están ahora en el original (aplicar dos veces no cambia nada).
+            self.sync_path(rel)
+            self.sync_path(to_rel)
+        elif op == 'sync':
+            self.sync_path(rel)
+        self.stats['records'] += 1
+
+    def full_sync(self):
+        """Puesta al día completa: compara toda la raíz con la réplica. Después se sigue el diario desde aquí."""
+        with self._lock:
+            self.state = 'catching_up'
+            start_seq = journal.head # Los cambios durante la puesta al día se aplicarán después (es idempotente).
+            started = time.time()
+            print(f"replication.py: [{self.name}] Puesta al día completa hacia {self.replica.describe()}...")
+            self.sync_tree('')
+            self.applied_seq = start_seq
+            self.applied_ts = started
+            self._save_checkpoint()
+            self.state = 'streaming'
+            print(f"replication.py: [{self.name}] Puesta al día completada en {time.time() - started:.1f}s.")
+
+    def request_resync(self):
+        """Pide una puesta al día completa (la hace el hilo del replicador en cuanto termine lo que está aplicando)."""
+        self._resync_requested = True
+
+    # --- Hilo del replicador ---
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f'replicator-{self.name}', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self.applied_seq is None or self.applied_seq + 1 < journal.first_seq():
+                    # Sin punto de control, o el diario ya no tiene los registros que nos faltan.
+                    self.full_sync()
+                self._resync_requested = False
+                while not self._resync_requested:
+                    records = journal.read_after(self.applied_seq, REPLICATION_BATCH)
+                    if not records:
+                        self.state = 'streaming'
+                        journal.wait(self.applied_seq, REPLICATION_IDLE_WAIT)
+                        continue
+                    with self._lock:
+                        for record in records:
+                            self.apply(record)
+                            self.applied_seq = record['seq']
+                            self.applied_ts = record['ts']
+                        self._save_checkpoint()
+                    self.last_error = None
+                    replication.prune_journal()
+                self.applied_seq = None # Puesta al día pedida desde la API.
+            except Exception as e:
+                self.state = 'error'
+                self.last_error = str(e)
+                print(f"replication.py: [{self.name}] Error replicando: {e}. Reintento en {REPLICATION_RETRY_SECONDS}s.")
+                time.sleep(REPLICATION_RETRY_SECONDS)
+
+    def status(self):
+        head = journal.head
+        behind = 0 if self.applied_seq is None else max(0, head - self.applied_seq)
+        lag = 0.0
+        if behind and self.applied_ts is not None:
+            lag = round(time.time() - self.applied_ts, 3)
+        return {
+            'name': self.name,
+            'root': self.root_name,
+            'target': self.replica.describe(),
+            'state': self.state,
+            'applied_seq': self.applied_seq,
+            'journal_head': head,
+            'records_behind': behind,
+            'lag_seconds': lag,
+            'last_error': self.last_error,
+            'stats': dict(self.stats),
+        }
+
+
+class ReplicationManager:
+    """Registro de replicadores configurados."""
+
+    def __init__(self):
+        self.replicators = {}
+
+    def load(self, project_root_path):
+        config_path = os.environ.get('FILES_MANAGER_REPLICATION_FILE') or os.path.join(project_root_path, REPLICATION_CONFIG_FILENAME)
+        journal_dir = os.environ.get('FILES_MANAGER_JOURNAL_DIR')
+        if not os.path.isfile(config_path):
+            if journal_dir:
+                journal.open(journal_dir) # Diario sin réplicas (ej: lo consume otro proceso).
+            return []
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        journal_dir = journal_dir or os.path.join(project_root_path, JOURNAL_DIRNAME)
+        journal.open(journal_dir)
+        for item in config.get('replicas', []):
+            name = item['name']
+            root = get_root(item.get('root', ''))
+            if root is None:
+                print(f"replication.py: Réplica '{name}' ignorada: la raíz '{item.get('root')}' no existe.")
+                continue
+            if item.get('url'):
+                replica = HttpReplica(item['url'], item.get('remote_root', root.name))
+            else:
+                replica = LocalReplica(item['path'])
+            checkpoint = os.path.join(journal_dir, f"replica-{name}.checkpoint")
+            self.replicators[name] = Replicator(name, root.name, replica, checkpoint)
+        for replicator in self.replicators.values():
+            replicator.start()
+        return list(self.replicators.values())
+
+    def prune_journal(self):
+        """Borra los segmentos del diario que ya aplicaron todas las réplicas."""
+        applied = [r.applied_seq for r in self.replicators.values()]
+        if applied and None not in applied:
+            journal.prune(min(applied))
+
+    def get(self, name):
+        return self.replicators.get(name)
+
+    def status(self):
+        return [r.status() for r in self.replicators.values()]
+
+
+# Instancia única usada por toda la aplicación.
+replication = ReplicationManager()
+
+
+def init_replication(project_root_path):
+    """Abre el diario y arranca los replicadores de 'replication.json' (si existe). Se llama una vez al arrancar."""
+    replicators = replication.load(project_root_path)
+    if replicators:
+        print(f"replication.py: {len(replicators)} réplica(s): "
+              f"{', '.join(f'{r.name} -> {r.replica.describe()}' for r in replicators)}")
+    return replicators
@@ -0,0 +1,303 @@
+# resolver.py
+import errno # Para reconocer los errores de "es un enlace simbólico" (ELOOP) al abrir con O_NOFOLLOW.
+import os # open/stat relativos a un descriptor de directorio (dir_fd=).
+import stat # Para saber si el stat es de un enlace, un directorio o un archivo normal.
+import threading # La caché de descriptores se comparte entre todos los hilos del servidor.
+import time # Cada cuánto revalidamos un descriptor cacheado contra la ruta.
+from collections import OrderedDict # Caché LRU de descriptores.
+from utils import get_full_path, get_root # Validación de rutas de siempre (prefijo de raíz, '..', etc.).
+
+# --- Resolución de Rutas con Descriptores de Directorio ---
+# get_full_path devuelve una ruta absoluta en texto y después cada os.path.exists, isdir, isfile y open la vuelve a
+# recorrer entera en el kernel (4-6 búsquedas completas por petición). Además, entre la comprobación y el uso
+# alguien puede cambiar un componente por un enlace simbólico que apunte fuera de la raíz.
+# Aquí cada raíz guarda abiertos los descriptores de sus directorios más usados (caché LRU acotada) y las
+# operaciones se hacen RELATIVAS a ellos (dir_fd=, O_NOFOLLOW):
+# - resolve() devuelve un Resolved con UN SOLO stat que los endpoints reutilizan (exists, is_dir, is_file).
+# - Los directorios se abren componente a componente con O_NOFOLLOW: un enlace simbólico en medio del camino no
+#   se sigue a ciegas. Los enlaces que apuntan DENTRO de la raíz se siguen (se resuelven y se vuelve a abrir el
+#   camino real); los que apuntan fuera se tratan como si no existieran.
+# - Un descriptor cacheado sigue apuntando a su directorio aunque lo renombren, así que se descarta cuando la API
+#   borra o renombra algo (invalidate(), llamado desde events.notify_change) y, por si lo hace otro proceso, se
+#   revalida contra la ruta cada DIR_HANDLE_REVALIDATE segundos. Un directorio borrado se detecta al instante
+#   (fstat sin recorrer la ruta: st_nlink == 0).
+
+DIR_HANDLE_CACHE_SIZE = 128 # Descriptores de directorio abiertos como máximo por raíz.
+DIR_HANDLE_REVALIDATE = 2.0 # Segundos que un descriptor cacheado se usa sin comprobar que su ruta sigue siendo él.
+_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_CLOEXEC', 0)
+_NOFOLLOW = getattr(os, 'O_NOFOLLOW', 0)
+
+
+class DirHandle:
+    """Un directorio abierto. 'refs' cuenta quién lo está usando: solo se cierra cuando nadie lo usa."""
+
+    def __init__(self, rel, fd, st):
+        self.rel = rel
+        self.fd = fd
+        self.identity = (st.st_dev, st.st_ino)
+        self.checked = time.monotonic()
+        self.refs = 0
+        self.evicted = False
+
+
+class DirHandleCache:
+    """Descriptores abiertos de los directorios de una raíz, por ruta relativa ('' = la propia raíz)."""
+
+    def __init__(self, root_path, max_entries=DIR_HANDLE_CACHE_SIZE):
+        self.root_path = root_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._handles = OrderedDict() # ruta relativa -> DirHandle
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, rel):
+        """
+        Devuelve el DirHandle de 'rel' (abriéndolo si hace falta). Hay que devolverlo con release().
+        Lanza OSError si no existe, no es un directorio o algún componente es un enlace simbólico (ELOOP).
+        """
+        with self._lock:
+            handle = self._handles.get(rel)
+            if handle is not None:
+                handle.refs += 1
+                self._handles.move_to_end(rel)
+        if handle is not None:
+            if self._still_valid(handle):
+                self.hits += 1
+                return handle
+            self._drop(handle)
+            self.release(handle)
+        self.misses += 1
+        fd = self._open(rel)
+        try:
+            st = os.fstat(fd)
+        except OSError:
+            os.close(fd)
+            raise
+        fresh = DirHandle(rel, fd, st)
+        fresh.refs = 1
+        with self._lock:
+            current = self._handles.get(rel)
+            if current is not None:
+                # Otro hilo lo abrió a la vez: usamos el suyo y cerramos el nuestro.
+                current.refs += 1
+                winner = current
+            else:
+                self._handles[rel] = fresh
+                winner = fresh
+                doomed = []
+                while len(self._handles) > self.max_entries:
+                    _, old = self._handles.popitem(last=False)
+                    old.evicted = True
+                    if old.refs == 0:
+                        doomed.append(old)
+        if winner is not fresh:
+            os.close(fd)
+            return winner
+        for old in doomed:
+            os.close(old.fd)
+        return fresh
+
+    def release(self, handle):
+        with self._lock:
+            handle.refs -= 1
+            close = handle.evicted and handle.refs == 0
+        if close:
+            os.close(handle.fd)
+
+    def invalidate(self, rel):
+        """Descarta 'rel' y todo lo que cuelga de él (se borró o se renombró)."""
+        prefix = rel + '/' if rel else ''
+        with self._lock:
+            doomed = [h for key, h in self._handles.items() if key == rel or key.startswith(prefix)]
+            for handle in doomed:
+                del self._handles[handle.rel]
+                handle.evicted = True
+            to_close = [h for h in doomed if h.refs == 0]
+        for handle in to_close:
+            os.close(handle.fd)
+        return len(doomed)
+
+    def stats(self):
+        with self._lock:
+            return {'open': len(self._handles), 'hits': self.hits, 'misses': self.misses}
+
+    def _open(self, rel):
+        if not rel:
+            return os.open(self.root_path, _DIR_FLAGS)
+        parent_rel, _, name = rel.rpartition('/')
+        parent = self.acquire(parent_rel)
+        try:
+            return os.open(name, _DIR_FLAGS | _NOFOLLOW, dir_fd=parent.fd)
+        finally:
+            self.release(parent)
+
+    def _still_valid(self, handle):
+        """Comprobación barata (fstat) siempre; comprobación contra la ruta solo cada DIR_HANDLE_REVALIDATE."""
+        try:
+            if os.fstat(handle.fd).st_nlink == 0:
+                return False # Lo borraron.
+            now = time.monotonic()
+            if now - handle.checked < DIR_HANDLE_REVALIDATE:
+                return True
+            st = os.stat(os.path.join(self.root_path, handle.rel), follow_symlinks=False)
+            if (st.st_dev, st.st_ino) != handle.identity or not stat.S_ISDIR(st.st_mode):
+                return False # Lo renombraron o lo reemplazaron por otra cosa.
+            handle.checked = now
+            return True
+        except OSError:
+            return False
+
+    def _drop(self, handle):
+        with self._lock:
+            if self._handles.get(handle.rel) is handle:
+                del self._handles[handle.rel]
+                handle.evicted = True
+
+
+_caches = {} # (nombre de la raíz, ruta) -> DirHandleCache
+_caches_lock = threading.Lock()
+
+
+def handles_for(root):
+    """Caché de descriptores de una raíz (se crea la primera vez)."""
+    key = (root.name, root.path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = DirHandleCache(root.path)
+        return cache
+
+
+class Resolved:
+    """
+    Una ruta ya resuelta dentro de una raíz: el directorio padre abierto y un único stat del elemento.
+    Se usa con 'with' (o llamando a close()) para devolver el descriptor del padre a la caché.
+    """
+
+    def __init__(self, root, rel, full_path, parent, name, st):
+        self.root = root
+        self.rel = rel # Ruta relativa a la raíz, con '/' ('' = la propia raíz).
+        self.full_path = full_path
+        self.parent = parent # DirHandle del directorio padre (None para la raíz o si el padre no existe).
+        self.name = name
+        self.st = st # stat del elemento (siguiendo enlaces internos) o None si no existe.
+
+    @property
+    def exists(self):
+        return self.st is not None
+
+    @property
+    def is_dir(self):
+        return self.st is not None and stat.S_ISDIR(self.st.st_mode)
+
+    @property
+    def is_file(self):
+        return self.st is not None and stat.S_ISREG(self.st.st_mode)
+
+    def open(self, flags=os.O_RDONLY, mode=0o666):
+        """Abre el elemento relativo a su directorio padre, sin seguir enlaces. Devuelve un descriptor."""
+        flags |= _NOFOLLOW | getattr(os, 'O_CLOEXEC', 0)
+        if self.parent is None:
+            if self.rel:
+                raise FileNotFoundError(errno.ENOENT, 'No existe el directorio padre', self.full_path)
+            return os.open(self.root.path, flags, mode)
+        return os.open(self.name, flags, mode, dir_fd=self.parent.fd)
+
+    def open_file(self, mode='r', encoding=None):
+        """Como open() de Python, pero abriendo relativo al padre. Comprueba que sigue siendo un archivo normal."""
+        flags = os.O_RDONLY if mode.startswith('r') and '+' not in mode else os.O_RDWR
+        fd = self.open(flags)
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise IsADirectoryError(errno.EISDIR, 'No es un archivo', self.full_path)
+            self.st = st # El stat del descriptor abierto es el definitivo (sin ventana entre comprobar y usar).
+            return os.fdopen(fd, mode, encoding=encoding)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def close(self):
+        if self.parent is not None:
+            handles_for(self.root).release(self.parent)
+            self.parent = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _rel_of(root, full_path):
+    rel = os.path.relpath(full_path, root.path)
+    return '' if rel == '.' else rel.replace(os.sep, '/')
+
+
+def _inside(root, real_path):
+    root_real = os.path.realpath(root.path)
+    return real_path == root_real or real_path.startswith(root_real.rstrip(os.sep) + os.sep)
+
+
+def _lookup(root, rel):
+    """Abre el padre de 'rel' y hace el stat del elemento. Lanza OSError(ELOOP) si hay un enlace en el camino."""
+    cache = handles_for(root)
+    if not rel:
+        parent = None
+        st = os.stat(root.path)
+        return parent, '', st
+    parent_rel, _, name = rel.rpartition('/')
+    try:
+        parent = cache.acquire(parent_rel)
+    except OSError as e:
+        if e.errno in (errno.ELOOP, errno.EMLINK, errno.ENOTDIR):
+            raise # Puede ser un enlace simbólico en el camino (con O_DIRECTORY|O_NOFOLLOW, Linux da ENOTDIR o ELOOP).
+        return None, name, None # El padre no existe (o no es un directorio).
+    try:
+        st = os.stat(name, dir_fd=parent.fd, follow_symlinks=False)
+    except OSError:
+        st = None
+    if st is not None and stat.S_ISLNK(st.st_mode):
+        cache.release(parent)
+        raise OSError(errno.ELOOP, 'Es un enlace simbólico', rel)
+    return parent, name, st
+
+
+def resolve(user_path, root=None):
+    """
+    Valida 'user_path' (con get_full_path) y lo resuelve contra la caché de descriptores de la raíz.
+    Devuelve un Resolved, o None si la ruta no es válida (se sale de la raíz).
+    """
+    root = get_root(root)
+    if root is None:
+        return None
+    full_path = get_full_path(user_path, root)
+    if not full_path:
+        return None
+    rel = _rel_of(root, full_path)
+    try:
+        parent, name, st = _lookup(root, rel)
+    except OSError:
+        # Hay un enlace simbólico en el camino: solo lo seguimos si el destino real está dentro de la raíz.
+        real_path = os.path.realpath(full_path)
+        if not _inside(root, real_path):
+            print(f"resolver.py: '{full_path}' apunta fuera de la raíz ('{real_path}'). Se trata como inexistente.")
+            return Resolved(root, rel, full_path, None, os.path.basename(full_path), None)
+        try:
+            parent, name, st = _lookup(root, _rel_of(root, real_path))
+        except OSError:
+            parent, name, st = None, os.path.basename(full_path), None # Cambió mientras lo resolvíamos.
+    return Resolved(root, rel, full_path, parent, name, st)
+
+
+def invalidate(root_name, full_path):
+    """Descarta los descriptores de 'full_path' y sus subdirectorios (la API lo borró, renombró o movió)."""
+    root = get_root(root_name)
+    if root is None:
+        return 0
+    with _caches_lock:
+        cache = _caches.get((root.name, root.path))
+    if cache is None:
+        return 0
+    return cache.invalidate(_rel_of(root, full_path))
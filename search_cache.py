@@ -0,0 +1,78 @@
+# search_cache.py
+import os # Para comparar rutas (un cambio dentro de la carpeta buscada invalida sus resultados).
+import time # Caducidad (TTL) de los resultados guardados.
+from utils import get_root # Cada raíz guarda sus resultados en su propia caché LRU ('search').
+from prefetch import client_key # Si el navegador no manda sesión, agrupamos por cliente.
+
+# --- Caché de Búsquedas Mientras se Escribe ---
+# El buscador lanza una búsqueda por cada pausa al escribir: "con", luego "conf", luego "config". Todo lo que
+# contiene "config" contiene también "con", así que no hace falta recorrer otra vez el disco: basta con filtrar
+# las coincidencias de la búsqueda anterior.
+# - Cada sesión del navegador (parámetro 'session') guarda, por carpeta de búsqueda, los resultados de sus
+#   últimos términos. La caché es la LRU 'search' de cada raíz: acotada en número de entradas, y cada entrada
+#   solo guarda resultados de hasta SEARCH_CACHE_MAX_CANDIDATES elementos.
+# - Los resultados caducan a los SEARCH_CACHE_TTL segundos (así los cambios hechos fuera de la aplicación
+#   acaban apareciendo) y se descartan en cuanto la API cambia algo dentro de la carpeta buscada (invalidate(),
+#   llamado desde events.notify_change).
+
+SEARCH_CACHE_TTL = 60 # Segundos que se reutilizan unos resultados.
+SEARCH_CACHE_ENTRIES = 256 # (sesión, carpeta) guardadas como máximo por raíz.
+SEARCH_CACHE_TERMS = 6 # Términos recientes guardados por (sesión, carpeta).
+SEARCH_CACHE_MAX_CANDIDATES = 20000 # Con más coincidencias no se guardan (ocuparían demasiada memoria).
+SEARCH_SESSION_MAX_LENGTH = 64 # Longitud máxima del identificador de sesión que manda el navegador.
+
+
+def _cache(root):
+    return root.cache('search', SEARCH_CACHE_ENTRIES)
+
+
+def search_session(req):
+    """Identificador de la sesión de búsqueda: el parámetro 'session' del navegador o, si no hay, el cliente."""
+    session = req.args.get('session', '')[:SEARCH_SESSION_MAX_LENGTH]
+    return session or f"cliente:{client_key(req)}"
+
+
+def lookup(root, session, full_path, term):
+    """
+    Busca resultados reutilizables para 'term': los de un término anterior contenido en él (el más largo,
+    que es el que menos candidatos tiene). Devuelve (término_anterior, [(nombre, ruta, es_directorio), ...]) o None.
+    """
+    terms = _cache(root).get((session, full_path))
+    if not terms:
+        return None
+    now = time.monotonic()
+    best = None
+    for cached_term, (stored_at, candidates) in terms.items():
+        if now - stored_at > SEARCH_CACHE_TTL or cached_term not in term:
+            continue
+        if best is None or len(cached_term) > len(best[0]):
+            best = (cached_term, candidates)
+    return best
+
+
+def store(root, session, full_path, term, candidates):
+    """Guarda las coincidencias de 'term' (descartando las caducadas y, si sobran, las más antiguas)."""
+    cache = _cache(root)
+    key = (session, full_path)
+    now = time.monotonic()
+    # Copiamos en vez de modificar: otro hilo puede estar leyendo el diccionario guardado.
+    terms = {t: v for t, v in (cache.get(key) or {}).items() if now - v[0] <= SEARCH_CACHE_TTL}
+    terms[term] = (now, candidates)
+    if len(terms) > SEARCH_CACHE_TERMS:
+        newest = sorted(terms.items(), key=lambda item: item[1][0])[-SEARCH_CACHE_TERMS:]
+        terms = dict(newest)
+    cache.set(key, terms)
+
+
+def invalidate(root_name, full_path):
+    """Descarta los resultados de las carpetas que contienen 'full_path' (o que estaban dentro, si se borró)."""
+    root = get_root(root_name)
+    if root is None:
+        return 0
+
+    def affected(key):
+        searched = key[1]
+        return (full_path == searched or full_path.startswith(searched.rstrip(os.sep) + os.sep)
+                or searched.startswith(full_path.rstrip(os.sep) + os.sep))
+
+    return _cache(root).discard_where(affected)
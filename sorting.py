@@ -0,0 +1,92 @@
+# sorting.py
+import os # Para separar la extensión de los nombres (orden por 'ext').
+import heapq # Selección de los k primeros con un montículo acotado (nsmallest/nlargest).
+import itertools # Contador para desempatar sin comparar nunca los elementos en sí.
+
+# --- Orden y Selección de los Primeros k ---
+# /api/browse y /api/search aceptan 'sort' (name|size|mtime|ext), 'order' (asc|desc), 'top' (k) y 'dirs_first' (1|0).
+# La clave de orden de cada elemento se calcula UNA sola vez, mientras se recorre el directorio.
+# Con 'top', en vez de ordenar todo nos quedamos con los k mejores en un montículo de tamaño k:
+# O(n log k) en tiempo y O(k) en memoria, así "los 50 más recientes" de una carpeta con 400.000 entradas
+# no obliga a guardar ni a ordenar las 400.000 (ni a enviarlas al navegador).
+
+SORT_FIELDS = ('name', 'size', 'mtime', 'ext')
+STAT_SORT_FIELDS = {'size', 'mtime'} # Ordenar por estos campos necesita el stat de cada elemento.
+DEFAULT_SORT = 'name'
+
+
+class SortSpec:
+    """Cómo ordenar y cuántos elementos devolver (parámetros ya validados)."""
+
+    def __init__(self, sort=DEFAULT_SORT, descending=False, top=None, dirs_first=True):
+        self.sort = sort
+        self.descending = descending
+        self.top = top # None = todos.
+        self.dirs_first = dirs_first
+
+    @property
+    def needs_stat(self):
+        return self.sort in STAT_SORT_FIELDS
+
+    def to_dict(self):
+        return {'sort': self.sort, 'order': 'desc' if self.descending else 'asc', 'top': self.top}
+
+
+def parse_sort_args(args):
+    """
+    Lee 'sort', 'order', 'top' y 'dirs_first' de los parámetros de la petición.
+    Devuelve (SortSpec, None) o (None, mensaje_de_error).
+    """
+    sort = args.get('sort', DEFAULT_SORT).strip().lower() or DEFAULT_SORT
+    if sort not in SORT_FIELDS:
+        return None, f"Orden no válido: '{sort}'. Disponibles: {', '.join(SORT_FIELDS)}"
+    order = args.get('order', 'asc').strip().lower() or 'asc'
+    if order not in ('asc', 'desc'):
+        return None, f"'order' debe ser 'asc' o 'desc', no '{order}'"
+    top = args.get('top', '').strip()
+    if top:
+        if not top.isdigit() or int(top) < 1:
+            return None, f"'top' debe ser un número entero positivo, no '{top}'"
+        top = int(top)
+    else:
+        top = None
+    dirs_first = args.get('dirs_first', '1').strip().lower() not in ('0', 'false', 'no')
+    return SortSpec(sort, order == 'desc', top, dirs_first), None
+
+
+def sort_key(spec, name, is_dir, st=None):
+    """
+    Calcula la clave de orden de un elemento. 'st' es su stat (solo hace falta si spec.needs_stat).
+    Los directorios van primero en ambos sentidos: con 'desc' se usa nlargest/reverse, así que el grupo se invierte.
+    """
+    lower = name.lower()
+    if spec.sort == 'size':
+        value = st.st_size if st is not None and not is_dir else -1 # Los directorios (y los ilegibles) no tienen tamaño.
+    elif spec.sort == 'mtime':
+        value = st.st_mtime if st is not None else 0.0
+    elif spec.sort == 'ext':
+        value = os.path.splitext(lower)[1]
+    else:
+        value = lower
+    if spec.dirs_first:
+        group = is_dir if spec.descending else not is_dir
+    else:
+        group = False
+    return (group, value, lower)
+
+
+def select_sorted(spec, decorated):
+    """
+    Ordena (o selecciona los 'top' primeros de) un iterable de pares (clave, elemento).
+    Devuelve (elementos_en_orden, total_recorridos). Con 'top' nunca guarda más de k elementos a la vez.
+    """
+    counter = itertools.count()
+    # El contador desempata claves iguales: los elementos (DirEntry, diccionarios...) nunca se comparan entre sí.
+    tagged = ((key, next(counter), item) for key, item in decorated)
+    if spec.top is not None:
+        pick = heapq.nlargest if spec.descending else heapq.nsmallest
+        chosen = pick(spec.top, tagged)
+    else:
+        chosen = sorted(tagged, reverse=spec.descending)
+    total = next(counter) # El contador ya avanzó una vez por cada elemento recorrido.
+    return [item for _, _, item in chosen], total
@@ -3,6 +3,261 @@ let selectedItemPath = null;
 let selectedItemIsFile = false;
 let selectedItemElement = null; // Referencia al elemento DOM actualmente seleccionado
 let currentPreviewContent = null; // Variable global para almacenar el contenido del modal
+let currentRoot = ''; // Raíz de datos que se está explorando ('' = la raíz por defecto, 'data')
+
+// Prefijo con el que el backend muestra las rutas de la raíz actual (ej: 'data/' o 'archive/')
+function currentRootPrefix() {
+    return `${currentRoot || 'data'}/`;
+}
+
+// Parámetro de query para indicar la raíz actual en las peticiones GET
+function rootQuery() {
+    return currentRoot ? `&root=${encodeURIComponent(currentRoot)}` : '';
+}
+
+// Carga las raíces disponibles en el selector (solo se muestra si hay más de una)
+async function loadRoots() {
+    const rootSelect = document.getElementById('rootSelect');
+    if (!rootSelect) return;
+    try {
+        const response = await fetch('/api/roots');
+        const data = await response.json();
+        if (!data.success || data.roots.length < 2) return;
+        rootSelect.innerHTML = data.roots
+            .map(root => `<option value="${escapeHTML(root.name)}">${escapeHTML(root.name)}/</option>`)
+            .join('');
+        rootSelect.value = currentRoot || 'data';
+        rootSelect.classList.remove('d-none');
+        rootSelect.addEventListener('change', () => {
+            currentRoot = rootSelect.value === 'data' ? '' : rootSelect.value;
+            loadDirectoryContent('');
+        });
+    } catch (error) {
+        console.error('Error al cargar las raíces de datos:', error);
+    }
+}
+
+// --- Cambios en vivo (Server-Sent Events) ---
+// El servidor nos avisa de lo que se crea, borra o modifica en el directorio que estamos viendo
+// (por nosotros o por cualquier otro), así no hace falta volver a pedir el listado entero.
+let currentDirPath = null; // Directorio mostrado ('' = raíz). null mientras se ven resultados de búsqueda.
+let currentItems = []; // Último listado del directorio mostrado.
+let watchSource = null; // Conexión EventSource con /api/watch
+let watchStreamId = null; // Id de la conexión (llega en el evento 'ready'); null si no está conectada
+
+// Columnas que pide la lista de archivos a /api/browse (el servidor solo envía estas)
+const LISTING_FIELDS = 'name,path,is_dir,is_file,size,mtime';
+
+function browseUrl(path) {
+    // format=compact: columnas en vez de un objeto por elemento (mucho más ligero en carpetas grandes)
+    return `/api/browse?path=${encodeURIComponent(path)}${rootQuery()}&fields=${LISTING_FIELDS}&format=compact`;
+}
+
+// Convierte una respuesta en formato compacto (columnas + prefijo común) en la lista de items de siempre
+function expandCompactListing(data) {
+    if (data.format !== 'compact') return data;
+    const columns = data.columns;
+    const extraColumns = Object.keys(columns).filter(column => column !== 'name' && column !== 'flags');
+    data.items = columns.name.map((name, i) => {
+        const flags = columns.flags[i]; // 1 = directorio, 2 = archivo, 4 = enlace simbólico
+        const item = {
+            name,
+            path: data.base + name,
+            is_dir: (flags & 1) !== 0,
+            is_file: (flags & 2) !== 0,
+            is_symlink: (flags & 4) !== 0,
+        };
+        extraColumns.forEach(column => { item[column] = columns[column][i]; });
+        return item;
+    });
+    delete data.columns;
+    return data;
+}
+
+// Tamaño legible (ej: 1.5 MB)
+function formatSize(bytes) {
+    if (bytes === null || bytes === undefined) return '';
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${unit === 0 ? value : value.toFixed(1)} ${units[unit]}`;
+}
+
+// Fecha legible a partir de segundos desde epoch
+function formatDate(seconds) {
+    if (!seconds) return '';
+    return new Date(seconds * 1000).toLocaleString();
+}
+
+// Normaliza una ruta de directorio como la devuelve el servidor (sin barras al principio ni al final)
+function normalizeDirPath(path) {
+    return (path || '').split('/').filter(segment => segment !== '').join('/');
+}
+
+// Abre la conexión SSE (el navegador la reabre solo si se corta)
+function startWatching() {
+    if (!window.EventSource) return; // Navegador sin SSE: seguimos recargando el listado como siempre
+    watchSource = new EventSource(`/api/watch?path=${encodeURIComponent(currentDirPath || '')}${rootQuery()}`);
+    watchSource.addEventListener('ready', (event) => {
+        watchStreamId = JSON.parse(event.data).stream_id;
+        // Tras una reconexión, el directorio actual puede no ser el de la URL original
+        sendWatchInterest();
+    });
+    watchSource.addEventListener('change', (event) => applyDirectoryEvent(JSON.parse(event.data)));
+    watchSource.addEventListener('resync', () => {
+        // Nos perdimos eventos: volvemos a listar para no mostrar algo incorrecto
+        if (currentDirPath !== null) loadDirectoryContent(currentDirPath);
+    });
+    watchSource.onerror = () => {
+        watchStreamId = null; // Mientras reconecta, las acciones recargan el listado a la antigua
+    };
+}
+
+// Cambia el directorio que vigila la conexión SSE (al navegar)
+function watchDirectory(path) {
+    if (!watchSource) {
+        startWatching();
+        return;
+    }
+    sendWatchInterest();
+}
+
+async function sendWatchInterest() {
+    if (!watchStreamId || currentDirPath === null) return;
+    try {
+        await fetch(`/api/watch/${watchStreamId}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ paths: [currentDirPath], root: currentRoot }),
+        });
+    } catch (error) {
+        console.error('Error al actualizar el directorio vigilado:', error);
+    }
+}
+
+// Aplica un evento 'add', 'remove' o 'modify' al listado actual y lo vuelve a pintar
+function applyDirectoryEvent(change) {
+    if (currentDirPath === null || change.dir !== currentDirPath || change.root !== (currentRoot || 'data')) return;
+    const item = change.item;
+    currentItems = currentItems.filter(existing => existing.name !== item.name);
+    if (change.event !== 'remove') {
+        currentItems.push(item);
+        // Mismo orden que el servidor: directorios primero, luego por nombre
+        currentItems.sort((a, b) => {
+            if (a.is_dir !== b.is_dir) return a.is_dir ? -1 : 1;
+            const nameA = a.name.toLowerCase(), nameB = b.name.toLowerCase();
+            return nameA < nameB ? -1 : (nameA > nameB ? 1 : 0);
+        });
+    }
+    if (item.path === selectedItemPath) {
+        if (change.event === 'remove') {
+            selectedItemPath = null;
+            selectedItemElement = null;
+        } else if (change.event === 'modify' && selectedItemIsFile) {
+            previewFile(item.path); // El archivo que estamos viendo cambió: refrescamos la vista previa
+        }
+    }
+    // La copia en caché pasa a ser la versión actualizada (sin ETag: se revalidará entera la próxima vez)
+    const cached = getCachedListing(currentDirPath);
+    if (cached) setCachedListing(currentDirPath, null, { ...cached.data, items: currentItems });
+    renderDirectoryListing();
+}
+
+// Después de una acción: si la conexión SSE está activa y el cambio es en el directorio mostrado,
+// el evento llegará solo; si no, recargamos el directorio como antes.
+function refreshAfterChange(path) {
+    if (watchStreamId && currentDirPath !== null && normalizeDirPath(path) === currentDirPath) return;
+    loadDirectoryContent(path);
+}
+
+// --- Caché de listados y prefetch ---
+// Guardamos los últimos listados para mostrarlos al instante al volver a un directorio; luego se revalidan
+// con el ETag (el servidor responde 304 si no cambió). Los subdirectorios se piden por adelantado al pasar
+// el ratón por encima o cuando el navegador está libre (los más visitados, según /api/browse/hints).
+const LISTING_CACHE_SIZE = 50; // Listados guardados como máximo (se descarta el usado hace más tiempo)
+const HOVER_PREFETCH_DELAY = 150; // ms que el ratón debe quedarse sobre una carpeta antes de pedirla
+const listingCache = new Map(); // 'raíz|ruta' -> { etag, data }. Map recuerda el orden de inserción (LRU)
+const prefetchInFlight = new Set(); // Claves que se están pidiendo ahora mismo por adelantado
+let prefetchPausedUntil = 0; // Si el servidor nos frena (429), no pedimos nada especulativo hasta entonces
+let navigationCounter = 0; // Se incrementa en cada navegación
+let currentListingKey = null; // Clave de caché del directorio mostrado
+
+function listingCacheKey(path) {
+    return `${currentRoot || 'data'}|${normalizeDirPath(path)}`;
+}
+
+function getCachedListing(path) {
+    const key = listingCacheKey(path);
+    const entry = listingCache.get(key);
+    if (entry) {
+        // Lo movemos al final: usado recientemente
+        listingCache.delete(key);
+        listingCache.set(key, entry);
+    }
+    return entry;
+}
+
+function setCachedListing(path, etag, data) {
+    const key = listingCacheKey(path);
+    listingCache.delete(key);
+    listingCache.set(key, { etag, data });
+    while (listingCache.size > LISTING_CACHE_SIZE) {
+        listingCache.delete(listingCache.keys().next().value); // El más antiguo
+    }
+}
+
+function forgetCachedListing(path) {
+    listingCache.delete(listingCacheKey(path));
+}
+
+// Pide un directorio por adelantado y lo guarda en la caché (sin mostrarlo)
+async function prefetchDirectory(path) {
+    const key = listingCacheKey(path);
+    if (Date.now() < prefetchPausedUntil || listingCache.has(key) || prefetchInFlight.has(key)) return;
+    prefetchInFlight.add(key);
+    try {
+        const response = await fetch(browseUrl(path), {
+            headers: { 'X-Prefetch': '1' }, // El servidor lo cuenta contra nuestro presupuesto de prefetch
+            cache: 'no-store',
+        });
+        if (response.status === 429 || response.status === 503) {
+            const retryAfter = parseInt(response.headers.get('Retry-After') || '10', 10);
+            prefetchPausedUntil = Date.now() + retryAfter * 1000;
+            return;
+        }
+        const data = expandCompactListing(await response.json());
+        if (data.success) setCachedListing(path, response.headers.get('ETag'), data);
+    } catch (error) {
+        console.debug('Prefetch fallido:', path, error);
+    } finally {
+        prefetchInFlight.delete(key);
+    }
+}
+
+// Cuando el navegador esté libre, pide las sugerencias del servidor y las carga por adelantado
+function scheduleHintPrefetch(path) {
+    const run = async () => {
+        if (path !== currentDirPath || Date.now() < prefetchPausedUntil) return;
+        try {
+            const response = await fetch(`/api/browse/hints?path=${encodeURIComponent(path)}${rootQuery()}`);
+            const data = await response.json();
+            if (!data.success || path !== currentDirPath) return;
+            // Nunca pedimos más de lo que el servidor dice que nos queda de presupuesto
+            data.hints.slice(0, data.prefetch_budget).forEach(hint => prefetchDirectory(hint));
+        } catch (error) {
+            console.debug('Error al pedir sugerencias de prefetch:', error);
+        }
+    };
+    if (window.requestIdleCallback) {
+        window.requestIdleCallback(run, { timeout: 2000 });
+    } else {
+        setTimeout(run, 500);
+    }
+}
 
 // Función para mostrar alertas con más detalles
 function showAlert(type, message, extraInfo = '') {
@@ -155,6 +410,9 @@ function addUpdateButtonHandler() {
 
 // Function to load directory content from the backend API
 async function loadDirectoryContent(path = '') {
+    const navigation = ++navigationCounter; // Para ignorar respuestas de navegaciones anteriores
+    // Si ya tenemos el listado en caché, lo mostramos al instante y lo revalidamos en segundo plano
+    const cached = getCachedListing(path);
     try {
         // Clear any previous selection before loading new content
         if (selectedItemElement) {
@@ -184,7 +442,14 @@ async function loadDirectoryContent(path = '') {
 
         // Show loading state
         const browserContent = document.getElementById('browser-content');
-         if (browserContent) {
+         if (!browserContent) {
+             console.error("Elemento '#browser-content' no encontrado.");
+             showAlert('danger', 'Error interno', 'No se encontró el área de contenido del navegador.');
+             return;
+         }
+         if (cached) {
+             showListing(path, cached.data);
+         } else {
               browserContent.innerHTML = `
                  <div class="text-muted text-center py-5 loading-state">
                      <div class="spinner-border text-primary" role="status">
@@ -193,120 +458,23 @@ async function loadDirectoryContent(path = '') {
                      <p class="mt-2">Cargando...</p>
                  </div>
              `;
-         } else {
-             console.error("Elemento '#browser-content' no encontrado.");
-             showAlert('danger', 'Error interno', 'No se encontró el área de contenido del navegador.');
-             return;
          }
 
 
         // Construct the API URL with the encoded path
-        const response = await fetch(`/api/browse?path=${encodeURIComponent(path)}`);
-        // Parse the JSON response
-        const data = await response.json();
+        // Con If-None-Match el servidor responde 304 (sin listar) si el directorio no cambió
+        const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+        const response = await fetch(browseUrl(path), { headers, cache: 'no-store' });
+        if (navigation !== navigationCounter) return; // El usuario ya navegó a otro sitio
+        if (response.status === 304) {
+            return; // El listado en caché (ya mostrado) sigue siendo válido
+        }
+        // Parse the JSON response (en formato compacto: lo convertimos a la lista de items de siempre)
+        const data = expandCompactListing(await response.json());
 
         if (data.success) {
-            // Update the displayed current path
-            document.getElementById('currentPath').textContent = data.current_path_display || 'data/'; // Ensure trailing slash for root display
-
-            browserContent.innerHTML = ''; // Clear loading state or previous content
-
-            // --- CÁLCULO MEJORADO DE LA RUTA PADRE ---
-            let parentPath = '';
-            if (path && path !== '') {
-                // Eliminar barra final si existe
-                const cleanPath = path.endsWith('/') ? path.slice(0, -1) : path;
-                // Dividir por barras y filtrar segmentos vacíos
-                const segments = cleanPath.split('/').filter(segment => segment !== '');
-                
-                if (segments.length > 0) {
-                    segments.pop(); // Eliminar el último segmento
-                    parentPath = segments.join('/'); // Unir el resto
-                }
-                // Si segments.length es 0 después de pop(), parentPath será '' (raíz)
-            }
-            // --------------------------------------------
-
-            // Mostrar el botón de subir nivel
-            const upButton = document.createElement('button');
-            upButton.className = 'list-group-item list-group-item-action d-flex align-items-center';
-            upButton.innerHTML = `
-                <i class="bi bi-arrow-up-circle-fill me-2"></i>
-                .. Subir nivel
-            `;
-            
-            if (path !== '') { // Si no estamos en el directorio raíz
-                upButton.onclick = (event) => {
-                    event.stopPropagation();
-                    loadDirectoryContent(parentPath); // Usar parentPath calculado
-                };
-                upButton.style.cursor = 'pointer';
-            } else {
-                upButton.style.opacity = '0.5';
-                upButton.style.cursor = 'not-allowed';
-                upButton.title = 'Ya estás en el directorio raíz';
-            }
-
-            browserContent.appendChild(upButton);
-
-
-            // Crear un div para el contenido principal (items y mensaje de vacío)
-            const contentDiv = document.createElement('div');
-            contentDiv.className = 'list-group';
-
-            // Si el directorio está vacío
-            if (data.items.length === 0) {
-                contentDiv.innerHTML = `
-                    <div class="text-muted text-center py-5 empty-state">
-                        <i class="bi bi-folder2-open fs-1 mb-3"></i>
-                        <p>${path === '' ? 'Este directorio está vacío.' : 'Esta carpeta está vacía.'}</p>
-                    </div>
-                `;
-            } else {
-                // Si el directorio no está vacío, mostrar los items
-                data.items.forEach(item => {
-                    if (item.name === '..') return; // Skip the ".." item
-
-                    const itemElement = document.createElement('button');
-                    itemElement.className = 'list-group-item list-group-item-action d-flex justify-content-between align-items-center';
-
-                    const iconClass = item.is_dir ? 'bi-folder-fill text-warning' : 'bi-file-earmark-fill text-primary';
-
-                    itemElement.innerHTML = `
-                        <div class="d-flex align-items-center flex-grow-1 text-start">
-                            <i class="bi ${iconClass} me-2"></i>
-                            ${escapeHTML(item.name)}
-                        </div>
-                        <div class="btn-group btn-group-sm" role="group" onclick="event.stopPropagation()" title="Acciones">
-                            ${item.is_file ?
-                                `<button type="button" class="btn btn-outline-secondary" onclick="setModalPath('appendModal', '${escapeHTML(item.path)}') ; return false;" title="Agregar Contenido">
-                                    <i class="bi bi-plus-circle"></i>
-                                </button>` : ''
-                            }
-                            <button type="button" class="btn btn-outline-secondary" onclick="setModalPath('renameModal', '${escapeHTML(item.path)}', '${escapeHTML(item.name)}') ; return false;" title="Renombrar">
-                                <i class="bi bi-pencil"></i>
-                            </button>
-                            <button type="button" class="btn btn-outline-danger" onclick="setModalPath('deleteModal', '${escapeHTML(item.path)}') ; return false;" title="Eliminar">
-                                <i class="bi bi-trash"></i>
-                            </button>
-                        </div>
-                    `;
-
-                    itemElement.addEventListener('click', (event) => {
-                        if (!event.target.closest('.btn-group')) {
-                            selectItem(item.path, item.is_file, itemElement);
-                            if (item.is_dir) {
-                                loadDirectoryContent(item.path);
-                            }
-                        }
-                    });
-
-                    contentDiv.appendChild(itemElement);
-                });
-            }
-
-            // Agregar el contenido principal al browserContent
-            browserContent.appendChild(contentDiv);
+            setCachedListing(path, response.headers.get('ETag'), data);
+            showListing(path, data);
 
             // Optional: Show a success message for initial load, but might be too frequent
             // showAlert('success', 'Directorio cargado correctamente',
@@ -314,6 +482,7 @@ async function loadDirectoryContent(path = '') {
         } else {
             // If the API returns success: false, show the error message from the backend.
              console.error('Error API al cargar directorio:', data.message); // Log in browser console
+             forgetCachedListing(path);
              // Display the error state in the browser area.
              browserContent.innerHTML = `
                  <div class="text-muted text-center py-5 preview-error-state">
@@ -328,6 +497,7 @@ async function loadDirectoryContent(path = '') {
     } catch (error) {
         // Catch fetch request errors (e.g., network error, server not responding).
         console.error('Error al cargar el contenido del directorio:', error); // Log in browser console
+        if (cached) return; // Seguimos mostrando el listado en caché
          // Display a generic error state in the browser area.
          const browserContent = document.getElementById('browser-content');
          if (browserContent) {
@@ -345,10 +515,156 @@ async function loadDirectoryContent(path = '') {
     }
 }
 
+// Muestra un listado (recién recibido o de la caché) como directorio actual
+function showListing(path, data) {
+    // Update the displayed current path
+    document.getElementById('currentPath').textContent = data.current_path_display || currentRootPrefix(); // Ensure trailing slash for root display
+
+    // Guardamos el listado para aplicar los cambios que lleguen por SSE sin volver a pedirlo
+    const listingKey = listingCacheKey(path); // Incluye la raíz: cambiar de raíz también es cambiar de directorio
+    const changedDir = listingKey !== currentListingKey;
+    currentListingKey = listingKey;
+    currentDirPath = normalizeDirPath(path);
+    currentItems = data.items;
+    renderDirectoryListing();
+    if (changedDir) {
+        // Avisamos al servidor de qué directorio estamos viendo ahora
+        watchDirectory(currentDirPath);
+        // Y cuando el navegador esté libre, pedimos por adelantado los subdirectorios más visitados
+        scheduleHintPrefetch(currentDirPath);
+    }
+}
+
+// Pinta el listado del directorio actual (currentItems) en el área del navegador
+function renderDirectoryListing() {
+    const browserContent = document.getElementById('browser-content');
+    if (!browserContent || currentDirPath === null) return;
+    const path = currentDirPath;
+
+    browserContent.innerHTML = ''; // Clear loading state or previous content
+
+    // --- CÁLCULO MEJORADO DE LA RUTA PADRE ---
+    let parentPath = '';
+    if (path !== '') {
+        // Eliminar barra final si existe
+        const cleanPath = path.endsWith('/') ? path.slice(0, -1) : path;
+        // Dividir por barras y filtrar segmentos vacíos
+        const segments = cleanPath.split('/').filter(segment => segment !== '');
+        
+        if (segments.length > 0) {
+            segments.pop(); // Eliminar el último segmento
+            parentPath = segments.join('/'); // Unir el resto
+        }
+        // Si segments.length es 0 después de pop(), parentPath será '' (raíz)
+    }
+    // --------------------------------------------
+
+    // Mostrar el botón de subir nivel
+    const upButton = document.createElement('button');
+    upButton.className = 'list-group-item list-group-item-action d-flex align-items-center';
+    upButton.innerHTML = `
+        <i class="bi bi-arrow-up-circle-fill me-2"></i>
+        .. Subir nivel
+    `;
+    
+    if (path !== '') { // Si no estamos en el directorio raíz
+        upButton.onclick = (event) => {
+            event.stopPropagation();
+            loadDirectoryContent(parentPath); // Usar parentPath calculado
+        };
+        upButton.style.cursor = 'pointer';
+    } else {
+        upButton.style.opacity = '0.5';
+        upButton.style.cursor = 'not-allowed';
+        upButton.title = 'Ya estás en el directorio raíz';
+    }
+
+    browserContent.appendChild(upButton);
+
+
+    // Crear un div para el contenido principal (items y mensaje de vacío)
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'list-group';
+
+    // Si el directorio está vacío
+    if (currentItems.length === 0) {
+        contentDiv.innerHTML = `
+            <div class="text-muted text-center py-5 empty-state">
+                <i class="bi bi-folder2-open fs-1 mb-3"></i>
+                <p>${path === '' ? 'Este directorio está vacío.' : 'Esta carpeta está vacía.'}</p>
+            </div>
+        `;
+    } else {
+        // Si el directorio no está vacío, mostrar los items
+        currentItems.forEach(item => {
+            if (item.name === '..') return; // Skip the ".." item
+
+            const itemElement = document.createElement('button');
+            itemElement.className = 'list-group-item list-group-item-action d-flex justify-content-between align-items-center';
+            itemElement.dataset.path = item.path; // Para recuperar la selección al volver a pintar la lista
+
+            const iconClass = item.is_dir ? 'bi-folder-fill text-warning' : 'bi-file-earmark-fill text-primary';
+
+            itemElement.innerHTML = `
+                <div class="d-flex align-items-center flex-grow-1 text-start">
+                    <i class="bi ${iconClass} me-2"></i>
+                    ${escapeHTML(item.name)}
+                </div>
+                <small class="text-muted text-nowrap me-3" title="${escapeHTML(formatDate(item.mtime))}">${escapeHTML(formatSize(item.size))}</small>
+                <div class="btn-group btn-group-sm" role="group" onclick="event.stopPropagation()" title="Acciones">
+                    ${item.is_file ?
+                        `<button type="button" class="btn btn-outline-secondary" onclick="setModalPath('appendModal', '${escapeHTML(item.path)}') ; return false;" title="Agregar Contenido">
+                            <i class="bi bi-plus-circle"></i>
+                        </button>` : ''
+                    }
+                    <button type="button" class="btn btn-outline-secondary" onclick="setModalPath('renameModal', '${escapeHTML(item.path)}', '${escapeHTML(item.name)}') ; return false;" title="Renombrar">
+                        <i class="bi bi-pencil"></i>
+                    </button>
+                    <button type="button" class="btn btn-outline-danger" onclick="setModalPath('deleteModal', '${escapeHTML(item.path)}') ; return false;" title="Eliminar">
+                        <i class="bi bi-trash"></i>
+                    </button>
+                </div>
+            `;
+
+            if (item.is_dir) {
+                // Al dejar el ratón sobre una carpeta, la pedimos por adelantado
+                let hoverTimer = null;
+                itemElement.addEventListener('mouseenter', () => {
+                    hoverTimer = setTimeout(() => prefetchDirectory(item.path), HOVER_PREFETCH_DELAY);
+                });
+                itemElement.addEventListener('mouseleave', () => clearTimeout(hoverTimer));
+            }
+
+            itemElement.addEventListener('click', (event) => {
+                if (!event.target.closest('.btn-group')) {
+                    selectItem(item.path, item.is_file, itemElement);
+                    if (item.is_dir) {
+                        loadDirectoryContent(item.path);
+                    }
+                }
+            });
+
+            contentDiv.appendChild(itemElement);
+        });
+    }
+
+    // Agregar el contenido principal al browserContent
+    browserContent.appendChild(contentDiv);
+
+    // Volver a resaltar el elemento seleccionado después de repintar
+    if (selectedItemPath) {
+        const selectedButton = Array.from(contentDiv.children).find(el => el.dataset.path === selectedItemPath);
+        if (selectedButton) {
+            selectedItemElement = selectedButton;
+            selectedButton.classList.add('list-group-item-primary');
+        }
+    }
+}
+
 // Function to preview file content
 async function previewFile(path) {
     try {
-        const response = await fetch(`/api/get-file-content?path=${encodeURIComponent(path)}`);
+        const response = await fetch(`/api/get-file-content?path=${encodeURIComponent(path)}${rootQuery()}`);
         const data = await response.json();
 
         const previewDiv = document.getElementById('file-preview');
@@ -427,7 +743,7 @@ function escapeHTML(str) {
 // Function to update the current content in the append modal preview area
 async function updateAppendModalContent(path) {
     try {
-        const response = await fetch(`/api/get-file-content?path=${encodeURIComponent(path)}`);
+        const response = await fetch(`/api/get-file-content?path=${encodeURIComponent(path)}${rootQuery()}`);
         const data = await response.json();
 
         const previewArea = document.getElementById('appendFileContentPreview');
@@ -487,14 +803,17 @@ function setModalPath(modalId, path, currentName = '') {
 
 // Function to handle file search
 let searchTimeout; // Declared only once at the top level
+// Search session id: lets the server refine the previous results while the user keeps typing ("con" -> "conf")
+const searchSession = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : Math.random().toString(36).slice(2);
 
 async function searchFiles() {
     const searchTerm = document.getElementById('searchInput').value.trim();
     // Get the current path from the displayed element
     const currentPathDisplay = document.getElementById('currentPath').textContent;
-    // Extract the relative path by removing "Estás en: data/" prefix
+    // Extract the relative path by removing "Estás en: data/" (or "<root>/") prefix
     const currentPath = currentPathDisplay.replace('Estás en: ', '').trim(); // Get the full displayed path
-    const relativePath = currentPath.startsWith('data/') ? currentPath.substring(5) : ''; // Get path relative to data/
+    const rootPrefix = currentRootPrefix();
+    const relativePath = currentPath.startsWith(rootPrefix) ? currentPath.substring(rootPrefix.length) : ''; // Get path relative to the root
 
     // Clear previous timeout if user is typing quickly
     if (searchTimeout) { // Referencing the top-level variable
@@ -526,7 +845,7 @@ async function searchFiles() {
     window.searchTimeout = setTimeout(async () => { // Referencing the top-level variable via window
         try {
             // Perform the search API call
-            const response = await fetch(`/api/search?term=${encodeURIComponent(searchTerm)}&path=${encodeURIComponent(formattedPath)}`);
+            const response = await fetch(`/api/search?term=${encodeURIComponent(searchTerm)}&path=${encodeURIComponent(formattedPath)}&session=${encodeURIComponent(searchSession)}${rootQuery()}`);
             const data = await response.json();
 
             if (data.success) {
@@ -551,6 +870,8 @@ async function searchFiles() {
 
 // Function to display search results in the browser content area
 function displaySearchResults(results, searchTerm) {
+    currentDirPath = null; // Mientras se ven resultados, los cambios por SSE no repintan el listado
+    currentListingKey = null;
     const browserContent = document.getElementById('browser-content');
     browserContent.innerHTML = ''; // Clear previous content
 
@@ -659,7 +980,7 @@ document.getElementById('createDirForm').addEventListener('submit', async (e) =>
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ path: formattedPath, name }), // Send formatted path
+            body: JSON.stringify({ path: formattedPath, name, root: currentRoot }), // Send formatted path
         });
         const data = await response.json(); // Parse JSON response
         // console.log('Respuesta de /api/create_dir:', data); // Para verificar
@@ -670,7 +991,7 @@ document.getElementById('createDirForm').addEventListener('submit', async (e) =>
             const modal = bootstrap.Modal.getInstance(document.getElementById('createDirModal'));
             if (modal) modal.hide();
             // Reload the current directory content to show the new folder
-            loadDirectoryContent(formattedPath); // Reload the parent directory
+            refreshAfterChange(formattedPath); // Recargar el directorio padre (si no llega el cambio por SSE)
             // Show success message from the backend
             showAlert('success', data.message);
         } else {
@@ -712,7 +1033,7 @@ document.getElementById('createFileForm').addEventListener('submit', async (e) =
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ path: formattedPath, name, content }), // Send formatted path
+            body: JSON.stringify({ path: formattedPath, name, content, root: currentRoot }), // Send formatted path
         });
         const data = await response.json(); // Parse JSON response
         // console.log('Respuesta de /api/create_file:', data); //Para verificar
@@ -723,7 +1044,7 @@ document.getElementById('createFileForm').addEventListener('submit', async (e) =
             const modal = bootstrap.Modal.getInstance(document.getElementById('createFileModal'));
             if (modal) modal.hide();
             // Reload the current directory content to show the new file
-            loadDirectoryContent(formattedPath); // Reload the parent directory
+            refreshAfterChange(formattedPath); // Recargar el directorio padre (si no llega el cambio por SSE)
             // Show success message from the backend
             showAlert('success', data.message);
         } else {
@@ -764,7 +1085,7 @@ document.getElementById('appendFileForm').addEventListener('submit', async (e) =
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ path: formattedPath, content }), // Send formatted path
+            body: JSON.stringify({ path: formattedPath, content, root: currentRoot }), // Send formatted path
         });
         const data = await response.json(); // Parse JSON response
         // console.log('Respuesta de /api/append_file:', data); // Para verificar
@@ -779,7 +1100,7 @@ document.getElementById('appendFileForm').addEventListener('submit', async (e) =
             const parentPathParts = formattedPath.split('/');
             parentPathParts.pop(); // Remove the file name
             const parentPath = parentPathParts.join('/'); // Get the parent directory path
-            loadDirectoryContent(parentPath); // Reload the parent directory
+            refreshAfterChange(parentPath); // Recargar el directorio padre (si no llega el cambio por SSE)
             // Show success message from the backend
             showAlert('success', data.message);
         } else {
@@ -819,7 +1140,7 @@ document.getElementById('deleteItemForm').addEventListener('submit', async (e) =
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ path: formattedPath }), // Enviar ruta formateada
+            body: JSON.stringify({ path: formattedPath, root: currentRoot }), // Enviar ruta formateada
         });
         const data = await response.json(); // Procesar respuesta JSON
         // console.log('Respuesta de /api/delete:', data); // Para depuración
@@ -833,7 +1154,7 @@ document.getElementById('deleteItemForm').addEventListener('submit', async (e) =
             const parentPathParts = formattedPath.split('/');
             parentPathParts.pop(); // Eliminar el nombre del item
             const parentPath = parentPathParts.join('/'); // Obtener la ruta del directorio padre
-            loadDirectoryContent(parentPath); // Recargar el directorio padre
+            refreshAfterChange(parentPath); // Recargar el directorio padre (si no llega el cambio por SSE)
             // Mostrar mensaje de éxito del backend
             showAlert('success', data.message);
         } else {
@@ -876,7 +1197,8 @@ document.getElementById('renameItemForm').addEventListener('submit', async (e) =
             },
             body: JSON.stringify({
                 oldPath: formattedOldPath, // Enviar ruta antigua formateada
-                newName: newName
+                newName: newName,
+                root: currentRoot // Raíz de datos actual
             }),
         });
         const data = await response.json(); // Procesar respuesta JSON
@@ -891,7 +1213,7 @@ document.getElementById('renameItemForm').addEventListener('submit', async (e) =
             const parentPathParts = formattedOldPath.split('/');
             parentPathParts.pop(); // Eliminar el nombre del item
             const parentPath = parentPathParts.join('/'); // Obtener la ruta del directorio padre
-            loadDirectoryContent(parentPath); // Recargar el directorio padre
+            refreshAfterChange(parentPath); // Recargar el directorio padre (si no llega el cambio por SSE)
             // Mostrar mensaje de éxito del backend
             showAlert('success', data.message);
         } else {
@@ -927,6 +1249,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // Load the initial directory content (root 'data' directory)
     loadDirectoryContent(''); // Load root directory on startup
 
+    // Fill the data root selector (hidden when only 'data' is configured)
+    loadRoots();
+
     // Add handler for the "Recargar" button
     addUpdateButtonHandler();
 
@@ -944,8 +1269,9 @@ document.addEventListener('DOMContentLoaded', () => {
                      currentPath = currentPathDisplayElement.textContent.replace('Estás en: ', '').trim();
                 }
                 // The path to show in the modal for creation should be relative to data/
-                // If currentPath is 'data/', show '/' in the modal input. Otherwise, show the path relative to data/.
-                const pathForModalInput = currentPath === 'data/' ? '/' : currentPath.replace('data/', '');
+                // If currentPath is 'data/' (or '<root>/'), show '/' in the modal input. Otherwise, show the path relative to the root.
+                const rootPrefix = currentRootPrefix();
+                const pathForModalInput = currentPath === rootPrefix ? '/' : currentPath.replace(rootPrefix, '');
 
                 // Set the parent path in the creation modals
                 if (modalId === 'createDirModal') {
@@ -967,7 +1293,7 @@ document.addEventListener('DOMContentLoaded', () => {
                          previewModalFileContent.innerHTML = currentPreviewContent !== null ? escapeHTML(currentPreviewContent) : 'Error al cargar contenido.';
                          previewModalFileName.textContent = selectedItemPath ? selectedItemPath.split('/').pop() : 'Archivo';
                          // Display the path relative to data/ in the preview modal
-                         previewModalFilePath.textContent = selectedItemPath ? `data/${selectedItemPath}` : 'N/A';
+                         previewModalFilePath.textContent = selectedItemPath ? `${currentRootPrefix()}${selectedItemPath}` : 'N/A';
                     } else {
                          console.error("Elementos del modal de previsualización no encontrados.");
                          if (previewModalFileContent) previewModalFileContent.textContent = 'Error interno al preparar la previsualización.';
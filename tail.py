@@ -0,0 +1,223 @@
+# tail.py
+import codecs # Decodificador UTF-8 incremental: un carácter partido entre dos lecturas no se rompe.
+import os # stat, lecturas por offset (pread) y detección de rotaciones (inodo).
+import queue # Cada cliente tiene su propia cola de eventos, acotada.
+import threading # Un solo hilo lector para todos los archivos seguidos.
+import uuid # Cada conexión tiene un id (para los logs y las estadísticas).
+
+# --- Seguimiento en Vivo de Archivos ("tail -f") ---
+# Los operadores siguen archivos de log que crecen (por /api/append_file o por otros procesos).
+# Con /api/tail el navegador recibe por SSE solo los bytes nuevos, en vez de pedir el archivo entero una y otra vez.
+# - Todos los clientes que siguen el MISMO archivo comparten un único lector: los bytes nuevos se leen y se
+#   decodifican una sola vez y se reparten a las colas de todos.
+# - Un hilo de fondo revisa los archivos seguidos con un stat cada TAIL_POLL_INTERVAL (barato: sin abrir ni leer
+#   nada si el tamaño no cambió). Las escrituras hechas por la propia API lo despiertan al instante (wake()).
+# - Si el archivo encoge (truncado) se vuelve a leer desde el principio; si se reemplaza por otro con el mismo
+#   nombre (rotación de logs: cambia el inodo), se sigue el archivo nuevo desde el principio.
+
+TAIL_POLL_INTERVAL = 0.5 # Segundos entre revisiones de los archivos seguidos (cambios externos).
+TAIL_READ_CHUNK = 256 * 1024 # Bytes leídos como máximo por evento.
+TAIL_MAX_BACKLOG = 1024 * 1024 # Bytes como máximo del historial inicial (offset o últimas N líneas).
+TAIL_DEFAULT_LINES = 10 # Líneas iniciales si el cliente no pide 'offset' ni 'lines'.
+TAIL_MAX_LINES = 10000 # 'lines' como máximo.
+MAX_TAIL_SUBSCRIBERS = 200 # Conexiones de seguimiento simultáneas como máximo.
+TAIL_QUEUE_SIZE = 500 # Eventos pendientes por cliente antes de considerarlo atascado.
+
+
+class TailSubscriber:
+    """Una conexión de seguimiento: su cola de eventos."""
+
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.queue = queue.Queue(maxsize=TAIL_QUEUE_SIZE)
+        self.overflowed = False # Si la cola se llenó, el cliente perdió datos y debe reconectar desde su offset.
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+
+class FileFollower:
+    """El lector compartido de un archivo: sabe hasta dónde se leyó y a quién repartir los bytes nuevos."""
+
+    def __init__(self, full_path):
+        self.full_path = full_path
+        self.lock = threading.Lock() # Repartir y suscribirse no se mezclan: ningún cliente pierde ni repite bytes.
+        self.subs = {} # id -> TailSubscriber
+        self.identity = None # (st_dev, st_ino) del archivo que estamos siguiendo.
+        self.offset = 0 # Hasta dónde se repartieron los bytes.
+        self.missing = False
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            st = os.stat(full_path)
+            self.identity = (st.st_dev, st.st_ino)
+            self.offset = st.st_size
+        except OSError:
+            self.missing = True
+
+    def _broadcast(self, event):
+        for sub in list(self.subs.values()):
+            sub.push(event)
+
+    def poll(self):
+        """Reparte lo que haya cambiado desde la última vez. Solo lo llama el hilo lector."""
+        try:
+            st = os.stat(self.full_path)
+        except OSError:
+            if not self.missing:
+                self.missing = True
+                self._broadcast({'event': 'missing', 'offset': self.offset})
+            return
+        identity = (st.st_dev, st.st_ino)
+        if self.missing or identity != self.identity:
+            # Apareció de nuevo o lo reemplazaron (rotación): seguimos el archivo nuevo desde el principio.
+            self.missing = False
+            self.identity = identity
+            self.offset = 0
+            self.decoder.reset()
+            self._broadcast({'event': 'rotate', 'offset': 0})
+        elif st.st_size < self.offset:
+            self.offset = 0
+            self.decoder.reset()
+            self._broadcast({'event': 'truncate', 'offset': 0})
+        if st.st_size == self.offset:
+            return
+        try:
+            fd = os.open(self.full_path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            if (os.fstat(fd).st_dev, os.fstat(fd).st_ino) != self.identity:
+                return # Lo rotaron entre el stat y el open: lo veremos en la próxima vuelta.
+            while True:
+                data = os.pread(fd, TAIL_READ_CHUNK, self.offset)
+                if not data:
+                    break
+                start = self.offset
+                self.offset += len(data)
+                text = self.decoder.decode(data)
+                self._broadcast({'event': 'data', 'offset': start, 'end': self.offset, 'text': text})
+                if len(data) < TAIL_READ_CHUNK:
+                    break
+        finally:
+            os.close(fd)
+
+
+class TailHub:
+    """Registro de archivos seguidos (uno por ruta) y el hilo que los lee."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._followers = {} # ruta absoluta -> FileFollower
+        self._count = 0
+        self._reader = None
+        self._wakeup = threading.Event()
+
+    def subscribe(self, full_path):
+        """
+        Empieza a seguir 'full_path'. Devuelve (suscriptor, offset) o (None, None) si hay demasiadas conexiones.
+        'offset' es hasta dónde se repartió el archivo: lo anterior lo lee el propio cliente (historial inicial).
+        """
+        with self._lock:
+            if self._count >= MAX_TAIL_SUBSCRIBERS:
+                return None, None
+            follower = self._followers.get(full_path)
+            if follower is None:
+                follower = self._followers[full_path] = FileFollower(full_path)
+            sub = TailSubscriber(full_path)
+            with follower.lock:
+                follower.subs[sub.id] = sub
+                offset = follower.offset
+            self._count += 1
+        self._ensure_reader()
+        return sub, offset
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            follower = self._followers.get(sub.key)
+            if follower is None:
+                return
+            with follower.lock:
+                removed = follower.subs.pop(sub.id, None)
+            if removed is not None:
+                self._count -= 1
+                if not follower.subs:
+                    del self._followers[sub.key]
+
+    def wake(self, full_path):
+        """Avisa de que 'full_path' cambió (escrituras de la API): el lector lo revisa ya, sin esperar al sondeo."""
+        if full_path in self._followers:
+            self._wakeup.set()
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._followers), 'subscribers': self._count}
+
+    def _ensure_reader(self):
+        with self._lock:
+            if self._reader is not None and self._reader.is_alive():
+                return
+            self._reader = threading.Thread(target=self._read_loop, name='tail-reader', daemon=True)
+            self._reader.start()
+
+    def _read_loop(self):
+        while True:
+            self._wakeup.wait(TAIL_POLL_INTERVAL)
+            self._wakeup.clear()
+            # La lista de seguidores se toma bajo el lock global; cada archivo se lee con su propio lock,
+            # el mismo que toma un suscriptor nuevo: su offset nunca cae a mitad de un reparto.
+            with self._lock:
+                if not self._followers:
+                    self._reader = None
+                    return # Sin nadie siguiendo archivos no hace falta el hilo; se recrea cuando haga falta.
+                followers = list(self._followers.values())
+            for follower in followers:
+                try:
+                    with follower.lock:
+                        follower.poll()
+                except Exception as e:
+                    print(f"tail.py: Error leyendo '{follower.full_path}': {e}")
+
+
+def read_backlog(full_path, end_offset, start_offset=None, lines=None):
+    """
+    Lee el historial inicial de un cliente: desde 'start_offset' o las últimas 'lines' líneas, hasta 'end_offset'.
+    Devuelve (offset_de_inicio, texto). Nunca lee más de TAIL_MAX_BACKLOG bytes.
+    """
+    lower_bound = max(0, end_offset - TAIL_MAX_BACKLOG)
+    with open(full_path, 'rb') as f:
+        if start_offset is not None:
+            start = min(max(start_offset, lower_bound), end_offset)
+        else:
+            # Buscamos hacia atrás por bloques hasta juntar 'lines' saltos de línea.
+            start = end_offset
+            newlines = 0
+            # Un salto de línea final no cuenta: la última línea completa es la que termina ahí.
+            if end_offset > 0:
+                f.seek(end_offset - 1)
+                if f.read(1) == b'\n':
+                    newlines = -1
+            while start > lower_bound and newlines < lines:
+                block_start = max(lower_bound, start - 64 * 1024)
+                f.seek(block_start)
+                block = f.read(start - block_start)
+                index = len(block)
+                while newlines < lines:
+                    index = block.rfind(b'\n', 0, index)
+                    if index < 0:
+                        break
+                    newlines += 1
+                if newlines >= lines:
+                    start = block_start + index + 1
+                    break
+                start = block_start
+        f.seek(start)
+        data = f.read(end_offset - start)
+    return start, data.decode('utf-8', errors='replace')
+
+
+# Instancia única usada por toda la aplicación.
+tails = TailHub()
@@ -0,0 +1,28 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+# Los módulos del proyecto están en la raíz del repositorio (junto a app.py), no en un paquete instalado.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils # noqa: E402
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """Raíz 'data' en una carpeta temporal (sin importar app.py, que usaría la carpeta 'data' del proyecto)."""
+    monkeypatch.delenv('FILES_MANAGER_ROOTS_FILE', raising=False)
+    utils.initialize_paths(str(tmp_path))
+    return utils.get_root()
+
+
+@pytest.fixture
+def client(data_root):
+    """Cliente de pruebas con el Blueprint de /api/browse registrado sobre la raíz temporal."""
+    from api.browse import browse_bp
+    app = Flask(__name__)
+    app.register_blueprint(browse_bp)
+    return app.test_client()
@@ -0,0 +1,145 @@
+# tests/test_archives.py
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+
+import pytest
+
+import archives
+from archives import ArchiveError, get_index, locate
+
+
+@pytest.fixture
+def zip_path(data_root):
+    path = os.path.join(data_root.path, 'fotos.zip')
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('docs/readme.txt', 'hola')
+        zf.writestr('docs/sub/x.txt', 'x' * 10)
+        zf.writestr('top.txt', 't')
+    return path
+
+
+@pytest.fixture
+def tar_path(data_root):
+    path = os.path.join(data_root.path, 'copia.tar.gz')
+    with tarfile.open(path, 'w:gz') as tf:
+        data = b'contenido'
+        info = tarfile.TarInfo('dir/file.txt')
+        info.size = len(data)
+        tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('dir/enlace')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'file.txt'
+        tf.addfile(link)
+    return path
+
+
+def test_zip_index_creates_implicit_folders(zip_path):
+    index = get_index(zip_path)
+    assert sorted(m.name for m in index.list_dir('')) == ['docs', 'top.txt']
+    docs = index.member('docs', zip_path + '/docs')
+    assert docs.is_dir() and docs.child_count == 2
+    readme = index.member('docs/readme.txt', zip_path + '/docs/readme.txt')
+    assert readme.is_file() and readme.stat().st_size == 4
+    with index.open('docs/readme.txt') as reader:
+        assert reader.read() == b'hola'
+
+
+def test_tar_index_keeps_link_targets(tar_path):
+    index = get_index(tar_path)
+    link = index.member('dir/enlace', tar_path + '/dir/enlace')
+    assert link.is_symlink() and link.link_target == 'file.txt'
+    assert index.member('dir', tar_path + '/dir').child_count == 2
+
+
+def test_index_is_cached_until_the_archive_changes(zip_path):
+    index = get_index(zip_path)
+    assert get_index(zip_path) is index
+    with zipfile.ZipFile(zip_path, 'a') as zf:
+        zf.writestr('nuevo.txt', 'n')
+    assert 'nuevo.txt' in get_index(zip_path).entries
+
+
+
+def test_index_is_never_built_twice_at_the_same_time(zip_path, monkeypatch):
+    # La primera construcción falla mientras otra petición espera: quien llegue después debe esperar al mismo lock.
+    build = archives.ArchiveIndex.build
+    first_started, release_first, second_started, release_second = (threading.Event() for _ in range(4))
+    calls = []
+    running = [0] # Construcciones en curso.
+
+    def slow_build(self):
+        calls.append(self)
+        running[0] += 1
+        try:
+            if len(calls) == 1:
+                first_started.set()
+                release_first.wait(5)
+                raise ArchiveError('fallo')
+            second_started.set()
+            release_second.wait(0.3)
+            return build(self)
+        finally:
+            running[0] -= 1
+
+    monkeypatch.setattr(archives.ArchiveIndex, 'build', slow_build)
+    results = []
+
+    def request():
+        try:
+            results.append(get_index(zip_path))
+        except ArchiveError:
+            results.append(None)
+
+    threads = [threading.Thread(target=request)]
+    threads[0].start()
+    first_started.wait(5)
+    threads.append(threading.Thread(target=request))
+    threads[1].start()
+    time.sleep(0.05) # La segunda petición queda esperando al lock.
+    release_first.set()
+    second_started.wait(5)
+    threads.append(threading.Thread(target=request))
+    threads[2].start()
+    time.sleep(0.05)
+    concurrent = running[0]
+    release_second.set()
+    for thread in threads:
+        thread.join(5)
+    assert concurrent == 1
+    assert len(calls) == 2
+    assert results[0] is None and results[1] is results[2] is not None
+
+def test_locate_finds_paths_inside_archives(data_root, zip_path):
+    assert locate(data_root.path, zip_path + os.sep + 'docs' + os.sep + 'readme.txt') == (zip_path, 'docs/readme.txt')
+    assert locate(data_root.path, zip_path) == (zip_path, '')
+    assert locate(data_root.path, os.path.join(data_root.path, 'no', 'existe')) is None
+
+
+def test_corrupt_archive_raises_archive_error(data_root):
+    path = os.path.join(data_root.path, 'roto.zip')
+    with open(path, 'wb') as f:
+        f.write(b'esto no es un zip')
+    with pytest.raises(ArchiveError):
+        get_index(path)
+
+
+def test_browse_inside_a_zip(client, zip_path):
+    data = client.get('/api/browse?path=fotos.zip').get_json()
+    assert data['success'] and data['archive'] == {'kind': 'zip', 'path': 'fotos.zip'}
+    assert [(i['name'], i['path'], i['is_dir']) for i in data['items']] == [
+        ('docs', 'fotos.zip/docs', True), ('top.txt', 'fotos.zip/top.txt', False)]
+
+    data = client.get('/api/browse?path=fotos.zip/docs&fields=name,size,child_count').get_json()
+    assert data['items'] == [{'name': 'sub', 'size': None, 'child_count': 1},
+                             {'name': 'readme.txt', 'size': 4, 'child_count': None}]
+
+    assert client.get('/api/browse?path=fotos.zip/nada').get_json()['success'] is False
+
+
+def test_browse_link_target_inside_a_tar(client, tar_path):
+    data = client.get('/api/browse?path=copia.tar.gz/dir&fields=name,link_target').get_json()
+    assert {'name': 'enlace', 'link_target': 'file.txt'} in data['items']
@@ -0,0 +1,32 @@
+# tests/test_browse.py
+import os
+
+import api.browse
+
+
+def test_browse_returns_only_the_requested_fields(client, data_root):
+    os.mkdir(os.path.join(data_root.path, 'carpeta'))
+    with open(os.path.join(data_root.path, 'a.txt'), 'wb') as f:
+        f.write(b'hola')
+    data = client.get('/api/browse?fields=name,size').get_json()
+    assert data['success'] is True
+    items = {item['name']: item for item in data['items']}
+    assert items['a.txt'] == {'name': 'a.txt', 'size': 4}
+    assert items['carpeta'] == {'name': 'carpeta', 'size': None}
+
+
+def test_unreadable_link_target_does_not_break_the_listing(client, data_root, monkeypatch):
+    os.symlink('a.txt', os.path.join(data_root.path, 'bueno'))
+    os.symlink('a.txt', os.path.join(data_root.path, 'roto'))
+    readlink = os.readlink
+
+    def failing_readlink(path, *args, **kwargs):
+        if os.path.basename(path) == 'roto':
+            raise FileNotFoundError(path) # Borrado entre el listado y el readlink.
+        return readlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(api.browse.os, 'readlink', failing_readlink)
+    data = client.get('/api/browse?fields=name,link_target').get_json()
+    assert data['success'] is True
+    targets = {item['name']: item['link_target'] for item in data['items']}
+    assert targets == {'bueno': 'a.txt', 'roto': None}
@@ -0,0 +1,51 @@
+# tests/test_durable.py
+import os
+import stat
+
+import pytest
+
+from durable import NEW_FILE_MODE, TEMP_PREFIX, atomic_write
+
+
+def _temps(directory):
+    return [name for name in os.listdir(directory) if name.startswith(TEMP_PREFIX)]
+
+
+def test_exclusive_write_creates_the_file(tmp_path):
+    path = tmp_path / 'nuevo.txt'
+    with atomic_write(str(path), 'w', encoding='utf-8', exclusive=True) as f:
+        f.write('hola')
+    assert path.read_text(encoding='utf-8') == 'hola'
+    assert stat.S_IMODE(os.stat(path).st_mode) == NEW_FILE_MODE
+    assert _temps(tmp_path) == []
+
+
+def test_exclusive_write_never_overwrites(tmp_path):
+    path = tmp_path / 'existe.txt'
+    path.write_text('original', encoding='utf-8')
+    with pytest.raises(FileExistsError):
+        with atomic_write(str(path), 'w', encoding='utf-8', exclusive=True) as f:
+            f.write('pisado')
+    assert path.read_text(encoding='utf-8') == 'original'
+    assert _temps(tmp_path) == []
+
+
+def test_replace_keeps_permissions(tmp_path):
+    path = tmp_path / 'script.sh'
+    path.write_text('viejo', encoding='utf-8')
+    os.chmod(path, 0o750)
+    with atomic_write(str(path), 'w', encoding='utf-8') as f:
+        f.write('nuevo')
+    assert path.read_text(encoding='utf-8') == 'nuevo'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o750
+
+
+def test_failed_write_leaves_the_original(tmp_path):
+    path = tmp_path / 'datos.txt'
+    path.write_text('original', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path), 'w', encoding='utf-8') as f:
+            f.write('a medias')
+            raise RuntimeError('fallo a mitad')
+    assert path.read_text(encoding='utf-8') == 'original'
+    assert _temps(tmp_path) == []
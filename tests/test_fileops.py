@@ -0,0 +1,83 @@
+# tests/test_fileops.py
+import os
+
+import pytest
+
+import fileops
+from fileops import copy_item, move_item, rename_exclusive
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _make_tree(base):
+    os.makedirs(base / 'sub' / 'deep')
+    for i in range(20):
+        _write(base / 'sub' / f'f{i}.txt', b'x' * 100)
+    _write(base / 'sub' / 'deep' / 'z.txt', b'z')
+
+
+def test_copy_item_copies_a_tree(tmp_path):
+    src = tmp_path / 'src'
+    _make_tree(src)
+    copy_item(str(src), str(tmp_path / 'dst'))
+    assert sorted(os.listdir(tmp_path / 'dst' / 'sub')) == sorted(os.listdir(src / 'sub'))
+    assert _read(tmp_path / 'dst' / 'sub' / 'deep' / 'z.txt') == b'z'
+
+
+def test_failed_tree_copy_leaves_nothing_behind(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    _make_tree(src)
+    copy_file_data = fileops.copy_file_data
+
+    def failing_copy(src_path, dst_path, progress=None):
+        if src_path.endswith('f7.txt'):
+            raise OSError(5, 'Error de E/S simulado')
+        return copy_file_data(src_path, dst_path, progress)
+
+    monkeypatch.setattr(fileops, 'copy_file_data', failing_copy)
+    with pytest.raises(OSError):
+        copy_item(str(src), str(tmp_path / 'dst'))
+    assert not os.path.exists(tmp_path / 'dst')
+    # Un movimiento entre sistemas de archivos que falla deja el origen intacto.
+    monkeypatch.setattr(fileops, 'same_filesystem', lambda a, b: False)
+    with pytest.raises(OSError):
+        move_item(str(src), str(tmp_path / 'moved'))
+    assert not os.path.exists(tmp_path / 'moved')
+    assert len(os.listdir(src / 'sub')) == 21
+
+
+def test_copy_into_an_existing_destination_does_not_touch_it(tmp_path):
+    src = tmp_path / 'src'
+    _make_tree(src)
+    os.makedirs(tmp_path / 'dst')
+    _write(tmp_path / 'dst' / 'keep.txt', b'mio')
+    with pytest.raises(FileExistsError):
+        copy_item(str(src), str(tmp_path / 'dst'))
+    assert os.listdir(tmp_path / 'dst') == ['keep.txt']
+
+
+@pytest.mark.parametrize('renameat2', [True, False])
+def test_move_never_replaces_the_destination(tmp_path, monkeypatch, renameat2):
+    if not renameat2:
+        monkeypatch.setattr(fileops, '_renameat2', None) # Sistemas sin renameat2: enlace duro o carpeta reservada.
+    _write(tmp_path / 'a.txt', b'origen')
+    _write(tmp_path / 'b.txt', b'destino')
+    os.makedirs(tmp_path / 'dir_a')
+    os.makedirs(tmp_path / 'dir_b')
+    with pytest.raises(FileExistsError):
+        move_item(str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'))
+    with pytest.raises(FileExistsError):
+        move_item(str(tmp_path / 'dir_a'), str(tmp_path / 'dir_b')) # Aunque el destino sea una carpeta vacía.
+    assert _read(tmp_path / 'b.txt') == b'destino'
+    assert move_item(str(tmp_path / 'a.txt'), str(tmp_path / 'c.txt')) == 'rename'
+    rename_exclusive(str(tmp_path / 'dir_a'), str(tmp_path / 'dir_c'))
+    assert sorted(os.listdir(tmp_path)) == ['b.txt', 'c.txt', 'dir_b', 'dir_c']
+    assert _read(tmp_path / 'c.txt') == b'origen'
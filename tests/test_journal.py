@@ -0,0 +1,54 @@
+# tests/test_journal.py
+import json
+
+import pytest
+
+import journal as journal_module
+from journal import Journal
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, 'JOURNAL_SEGMENT_BYTES', 2048) # Varios segmentos con pocos registros.
+    j = Journal()
+    j.open(str(tmp_path / 'journal'))
+    for i in range(300):
+        j.append('write', 'data', f'docs/archivo-{i}.txt')
+    return j
+
+
+def _read_all(journal, limit):
+    seqs, seq = [], 0
+    while True:
+        batch = journal.read_after(seq, limit=limit)
+        if not batch:
+            return seqs
+        seqs.extend(record['seq'] for record in batch)
+        seq = batch[-1]['seq']
+
+
+def test_read_after_returns_every_record_in_order(journal):
+    assert len(journal._segments) > 5
+    assert _read_all(journal, limit=7) == list(range(1, 301))
+    assert [r['seq'] for r in journal.read_after(150, limit=3)] == [151, 152, 153]
+
+
+def test_batches_continue_from_the_previous_position(journal, monkeypatch):
+    parsed = []
+    loads = json.loads
+
+    def counting_loads(line):
+        parsed.append(line)
+        return loads(line)
+
+    monkeypatch.setattr(journal_module.json, 'loads', counting_loads)
+    _read_all(journal, limit=10)
+    # Cada registro se analiza una sola vez (sin releer el segmento desde el principio en cada lote).
+    assert len(parsed) == 300
+
+
+def test_reopened_journal_keeps_its_head(journal, tmp_path):
+    reopened = Journal()
+    reopened.open(journal.directory)
+    assert reopened.head == 300
+    assert reopened.append('delete', 'data', 'docs/x.txt') == 301
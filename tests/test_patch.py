@@ -0,0 +1,83 @@
+# tests/test_patch.py
+import hashlib
+import os
+
+import pytest
+from flask import Flask
+
+import fileops
+from fileops import DeltaConflict, apply_delta, edits_to_delta
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_edits_round_trip(tmp_path):
+    path = tmp_path / 'file.txt'
+    _write(path, b'hola mundo cruel')
+    ops = edits_to_delta([{'offset': 0, 'length': 4, 'data': 'adios'}, {'offset': 11, 'length': 5}], 16)
+    result = apply_delta(str(path), ops)
+    assert _read(path) == b'adios mundo '
+    assert result == {'size': 12, 'copied_bytes': 7, 'literal_bytes': 5}
+
+
+@pytest.mark.parametrize('edits', [[1], ['texto'], [{'offset': 0, 'length': 1}, None]])
+def test_edits_must_be_objects(edits):
+    with pytest.raises(ValueError):
+        edits_to_delta(edits, 10)
+
+
+def test_patch_file_rejects_edits_that_are_not_objects(data_root):
+    from api.modification import modification_bp
+    app = Flask(__name__)
+    app.register_blueprint(modification_bp)
+    _write(os.path.join(data_root.path, 'a.txt'), b'abc')
+    response = app.test_client().post('/api/patch_file', json={'path': 'a.txt', 'edits': [1]})
+    assert response.status_code == 200
+    assert response.get_json()['success'] is False
+    assert _read(os.path.join(data_root.path, 'a.txt')) == b'abc'
+
+
+def test_apply_delta_checks_base_on_the_same_file(tmp_path):
+    path = tmp_path / 'file.txt'
+    _write(path, b'contenido')
+    ops = [{'copy': [0, 9]}, {'data': '!'}]
+    with pytest.raises(DeltaConflict):
+        apply_delta(str(path), ops, base_size=3)
+    with pytest.raises(DeltaConflict):
+        apply_delta(str(path), ops, base_sha256=hashlib.sha256(b'otro').hexdigest())
+    apply_delta(str(path), ops, base_size=9, base_sha256=hashlib.sha256(b'contenido').hexdigest())
+    assert _read(path) == b'contenido!'
+
+
+def test_apply_delta_refuses_to_overwrite_a_concurrent_write(tmp_path, monkeypatch):
+    path = tmp_path / 'log.txt'
+    _write(path, b'linea 1\n')
+    copy_range = fileops.copy_range
+
+    def copy_and_append(*args, **kwargs):
+        copied = copy_range(*args, **kwargs)
+        with open(path, 'ab') as f:
+            f.write(b'linea 2\n') # Alguien añade mientras se aplica el parche.
+        return copied
+
+    monkeypatch.setattr(fileops, 'copy_range', copy_and_append)
+    with pytest.raises(DeltaConflict):
+        apply_delta(str(path), [{'copy': [0, 8]}, {'data': 'parche\n'}])
+    assert _read(path) == b'linea 1\nlinea 2\n'
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.patch')] == []
+
+
+def test_apply_delta_rejects_out_of_range_copy(tmp_path):
+    path = tmp_path / 'file.txt'
+    _write(path, b'abc')
+    with pytest.raises(ValueError):
+        apply_delta(str(path), [{'copy': [2, 5]}])
+    assert _read(path) == b'abc'
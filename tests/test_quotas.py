@@ -0,0 +1,94 @@
+# tests/test_quotas.py
+import os
+
+import pytest
+
+from quotas import Measurement, Quota, QuotaExceeded, QuotaManager, measure_tree
+
+
+@pytest.fixture
+def manager(data_root):
+    """Gestor con una cuota de 1000 bytes y 5 elementos sobre 'data/usuario' (sin hilo de fondo)."""
+    os.makedirs(os.path.join(data_root.path, 'usuario'))
+    manager = QuotaManager()
+    quota = Quota(data_root.name, 'usuario', max_bytes=1000, max_files=5)
+    manager._quotas = {(quota.root_name, quota.rel_path): quota}
+    return manager
+
+
+def _path(data_root, *parts):
+    return os.path.join(data_root.path, 'usuario', *parts)
+
+
+def _usage(manager):
+    quota = manager.list()[0]
+    return quota['used_bytes'], quota['used_files']
+
+
+def test_charge_and_release(manager, data_root):
+    manager.charge(data_root, _path(data_root, 'a.txt'), 400, 1)
+    manager.charge(data_root, _path(data_root, 'b.txt'), 500, 1)
+    assert _usage(manager) == (900, 2)
+    manager.release(data_root, _path(data_root, 'a.txt'), 400, 1)
+    assert _usage(manager) == (500, 1)
+
+
+def test_paths_outside_the_quota_are_free(manager, data_root):
+    outside = os.path.join(data_root.path, 'otro', 'grande.bin')
+    assert manager.quotas_for(data_root, outside) == []
+    manager.charge(data_root, outside, 10 ** 9, 1)
+    assert _usage(manager) == (0, 0)
+
+
+def test_exceeding_a_quota_changes_nothing(manager, data_root):
+    manager.charge(data_root, _path(data_root, 'a.txt'), 900, 1)
+    with pytest.raises(QuotaExceeded) as error:
+        manager.charge(data_root, _path(data_root, 'b.txt'), 200, 1)
+    assert error.value.quota.key == 'data/usuario'
+    assert _usage(manager) == (900, 1)
+
+
+def test_reserve_is_undone_if_the_write_fails(manager, data_root):
+    with pytest.raises(OSError):
+        with manager.reserve(data_root, _path(data_root, 'a.txt'), 300, 1):
+            raise OSError('disco lleno')
+    assert _usage(manager) == (0, 0)
+    with manager.reserve(data_root, _path(data_root, 'a.txt'), 300, 1):
+        pass
+    assert _usage(manager) == (300, 1)
+
+
+def test_reconcile_measures_the_disk(manager, data_root):
+    os.makedirs(_path(data_root, 'sub'))
+    with open(_path(data_root, 'sub', 'x.bin'), 'wb') as f:
+        f.write(b'x' * 123)
+    manager.charge(data_root, _path(data_root, 'fantasma.txt'), 999, 0) # Uso que ya no existe en disco.
+    manager.reconcile()
+    assert _usage(manager) == (123, 3) == measure_tree(_path(data_root))
+
+
+def test_writes_during_reconcile_are_counted_once(manager, data_root, monkeypatch):
+    for name in ('a', 'b'):
+        os.makedirs(_path(data_root, name))
+        with open(_path(data_root, name, 'f.bin'), 'wb') as f:
+            f.write(b'x' * 10)
+    measured = Measurement.measured
+    state = {'written': False}
+
+    def write_halfway(self, item):
+        # Cuando el recorrido termina una carpeta, se escribe en ella (ya no lo verá) y en la otra (sí lo verá).
+        measured(self, item)
+        if state['written'] or item.dirpath not in self.passed or item.dirpath == _path(data_root):
+            return
+        state['written'] = True
+        other = _path(data_root, 'b' if item.dirpath.endswith('a') else 'a')
+        for directory, size in ((item.dirpath, 100), (other, 7)):
+            path = os.path.join(directory, 'nuevo.bin')
+            manager.charge(data_root, path, size, 1)
+            with open(path, 'wb') as f:
+                f.write(b'y' * size)
+
+    monkeypatch.setattr(Measurement, 'measured', write_halfway)
+    manager.reconcile()
+    assert state['written']
+    assert _usage(manager) == measure_tree(_path(data_root)) == (127, 7)
@@ -0,0 +1,69 @@
+# tests/test_replace.py
+import os
+
+from replace import commit_rewrite, compile_check, process_file
+
+
+def _run(path, find, replacement, is_regex=False, ignore_case=False, dry_run=False):
+    result = process_file(str(path), find.encode('utf-8'), replacement.encode('utf-8'), is_regex, ignore_case, dry_run)
+    if result['status'] == 'rewritten':
+        assert commit_rewrite(result) is None
+    return result
+
+
+def test_literal_replace(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'uno dos uno tres uno')
+    result = _run(path, 'uno', '1')
+    assert result['status'] == 'rewritten' and result['count'] == 3
+    assert path.read_bytes() == b'1 dos 1 tres 1'
+
+
+def test_literal_replacement_is_written_verbatim(tmp_path):
+    # Sin expresión regular, '\1' o 'C:\datos' no son plantillas, aunque se ignoren mayúsculas.
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'Ruta: RAIZ y raiz')
+    result = _run(path, 'raiz', r'C:\datos\1', ignore_case=True)
+    assert result['count'] == 2
+    assert path.read_bytes() == rb'Ruta: C:\datos\1 y C:\datos\1'
+
+
+def test_regex_replace_with_groups(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'fecha 2024-05-01\nfecha 2023-12-31\n')
+    result = _run(path, r'(\d{4})-(\d{2})-(\d{2})', r'\3/\2/\1', is_regex=True)
+    assert result['count'] == 2
+    assert path.read_bytes() == b'fecha 01/05/2024\nfecha 31/12/2023\n'
+
+
+def test_dry_run_counts_without_writing(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'x x x')
+    result = _run(path, 'x', 'y', dry_run=True)
+    assert result['status'] == 'match' and result['count'] == 3
+    assert path.read_bytes() == b'x x x'
+
+
+def test_no_match_and_binary_files_are_left_alone(tmp_path):
+    text = tmp_path / 'a.txt'
+    text.write_bytes(b'nada que ver')
+    binary = tmp_path / 'b.bin'
+    binary.write_bytes(b'abc\0abc')
+    assert _run(text, 'zzz', 'y')['status'] == 'nomatch'
+    assert _run(binary, 'abc', 'y')['status'] == 'binary'
+    assert binary.read_bytes() == b'abc\0abc'
+
+
+def test_commit_is_skipped_if_the_file_changed(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'viejo')
+    result = process_file(str(path), b'viejo', b'nuevo', False, False, False)
+    path.write_bytes(b'viejo y cambiado')
+    assert commit_rewrite(result) is not None
+    assert path.read_bytes() == b'viejo y cambiado'
+    assert os.listdir(tmp_path) == ['a.txt'] # El temporal se descartó.
+
+
+def test_compile_check_reports_invalid_regex():
+    assert compile_check('(sin cerrar', True) is not None
+    assert compile_check('(sin cerrar', False) is None
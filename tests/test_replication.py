@@ -0,0 +1,50 @@
+# tests/test_replication.py
+import os
+
+import pytest
+
+from replication import LocalReplica, Replicator
+
+
+@pytest.fixture
+def replicator(data_root, tmp_path):
+    replica_dir = tmp_path / 'replica'
+    os.makedirs(replica_dir)
+    return Replicator('prueba', data_root.name, LocalReplica(str(replica_dir)), str(tmp_path / 'checkpoint.json'))
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _replica(replicator, name):
+    return os.path.join(replicator.replica.path, name)
+
+
+def test_rename_moves_the_file_in_the_replica(replicator, data_root):
+    _write(os.path.join(data_root.path, 'b.txt'), 'contenido')
+    _write(_replica(replicator, 'a.txt'), 'contenido')
+    record = {'root': data_root.name, 'op': 'rename', 'path': 'a.txt', 'to': 'b.txt'}
+    replicator.apply(record)
+    assert sorted(os.listdir(replicator.replica.path)) == ['b.txt']
+    # Re-aplicar el mismo registro (ej: tras una caída antes del punto de control) no cambia nada.
+    replicator.apply(record)
+    assert sorted(os.listdir(replicator.replica.path)) == ['b.txt']
+    assert _read(_replica(replicator, 'b.txt')) == 'contenido'
+
+
+def test_replayed_rename_does_not_clobber_the_target(replicator, data_root):
+    # El original ya movió 'a.txt' a 'b.txt' y después creó otro 'a.txt'; la réplica ya estaba al día.
+    _write(os.path.join(data_root.path, 'a.txt'), 'a nuevo')
+    _write(os.path.join(data_root.path, 'b.txt'), 'movido')
+    _write(_replica(replicator, 'a.txt'), 'a nuevo')
+    _write(_replica(replicator, 'b.txt'), 'movido')
+    replicator.apply({'root': data_root.name, 'op': 'rename', 'path': 'a.txt', 'to': 'b.txt'})
+    assert _read(_replica(replicator, 'a.txt')) == 'a nuevo'
+    assert _read(_replica(replicator, 'b.txt')) == 'movido'
@@ -0,0 +1,60 @@
+# tests/test_rolling_delta.py
+import os
+
+import pytest
+
+from fileops import apply_delta, file_signature, rolling_delta
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _sync(tmp_path, old, new, block_size=1024):
+    """Aplica sobre una copia de 'old' el delta rodante que la convierte en 'new'. Devuelve (resultado, ops)."""
+    target = tmp_path / 'target.bin'
+    source = tmp_path / 'source.bin'
+    _write(target, old)
+    _write(source, new)
+    ops = rolling_delta(str(source), file_signature(str(target), block_size=block_size))
+    apply_delta(str(target), ops)
+    with open(target, 'rb') as f:
+        return f.read(), ops
+
+
+def _literal_bytes(ops):
+    return sum(len(op['data_b64']) * 3 // 4 for op in ops if 'data_b64' in op)
+
+
+@pytest.mark.parametrize('change', ['same', 'insert', 'delete', 'append', 'different', 'empty_target', 'empty_source'])
+def test_rolling_delta_round_trip(tmp_path, change):
+    old = os.urandom(64 * 1024 + 123)
+    new = {
+        'same': old,
+        'insert': old[:10000] + b'abc' + old[10000:],
+        'delete': old[:5000] + old[9000:],
+        'append': old + b'cola nueva',
+        'different': os.urandom(len(old)),
+        'empty_target': old,
+        'empty_source': b'',
+    }[change]
+    if change == 'empty_target':
+        old = b''
+    result, ops = _sync(tmp_path, old, new)
+    assert result == new
+
+
+def test_rolling_delta_sends_only_what_changed(tmp_path):
+    old = os.urandom(256 * 1024)
+    new = old[:100000] + b'xyz' + old[100000:]
+    result, ops = _sync(tmp_path, old, new)
+    assert result == new
+    # Solo viajan los bloques que tocan el cambio, no el archivo entero.
+    assert _literal_bytes(ops) <= 3 * 1024
+
+
+def test_unchanged_file_is_a_single_copy(tmp_path):
+    data = os.urandom(10 * 1024)
+    result, ops = _sync(tmp_path, data, data)
+    assert ops == [{'copy': [0, len(data)]}]
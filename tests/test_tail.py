@@ -0,0 +1,78 @@
+# tests/test_tail.py
+import os
+
+from tail import FileFollower, TailSubscriber, read_backlog
+
+
+def _follow(path):
+    follower = FileFollower(str(path))
+    sub = TailSubscriber(str(path))
+    follower.subs[sub.id] = sub
+    return follower, sub
+
+
+def _events(sub):
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait())
+    return events
+
+
+def test_appended_data_is_delivered_from_the_current_end(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'antiguo\n')
+    follower, sub = _follow(path)
+    with open(path, 'ab') as f:
+        f.write(b'nuevo\n')
+    follower.poll()
+    assert _events(sub) == [{'event': 'data', 'offset': 8, 'end': 14, 'text': 'nuevo\n'}]
+    follower.poll()
+    assert _events(sub) == []
+
+
+def test_truncate_restarts_from_the_beginning(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'muchas lineas\n' * 10)
+    follower, sub = _follow(path)
+    path.write_bytes(b'corto\n') # Truncado y reescrito en el mismo archivo (mismo inodo).
+    follower.poll()
+    events = _events(sub)
+    assert events[0] == {'event': 'truncate', 'offset': 0}
+    assert events[1]['text'] == 'corto\n' and events[1]['offset'] == 0
+
+
+def test_rotate_follows_the_new_file(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'viejo\n')
+    follower, sub = _follow(path)
+    os.rename(path, tmp_path / 'app.log.1')
+    follower.poll()
+    assert _events(sub) == [{'event': 'missing', 'offset': 6}]
+    path.write_bytes(b'archivo nuevo\n')
+    follower.poll()
+    events = _events(sub)
+    assert events[0] == {'event': 'rotate', 'offset': 0}
+    assert events[1]['text'] == 'archivo nuevo\n'
+
+
+def test_multibyte_characters_split_between_reads(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b'')
+    follower, sub = _follow(path)
+    data = 'año\n'.encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(data[:2]) # Corta la 'ñ' por la mitad.
+    follower.poll()
+    with open(path, 'ab') as f:
+        f.write(data[2:])
+    follower.poll()
+    assert ''.join(event['text'] for event in _events(sub)) == 'año\n'
+
+
+def test_read_backlog_returns_the_last_lines(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_bytes(b''.join(f'linea {i}\n'.encode() for i in range(100)))
+    size = os.path.getsize(path)
+    start, text = read_backlog(str(path), size, lines=3)
+    assert text == 'linea 97\nlinea 98\nlinea 99\n'
+    assert start == size - len(text)
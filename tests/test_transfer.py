@@ -0,0 +1,54 @@
+# tests/test_transfer.py
+import os
+
+import pytest
+
+from api import transfer
+
+
+class _Job:
+    def __init__(self):
+        self.finished = None
+
+    def add_total(self, **kwargs):
+        pass
+
+    def advance(self, **kwargs):
+        pass
+
+    def finish(self, message, result=None):
+        self.finished = result
+
+
+@pytest.fixture
+def journal(monkeypatch):
+    """Registros que el movimiento anota en el diario de réplicas (sin diario real)."""
+    records = []
+    monkeypatch.setattr(transfer, 'record_mutation', lambda op, root, path, **kw: records.append((op, path)))
+    monkeypatch.setattr(transfer, 'notify_change', lambda root, path: None)
+    return records
+
+
+def test_successful_move_is_journaled_as_a_rename(data_root, journal):
+    source = os.path.join(data_root.path, 'a.txt')
+    target = os.path.join(data_root.path, 'b.txt')
+    with open(source, 'w') as f:
+        f.write('a')
+    job = _Job()
+    transfer._run_move(job, source, target, data_root, data_root)
+    assert job.finished == {'method': 'rename'}
+    assert journal == [('rename', source)]
+
+
+def test_failed_move_is_journaled_as_syncs(data_root, journal, monkeypatch):
+    source = os.path.join(data_root.path, 'a.txt')
+    target = os.path.join(data_root.path, 'b.txt')
+
+    def failing_move(*args, **kwargs):
+        raise OSError(28, 'Sin espacio')
+
+    monkeypatch.setattr(transfer, 'move_item', failing_move)
+    with pytest.raises(OSError):
+        transfer._run_move(_Job(), source, target, data_root, data_root)
+    # Nada de 'rename': la réplica solo compara ambos lados con el estado real del original.
+    assert journal == [('sync', source), ('sync', target)]
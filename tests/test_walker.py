@@ -0,0 +1,79 @@
+# tests/test_walker.py
+import os
+import threading
+import time
+
+from walker import walk
+
+
+def _make_tree(base, dirs=30, files=5):
+    expected = set()
+    for d in range(dirs):
+        sub = os.path.join(base, f'd{d}', 'interior')
+        os.makedirs(sub)
+        expected.update({os.path.join(base, f'd{d}'), sub})
+        for i in range(files):
+            path = os.path.join(sub, f'f{i}.txt')
+            with open(path, 'w') as f:
+                f.write('x')
+            expected.add(path)
+    return expected
+
+
+def _walker_threads():
+    return [t for t in threading.enumerate() if t.name == 'walker']
+
+
+def _wait_for_no_walkers(timeout=5):
+    deadline = time.monotonic() + timeout
+    while _walker_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not _walker_threads()
+
+
+def test_walk_visits_every_entry_once(tmp_path):
+    expected = _make_tree(str(tmp_path))
+    found = [item.path for item in walk(str(tmp_path), max_workers=4)]
+    assert len(found) == len(expected) and set(found) == expected
+    assert _wait_for_no_walkers()
+
+
+def test_walk_terminates_on_empty_and_missing_directories(tmp_path):
+    assert list(walk(str(tmp_path))) == []
+    errors = []
+    assert list(walk(str(tmp_path / 'no-existe'), on_error=errors.append)) == []
+    assert len(errors) == 1
+    assert _wait_for_no_walkers()
+
+
+def test_walk_respects_max_depth_and_exclude(tmp_path):
+    _make_tree(str(tmp_path), dirs=3)
+    assert {item.depth for item in walk(str(tmp_path), max_depth=1)} == {1}
+    names = {item.name for item in walk(str(tmp_path), exclude=('interior',))}
+    assert names == {'d0', 'd1', 'd2'}
+
+
+def test_walk_does_not_loop_on_symlinks(tmp_path):
+    os.makedirs(tmp_path / 'a')
+    os.symlink(str(tmp_path), str(tmp_path / 'a' / 'vuelta'))
+    assert len(list(walk(str(tmp_path), follow_symlinks=True))) == 2
+
+
+def test_cancel_stops_the_walk(tmp_path):
+    _make_tree(str(tmp_path), dirs=100)
+    cancel = threading.Event()
+    seen = 0
+    for _ in walk(str(tmp_path), cancel=cancel):
+        seen += 1
+        if seen == 10:
+            cancel.set()
+    assert seen == 10
+    assert _wait_for_no_walkers()
+
+
+def test_closing_the_generator_stops_the_threads(tmp_path):
+    _make_tree(str(tmp_path), dirs=100)
+    generator = walk(str(tmp_path), max_workers=4)
+    next(generator)
+    generator.close()
+    assert _wait_for_no_walkers()
@@ -1,13 +1,194 @@
 import os # Este módulo es nuestro mejor amigo para todo lo relacionado con el sistema de archivos y rutas. ¡Lo necesitamos para todo!
 import shutil # Importamos 'shutil', aunque en este archivo no lo usamos directamente, se importa aquí porque está relacionado con operaciones de archivos que otras partes del proyecto sí usan (como borrar directorios recursivamente en modification.py).
+import json # Para leer el archivo de configuración de raíces (roots.json).
+import threading # Cada raíz tiene sus propios semáforos, pools de hilos y cachés, que deben ser seguros entre hilos.
+from collections import OrderedDict # Base de nuestras cachés LRU (recuerda el orden de uso).
+from concurrent.futures import ThreadPoolExecutor # Pool de hilos propio de cada raíz.
+from contextlib import contextmanager # Para poder usar 'with root.slot():'.
+from flask import jsonify # Respuesta común (503) cuando una raíz no tiene huecos libres.
 
 # --- Variables Globales Clave ---
 # Estas variables guardarán la ruta absoluta de nuestra carpeta 'data' y la ruta raíz del proyecto.
 # Las definimos como globales para que cualquier función en cualquier parte de la aplicación pueda acceder a ellas una vez que se inicializan.
 # Inicialmente son None porque todavía no sabemos dónde está la carpeta 'data' hasta que la aplicación arranca y llama a 'initialize_paths'.
-DATA_DIR = None # Aquí guardaremos la ruta COMPLETA y ABSOLUTA de nuestra carpeta 'data'.
+DATA_DIR = None # Aquí guardaremos la ruta COMPLETA y ABSOLUTA de nuestra carpeta 'data' (la raíz por defecto).
 PROJECT_ROOT = None # Aquí guardaremos la ruta COMPLETA y ABSOLUTA de la carpeta raíz del proyecto (donde está app.py).
 
+# --- Raíces de Datos Configurables ---
+# Además de 'data', el servidor puede exponer otras carpetas ("raíces") con nombre, por ejemplo un disco SSD rápido
+# y un NFS lento. Cada raíz tiene su propio límite de concurrencia, su propio pool de hilos y sus propias cachés,
+# así una raíz lenta no puede acaparar los hilos que atienden a las demás.
+DEFAULT_ROOT_NAME = 'data' # Nombre de la raíz por defecto (la carpeta 'data' de siempre).
+ROOTS = OrderedDict() # nombre -> DataRoot. Se rellena en initialize_paths.
+ROOTS_CONFIG_FILENAME = 'roots.json' # Archivo de configuración opcional en la raíz del proyecto.
+DEFAULT_ROOT_MAX_WORKERS = 8 # Hilos del pool de cada raíz (copias en paralelo, etc.).
+DEFAULT_ROOT_MAX_CONCURRENT = 16 # Operaciones de sistema de archivos simultáneas permitidas por raíz.
+# Segundos que una petición espera un hueco. Es muy poco a propósito: esperar bloquea un hilo del servidor,
+# así que si la raíz está saturada respondemos 503 enseguida y el cliente reintenta (ver root_busy_response).
+DEFAULT_ROOT_SLOT_TIMEOUT = 0.25
+ROOT_BUSY_RETRY_AFTER = 1 # Segundos sugeridos al cliente (cabecera Retry-After) cuando una raíz está ocupada.
+
+
+class RootBusyError(RuntimeError):
+    """Se lanza cuando una raíz tiene todos sus huecos de concurrencia ocupados durante demasiado tiempo."""
+
+    def __init__(self, message, retry_after=ROOT_BUSY_RETRY_AFTER):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+def root_busy_response(error):
+    """Respuesta JSON común cuando una raíz no tiene huecos libres: 503 con Retry-After para que el cliente reintente."""
+    response = jsonify({'success': False, 'busy': True, 'message': error.message})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+class LRUCache:
+    """
+    Caché sencilla y segura entre hilos que descarta lo usado hace más tiempo cuando se llena.
+    Cada raíz tiene varias de estas (una por tipo de dato cacheado).
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key) # Marcamos como usado recientemente.
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False) # Descartamos el más antiguo.
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def discard_where(self, predicate):
+        """Borra todas las entradas cuya clave cumpla 'predicate(key)'. Devuelve cuántas se borraron."""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class DataRoot:
+    """
+    Una carpeta expuesta por el servidor bajo un nombre (ej: 'data', 'scratch', 'archive').
+    Guarda la ruta absoluta y los recursos propios de la raíz: huecos de concurrencia, pool de hilos y cachés.
+    """
+
+    def __init__(self, name, path, max_workers=DEFAULT_ROOT_MAX_WORKERS,
+                 max_concurrent=DEFAULT_ROOT_MAX_CONCURRENT, slot_timeout=DEFAULT_ROOT_SLOT_TIMEOUT):
+        self.name = name
+        self.path = os.path.abspath(path)
+        self.max_workers = max_workers
+        self.max_concurrent = max_concurrent
+        self.slot_timeout = slot_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = None
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """Devuelve el pool de hilos de esta raíz (se crea la primera vez que se pide)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f'root-{self.name}')
+            return self._executor
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """
+        Ocupa un hueco de concurrencia de la raíz mientras dura el bloque 'with'.
+        Si no hay hueco libre en 'timeout' segundos (por defecto, los pocos de 'slot_timeout'), lanza RootBusyError.
+        Las peticiones no deben pasar un 'timeout' largo: mejor fallar rápido con root_busy_response.
+        """
+        wait = self.slot_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=wait):
+            raise RootBusyError(f"La raíz '{self.name}' está ocupada, inténtalo de nuevo en unos segundos")
+        try:
+            yield self
+        finally:
+            self._slots.release()
+
+    def cache(self, kind, max_entries=256):
+        """Devuelve la caché LRU de tipo 'kind' de esta raíz (ej: 'listing', 'search'), creándola si hace falta."""
+        with self._lock:
+            if kind not in self._caches:
+                self._caches[kind] = LRUCache(max_entries)
+            return self._caches[kind]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'max_workers': self.max_workers,
+            'max_concurrent': self.max_concurrent,
+            'is_default': self.name == DEFAULT_ROOT_NAME,
+        }
+
+
+def register_root(name, path, **limits):
+    """Registra (o reemplaza) una raíz con nombre. Crea la carpeta si todavía no existe."""
+    root = DataRoot(name, path, **limits)
+    if not os.path.exists(root.path):
+        os.makedirs(root.path)
+        print(f"utils.py: Directorio de la raíz '{name}' creado en: {root.path}")
+    ROOTS[name] = root
+    return root
+
+
+def load_roots_config(project_root_path):
+    """
+    Lee la configuración de raíces. Por defecto busca 'roots.json' en la raíz del proyecto;
+    la variable de entorno FILES_MANAGER_ROOTS_FILE permite indicar otro archivo.
+    Formato: {"scratch": {"path": "/mnt/ssd", "max_workers": 16, "max_concurrent": 32}, ...}
+    Las rutas relativas se interpretan respecto a la raíz del proyecto.
+    """
+    config_path = os.environ.get('FILES_MANAGER_ROOTS_FILE') or os.path.join(project_root_path, ROOTS_CONFIG_FILENAME)
+    if not os.path.isfile(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    print(f"utils.py: Configuración de raíces leída de: {config_path}")
+    return config
+
+
+def get_root(name=None):
+    """
+    Devuelve la DataRoot con ese nombre (o la raíz por defecto si 'name' está vacío).
+    Devuelve None si no existe ninguna raíz con ese nombre.
+    """
+    if isinstance(name, DataRoot):
+        return name
+    return ROOTS.get(name or DEFAULT_ROOT_NAME)
+
+
+def list_roots():
+    """Devuelve todas las raíces registradas, en orden de registro."""
+    return list(ROOTS.values())
+
 # --- Función de Inicialización CRUCIAL ---
 # Esta función es VITAL. Debe llamarse UNA VEZ al inicio de la aplicación (generalmente desde app.py).
 # Su trabajo es descubrir dónde está la carpeta 'data' y guardar su ruta de forma segura en la variable global DATA_DIR.
@@ -35,37 +216,53 @@ def initialize_paths(project_root_path):
     else:
         print(f"utils.py: Directorio DATA_DIR ya existe en: {DATA_DIR}") # Log para confirmar que ya estaba ahí.
 
+    # Registramos las raíces: primero la de siempre ('data') y después las del archivo de configuración.
+    # Si la configuración incluye 'data', puede cambiar sus límites o incluso su ruta.
+    ROOTS.clear()
+    register_root(DEFAULT_ROOT_NAME, DATA_DIR)
+    for name, options in load_roots_config(PROJECT_ROOT).items():
+        options = dict(options)
+        root_path = os.path.join(PROJECT_ROOT, os.path.expanduser(options.pop('path', name)))
+        register_root(name, root_path, **options)
+    DATA_DIR = ROOTS[DEFAULT_ROOT_NAME].path
+
 # --- Función para obtener la ruta de DATA_DIR de forma segura ---
 # Esta función es la forma recomendada de obtener la ruta de DATA_DIR en otras partes del código.
 # Asegura que DATA_DIR ya haya sido inicializado.
-def get_data_dir_abs():
+def get_data_dir_abs(root=None):
     """
-    Devuelve la ruta absoluta y segura de nuestra carpeta 'data'.
-    Lanza un error si 'initialize_paths' no se llamó antes.
+    Devuelve la ruta absoluta y segura de nuestra carpeta 'data' (o de la raíz con nombre 'root').
+    Lanza un error si 'initialize_paths' no se llamó antes o si la raíz no existe.
     """
     # Verificamos si la variable global DATA_DIR todavía es None. Si lo es, significa que initialize_paths no se ejecutó.
     if DATA_DIR is None:
         # Lanzamos un RuntimeError. Este tipo de error es bueno para indicar problemas graves de configuración o de que algo no se llamó en el orden correcto.
         raise RuntimeError("DATA_DIR no ha sido inicializado. Llama a initialize_paths() al inicio de la aplicación (ej. en app.py).")
-    # Si DATA_DIR no es None, significa que ya está inicializado y contiene la ruta absoluta segura.
-    return DATA_DIR # Devolvemos la ruta absoluta de DATA_DIR.
+    # Si no nos piden una raíz concreta, devolvemos la de siempre.
+    if not root:
+        return DATA_DIR # Devolvemos la ruta absoluta de DATA_DIR.
+    data_root = get_root(root)
+    if data_root is None:
+        raise RuntimeError(f"La raíz '{root}' no está configurada.")
+    return data_root.path
 
 # --- Función CLAVE de Seguridad: Obtener y Validar Ruta Completa ---
 # Esta es una de las funciones más importantes para la seguridad.
 # Convierte una ruta que viene del usuario (del frontend) a una ruta completa y ABSOLUTA en el sistema de archivos,
 # ¡PERO solo si esa ruta está DENTRO de nuestra carpeta 'data'!
-def get_full_path(user_path):
+def get_full_path(user_path, root=None):
     """
     Recibe una ruta 'user_path' (ej: 'documentos/mi_archivo.txt' o '../otro_lugar').
-    Construye la ruta completa combinándola con DATA_DIR.
+    Construye la ruta completa combinándola con DATA_DIR (o con la raíz 'root', si se indica).
     Realiza comprobaciones de seguridad para PREVENIR ataques de "Directory Traversal" (intentos de salirse de DATA_DIR).
     Devuelve la ruta absoluta final si es segura y válida, de lo contrario, devuelve None.
     """
     # Primero, obtenemos la ruta absoluta y segura de DATA_DIR usando nuestra función dedicada.
     try:
-        data_dir_abs = get_data_dir_abs()
+        data_dir_abs = get_data_dir_abs(root)
+        root_prefix = (get_root(root).name if root else DEFAULT_ROOT_NAME) # Nombre de la raíz, para quitarlo como prefijo.
     except RuntimeError as e:
-        # Si DATA_DIR no estaba inicializado al llamar a esta función, logueamos el error y devolvemos None.
+        # Si DATA_DIR no estaba inicializado (o la raíz no existe) al llamar a esta función, logueamos el error y devolvemos None.
         print(f"utils.py: Error en get_full_path: {e}")
         return None # Si DATA_DIR no está listo, no podemos validar nada.
 
@@ -88,15 +285,16 @@ def get_full_path(user_path):
         # Como nosotros vamos a unir la ruta recibida con la RUTA ABSOLUTA de DATA_DIR (ej: '/home/usuario/mi_app/data'),
         # si la ruta recibida empieza con 'data/', tendríamos algo como '/home/usuario/mi_app/data/data/documentos/archivo', lo cual está mal.
         # Esta parte del código intenta quitar ese prefijo 'data/' si existe para que la unión con el DATA_DIR absoluto sea correcta.
+        # Con varias raíces, el prefijo es el nombre de la raíz (ej: 'archive/'); para la raíz por defecto sigue siendo 'data/'.
         processed_user_path = user_path
-        # Comprobamos si la ruta recibida empieza con 'data/' (usando una barra '/' sin importar el OS, ya que viene del frontend).
+        # Comprobamos si la ruta recibida empieza con '<raíz>/' (usando una barra '/' sin importar el OS, ya que viene del frontend).
         # NOTA: La robustez total de esta verificación depende de cómo el frontend construya las rutas.
-        if processed_user_path.startswith('data/'):
-            processed_user_path = processed_user_path[len('data/'):] # Quitamos el prefijo 'data/'.
-            print(f"Prefijo 'data/' eliminado. Ruta de usuario procesada: '{processed_user_path}'")
-        elif processed_user_path == 'data': # También manejamos el caso exacto en que la ruta sea solo 'data'.
-             processed_user_path = '' # Si es solo 'data', la ruta relativa procesada es la cadena vacía (la raíz).
-             print(f"Ruta 'data' manejada. Ruta de usuario procesada: '{processed_user_path}'")
+        if processed_user_path.startswith(root_prefix + '/'):
+            processed_user_path = processed_user_path[len(root_prefix + '/'):] # Quitamos el prefijo '<raíz>/'.
+            print(f"Prefijo '{root_prefix}/' eliminado. Ruta de usuario procesada: '{processed_user_path}'")
+        elif processed_user_path == root_prefix: # También manejamos el caso exacto en que la ruta sea solo el nombre de la raíz.
+             processed_user_path = '' # Si es solo '<raíz>', la ruta relativa procesada es la cadena vacía (la raíz).
+             print(f"Ruta '{root_prefix}' manejada. Ruta de usuario procesada: '{processed_user_path}'")
 
 
         # Las rutas que vienen del frontend usan barras diagonales '/'. Los sistemas operativos pueden usar diferentes separadores ('\' en Windows).
@@ -125,7 +323,8 @@ def get_full_path(user_path):
         print(f"DATA_DIR absoluto para comparación: '{data_dir_abs}'")
 
 
-        if not requested_abs.lower().startswith(data_dir_abs.lower()):
+        # Comparamos con el separador al final para que una raíz hermana con nombre parecido (ej: 'data2' frente a 'data') no cuele.
+        if requested_abs.lower() != data_dir_abs.lower() and not requested_abs.lower().startswith(data_dir_abs.lower().rstrip(os.sep) + os.sep):
              # ¡Alerta de seguridad! La ruta intentó salirse de DATA_DIR.
              print(f"ALERTA DE SEGURIDAD: La ruta '{requested_abs}' NO empieza con DATA_DIR '{data_dir_abs}'. Devolviendo None.")
              print(f"--- Fin get_full_path ---\n")
@@ -145,14 +344,15 @@ def get_full_path(user_path):
 # --- Función para mostrar la ruta de forma legible en el frontend ---
 # Esta función toma una ruta COMPLETA y ABSOLUTA y la convierte en un formato más amigable para el usuario,
 # relativo a 'data/' (ej: 'data/documentos/').
-def get_current_path_display(path):
+def get_current_path_display(path, root=None):
     """
-    Recibe una ruta 'path' (que debería ser una ruta absoluta válida dentro de DATA_DIR).
+    Recibe una ruta 'path' (que debería ser una ruta absoluta válida dentro de DATA_DIR o de la raíz 'root').
     Devuelve una cadena de texto amigable para mostrar en el frontend, como 'data/subcarpeta/'.
     """
-    # Obtenemos la ruta absoluta de DATA_DIR de forma segura.
+    # Obtenemos la ruta absoluta de DATA_DIR (o de la raíz pedida) de forma segura.
     try:
-        data_dir_abs = get_data_dir_abs()
+        data_dir_abs = get_data_dir_abs(root)
+        root_prefix = (get_root(root).name if root else DEFAULT_ROOT_NAME) + '/'
     except RuntimeError:
          # Si DATA_DIR no está inicializado, no podemos formatear la ruta.
          print("utils.py: Error: DATA_DIR no inicializado al obtener la ruta para visualización.")
@@ -162,7 +362,7 @@ def get_current_path_display(path):
     # Si la ruta que nos pasaron es exactamente la ruta absoluta de DATA_DIR...
     # Es decir, si estamos en el directorio raíz de 'data'.
     if os.path.abspath(path) == data_dir_abs:
-        return 'data/' # Mostramos simplemente 'data/' en el frontend.
+        return root_prefix # Mostramos simplemente 'data/' (o '<raíz>/') en el frontend.
 
     # Si no estamos en la raíz, calculamos la ruta relativa a DATA_DIR.
     try:
@@ -181,8 +381,8 @@ def get_current_path_display(path):
         # Si la ruta relativa es '.' (que a veces ocurre si path ya era DATA_DIR), la mostramos como vacía para la unión.
         if display_path == '.':
              display_path = ''
-        # Finalmente, anteponemos 'data/' a la ruta relativa formateada para la visualización final.
-        return 'data/' + display_path
+        # Finalmente, anteponemos 'data/' (o '<raíz>/') a la ruta relativa formateada para la visualización final.
+        return root_prefix + display_path
     except ValueError:
         # Este error puede ocurrir si la ruta 'path' no está contenida dentro de 'data_dir_abs'.
         # Si get_full_path se usó correctamente, esta excepción no debería ocurrir, pero la manejamos por robustez.
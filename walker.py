@@ -0,0 +1,176 @@
+# walker.py
+import fnmatch # Patrones de exclusión tipo shell ('node_modules', '*.tmp', 'build/cache').
+import os # scandir y stat: la base del recorrido.
+import queue # Cola acotada entre los hilos que leen directorios y quien consume las entradas.
+import threading # Pool de hilos propio de cada recorrido y cancelación cooperativa.
+from collections import deque # Directorios pendientes de leer.
+
+# --- Recorrido Paralelo de Directorios ---
+# Búsquedas, medición de cuotas y demás operaciones recursivas recorren árboles enteros. Con os.walk cada
+# directorio se lee después del anterior: en un NFS o un disco de red, donde cada scandir es una ida y vuelta
+# lenta, el recorrido pasa casi todo el tiempo esperando. Aquí varios hilos leen directorios a la vez:
+# - Cada hilo toma un directorio pendiente, lo lee con scandir y deja sus entradas en una cola de salida ACOTADA.
+#   Si quien consume va lento, los hilos se paran al llenarse la cola (no se acumula el árbol entero en memoria).
+# - Los subdirectorios encontrados se añaden a los pendientes (se toma siempre el último: en profundidad, así la
+#   lista de pendientes no crece tanto como recorriendo por niveles).
+# - Si se siguen enlaces simbólicos, se recuerda el (st_dev, st_ino) de cada directorio visitado: un enlace que
+#   apunta a un antepasado no provoca un bucle infinito.
+# - La cancelación es cooperativa: 'cancel' (threading.Event) o cerrar el generador paran a los hilos en cuanto
+#   terminan el directorio que estaban leyendo.
+# El orden de las entradas NO es el de os.walk (depende de qué hilo termina antes): quien necesite un orden
+# estable debe ordenar los resultados.
+
+WALK_MAX_WORKERS = 8 # Hilos por recorrido si no se indica otra cosa.
+WALK_QUEUE_SIZE = 64 # Directorios leídos que pueden esperar en la cola de salida.
+_DONE = object() # Marca de fin del recorrido en la cola de salida.
+
+
+class WalkEntry:
+    """Una entrada encontrada en el recorrido. 'entry' es el os.DirEntry original (su stat queda en caché)."""
+
+    __slots__ = ('path', 'name', 'dirpath', 'depth', 'is_dir', 'is_symlink', 'entry')
+
+    def __init__(self, entry, dirpath, depth, is_dir, is_symlink):
+        self.path = entry.path
+        self.name = entry.name
+        self.dirpath = dirpath
+        self.depth = depth # 1 para las entradas que cuelgan directamente de la carpeta de inicio.
+        self.is_dir = is_dir # Sigue enlaces simbólicos, como os.walk: un enlace a una carpeta cuenta como carpeta.
+        self.is_symlink = is_symlink
+        self.entry = entry
+
+    def stat(self, follow_symlinks=True):
+        return self.entry.stat(follow_symlinks=follow_symlinks)
+
+
+def _is_excluded(patterns, name, rel_path):
+    """Los patrones con '/' se comparan con la ruta relativa al inicio; el resto, solo con el nombre."""
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(rel_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+def walk(top, max_workers=WALK_MAX_WORKERS, max_depth=None, exclude=(), follow_symlinks=False,
+         cancel=None, on_error=None, on_scanned=None):
+    """
+    Recorre 'top' en paralelo y genera un WalkEntry por cada archivo y carpeta (sin incluir 'top').
+    - max_depth: profundidad máxima de las entradas generadas (1 = solo el contenido de 'top'). None = sin límite.
+    - exclude: patrones de nombres (o de rutas relativas si llevan '/') que se saltan, junto con todo su contenido.
+    - follow_symlinks: si se entra en los enlaces a carpetas (con protección contra bucles).
+    - cancel: threading.Event opcional; si se activa, el recorrido termina en cuanto los hilos lo ven.
+    - on_error: función opcional llamada con cada OSError (ej: carpeta sin permisos). Por defecto se ignoran,
+      igual que os.walk.
+    - on_scanned: función opcional llamada con (carpeta, lista de WalkEntry) en cuanto se lee cada carpeta, ANTES de
+      que sus entradas lleguen al consumidor. Se llama desde los hilos del recorrido.
+    """
+    exclude = tuple(exclude or ())
+    top = os.path.abspath(top)
+    stop = threading.Event()
+    cond = threading.Condition()
+    pending = deque([(top, 0)])
+    out = queue.Queue(maxsize=WALK_QUEUE_SIZE)
+    state = {'active': 0, 'finished': False}
+    visited = set()
+    if follow_symlinks:
+        try:
+            st = os.stat(top)
+            visited.add((st.st_dev, st.st_ino))
+        except OSError:
+            pass
+
+    def put(item):
+        # Esperamos hueco en la cola, pero sin quedarnos colgados si el consumidor ya se fue.
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan(dirpath, depth):
+        """Lee un directorio. Devuelve (entradas_a_generar, subdirectorios_a_recorrer)."""
+        batch, children = [], []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    if exclude and _is_excluded(exclude, entry.name,
+                                                os.path.relpath(entry.path, top).replace(os.sep, '/')):
+                        continue
+                    try:
+                        is_symlink = entry.is_symlink()
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_symlink, is_dir = False, False
+                    batch.append(WalkEntry(entry, dirpath, depth + 1, is_dir, is_symlink))
+                    if not is_dir or (max_depth is not None and depth + 1 >= max_depth):
+                        continue
+                    if is_symlink and not follow_symlinks:
+                        continue
+                    if follow_symlinks:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        key = (st.st_dev, st.st_ino)
+                        with cond:
+                            if key in visited:
+                                continue # Ya visitado: un enlace en bucle o dos enlaces a la misma carpeta.
+                            visited.add(key)
+                    children.append((entry.path, depth + 1))
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+        return batch, children
+
+    def worker():
+        while True:
+            with cond:
+                while not pending and state['active'] and not stop.is_set():
+                    cond.wait()
+                if stop.is_set() or (not pending and not state['active']):
+                    if not state['finished']:
+                        state['finished'] = True
+                        cond.notify_all()
+                        finish = True
+                    else:
+                        finish = False
+                    break
+                dirpath, depth = pending.pop()
+                state['active'] += 1
+            batch, children = scan(dirpath, depth)
+            if on_scanned is not None:
+                on_scanned(dirpath, batch)
+            if batch:
+                put(batch)
+            with cond:
+                pending.extend(children)
+                state['active'] -= 1
+                cond.notify_all()
+        if finish:
+            put(_DONE)
+
+    threads = [threading.Thread(target=worker, name='walker', daemon=True) for _ in range(max(1, max_workers))]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                batch = out.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is _DONE:
+                return
+            for item in batch:
+                if cancel is not None and cancel.is_set():
+                    return
+                yield item
+    finally:
+        # Terminó, se canceló o el consumidor dejó de pedir entradas: paramos a los hilos.
+        stop.set()
+        with cond:
+            cond.notify_all()
+        for thread in threads:
+            thread.join()